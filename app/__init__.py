@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
+from sqlalchemy import event
 from config import DevelopmentConfig as Config
 
 db = SQLAlchemy()
@@ -9,25 +10,51 @@ migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'main.login'
 
+def configure_sqlite(engine, pragmas):
+    # Run the configured PRAGMAs on every new DBAPI connection of the pool
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
     db.init_app(app)
+    with app.app_context():
+        configure_sqlite(db.engine, app.config.get('SQLITE_PRAGMAS'))
+        from app.instrumentation import init_instrumentation
+        init_instrumentation(app, db.engine)
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
+    from app.cache import init_cache
+    init_cache(app)
+    from app.metrics import init_metrics
+    init_metrics(app)
+    from app.passwords import init_passwords
+    init_passwords(app)
+
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
-    
-    with app.app_context():
-        db.create_all()
-        # Ensure default admin user exists
-        from app.models import User
-        if not User.query.filter_by(username='admin').first():
-            admin = User(username='admin', is_admin=True, is_approved=True)
-            admin.set_password('admin')
-            db.session.add(admin)
-            db.session.commit()
+
+    # Schema and the default admin come from `flask db upgrade` and
+    # `flask bootstrap-admin`: creating an app never touches the database.
+    from app.cli import (
+        rollup_cli, jobs_cli, recurring_cli, forecast_cli, import_transactions_command, bootstrap_admin_command, seed_command
+    )
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(recurring_cli)
+    app.cli.add_command(forecast_cli)
+    app.cli.add_command(import_transactions_command)
+    app.cli.add_command(bootstrap_admin_command)
+    app.cli.add_command(seed_command)
 
     return app
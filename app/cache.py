@@ -0,0 +1,288 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, update
+from sqlalchemy.orm import attributes
+from app import db
+from app.models import Category, Transaction, Budget, User, RecurringRule
+
+
+IDENTITY_ATTRS = ('username', 'is_admin', 'is_approved', 'password_hash', 'auth_version')
+
+
+class MemoryBackend:
+    """Bounded in-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key):
+        with self._lock:
+            entry = self._data.get((user_id, key))
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[(user_id, key)]
+                return False, None
+            self._data.move_to_end((user_id, key))
+            return True, value
+
+    def set(self, user_id, key, value):
+        with self._lock:
+            self._data[(user_id, key)] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end((user_id, key))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for cache_key in [k for k in self._data if k[0] == user_id]:
+                del self._data[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """File-backed store shared by every worker process on the host.
+
+    Values are stored as JSON, so only JSON-serializable aggregates can be
+    cached (tuples come back as lists).
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=300, prune_every=100):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Expired and surplus entries are dropped every prune_every sets of
+        # this process, so the store may briefly hold a few more than maxsize
+        self.prune_every = prune_every
+        self._sets = itertools.count(1)
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # One-off connection: with gunicorn's preload_app this runs in the
+        # master, and a connection kept here would be inherited by every fork
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS aggregate_cache ('
+                ' user_id INTEGER NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,'
+                ' expires REAL NOT NULL, PRIMARY KEY (user_id, key))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_aggregate_cache_expires ON aggregate_cache (expires)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id, key):
+        row = self._connect().execute(
+            'SELECT value, expires FROM aggregate_cache WHERE user_id = ? AND key = ?',
+            (user_id, key)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, user_id, key, value):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO aggregate_cache (user_id, key, value, expires) VALUES (?, ?, ?, ?)',
+            (user_id, key, json.dumps(value), now + self.ttl)
+        )
+        if next(self._sets) % self.prune_every:
+            return
+        # Keep the store bounded: drop expired entries, then the oldest ones.
+        # Both walk the expires index instead of scanning the table.
+        conn.execute('DELETE FROM aggregate_cache WHERE expires < ?', (now,))
+        conn.execute(
+            'DELETE FROM aggregate_cache WHERE rowid IN (SELECT rowid FROM aggregate_cache'
+            ' ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+            (self.maxsize,)
+        )
+
+    def invalidate_user(self, user_id):
+        self._connect().execute('DELETE FROM aggregate_cache WHERE user_id = ?', (user_id,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM aggregate_cache')
+
+    def __len__(self):
+        return self._connect().execute('SELECT count(*) FROM aggregate_cache').fetchone()[0]
+
+
+class AggregateCache:
+    """Per-user cache of aggregate query results with hit/miss counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, user_id, key, compute):
+        key = ':'.join(str(part) for part in key)
+        found, value = self.backend.get(user_id, key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        self.backend.set(user_id, key, value)
+        return value
+
+    def set(self, user_id, key, value):
+        self.backend.set(user_id, ':'.join(str(part) for part in key), value)
+
+    def invalidate_user(self, user_id):
+        self.backend.invalidate_user(user_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'size': len(self.backend)
+        }
+
+
+def init_cache(app):
+    backend_name = app.config.get('CACHE_BACKEND', 'memory')
+    maxsize = app.config.get('CACHE_MAXSIZE', 1024)
+    ttl = app.config.get('CACHE_TTL', 300)
+    if backend_name == 'sqlite':
+        path = app.config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'cache.db')
+        backend = SQLiteBackend(path, maxsize=maxsize, ttl=ttl)
+    elif backend_name == 'memory':
+        backend = MemoryBackend(maxsize=maxsize, ttl=ttl)
+    else:
+        raise ValueError(f'Unknown CACHE_BACKEND {backend_name}')
+    app.extensions['aggregate_cache'] = AggregateCache(backend)
+
+
+def check_shared_cache(app, processes):
+    """Refuse a per-process cache when several processes serve the app.
+
+    Cached identities back revocation and password changes: with the memory
+    backend, a worker that did not handle the write would keep serving the
+    old identity until CACHE_TTL expires.
+    """
+    if processes > 1 and isinstance(app.extensions['aggregate_cache'].backend, MemoryBackend):
+        raise RuntimeError(
+            f'CACHE_BACKEND=memory cannot be shared by {processes} worker processes; '
+            'set CACHE_BACKEND=sqlite'
+        )
+
+
+def get_cache():
+    return current_app.extensions['aggregate_cache']
+
+
+def cached(user_id, key, compute):
+    return get_cache().get_or_compute(user_id, key, compute)
+
+
+def mark_user_dirty(session, user_id):
+    # For Core bulk writes, which bypass the flush events below
+    session.info.setdefault('cache_dirty_users', set()).add(user_id)
+
+
+def _owners(session, obj, committed):
+    # User ids whose aggregates depend on obj, before or after the change
+    if isinstance(obj, User):
+        # Aggregates never read the user row; only identity changes matter
+        if committed and obj not in session.deleted and not any(
+            attributes.get_history(obj, attr).has_changes() for attr in IDENTITY_ATTRS
+        ):
+            return set()
+        return {obj.id}
+    if isinstance(obj, (Transaction, Category, RecurringRule)):
+        attr = 'user_id'
+    elif isinstance(obj, Budget):
+        attr = 'category_id'
+    else:
+        return set()
+
+    values = {getattr(obj, attr)}
+    if committed:
+        values.update(attributes.get_history(obj, attr).deleted)
+    values.discard(None)
+    if attr == 'user_id':
+        return values
+    owners = set()
+    for category_id in values:
+        category = session.get(Category, category_id)
+        if category is not None:
+            owners.add(category.user_id)
+    return owners
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_dirty_users(session, flush_context):
+    dirty = session.info.setdefault('cache_dirty_users', set())
+    for obj in session.new:
+        dirty.update(_owners(session, obj, committed=False))
+    for obj in session.dirty:
+        dirty.update(_owners(session, obj, committed=True))
+    for obj in session.deleted:
+        dirty.update(_owners(session, obj, committed=True))
+        if isinstance(obj, User):
+            session.info.setdefault('deleted_users', set()).add(obj.id)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _bump_data_versions(session):
+    # Flush first: commit only flushes after this hook, and the final flush
+    # may dirty more users. The bump commits with the writes themselves.
+    session.flush()
+    dirty = session.info.get('cache_dirty_users', set()) - session.info.get('deleted_users', set())
+    if dirty:
+        session.connection().execute(
+            update(User.__table__).where(User.__table__.c.id.in_(dirty)).values(
+                data_version=User.__table__.c.data_version + 1
+            )
+        )
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_dirty_users(session):
+    # Invalidate only once the data is committed, so no other request can
+    # repopulate an entry from the pre-commit state.
+    session.info.pop('deleted_users', None)
+    dirty = session.info.pop('cache_dirty_users', None)
+    if dirty:
+        cache = get_cache()
+        for user_id in dirty:
+            cache.invalidate_user(user_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_dirty_users(session):
+    session.info.pop('cache_dirty_users', None)
+    session.info.pop('deleted_users', None)
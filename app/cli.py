@@ -0,0 +1,164 @@
+import json
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db, rollup, importer, seed, jobs, recurring, forecast
+from app.models import User
+
+rollup_cli = AppGroup('rollup', help='Maintain the monthly spending rollup.')
+jobs_cli = AppGroup('jobs', help='Run and queue background jobs.')
+recurring_cli = AppGroup('recurring', help='Maintain recurring transactions.')
+forecast_cli = AppGroup('forecast', help='Project month-end spending.')
+
+
+def _get_user_id(username):
+    if username is None:
+        return None
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'Unknown user {username}')
+    return user.id
+
+
+@rollup_cli.command('rebuild')
+@click.option('--user', 'username', help='Only rebuild the rollup of this username.')
+def rebuild_command(username):
+    """Recompute the rollup from raw transactions and verify it."""
+    user_id = _get_user_id(username)
+    rollup.rebuild(user_id)
+    mismatches = rollup.verify(user_id)
+    if mismatches:
+        for key, expected, actual in mismatches:
+            click.echo(f'Mismatch {key}: expected {expected}, found {actual}', err=True)
+        raise click.ClickException(f'{len(mismatches)} rollup rows do not match raw data')
+    click.echo('Rollup rebuilt and verified.')
+
+
+@recurring_cli.command('materialize')
+@click.option('--user', 'username', help='Only store the occurrences of this username.')
+def materialize_command(username):
+    """Store every recurring occurrence due by today as a transaction."""
+    stored = recurring.materialize_due(_get_user_id(username))
+    click.echo(f'Stored {stored} recurring transactions.')
+
+
+@forecast_cli.command('score')
+def score_command():
+    """Score every user at once and list the categories that need attention."""
+    started = time.perf_counter()
+    forecasts = forecast.score_all_users()
+    usernames = dict(db.session.query(User.id, User.username))
+    for user_id, category in forecast.flagged(forecasts):
+        notes = []
+        if category['over_budget']:
+            notes.append(f"on pace for {category['projected']:.2f} of {category['limit']:.2f}")
+        if category['anomaly']:
+            notes.append(f"unusual spending on {category['anomaly_on']} (z={category['z_score']})")
+        click.echo(f"{usernames[user_id]} / {category['name']}: {', '.join(notes)}")
+    elapsed = time.perf_counter() - started
+    click.echo(f'Scored {len(forecasts)} users in {elapsed:.1f}s.')
+
+
+@click.command('import-transactions')
+@click.argument('file', type=click.File('rb'))
+@click.option('--user', 'username', required=True, help='Username owning the imported transactions.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ofx']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=importer.IMPORT_BATCH_SIZE, show_default=True)
+@click.option('--rule', 'rules', multiple=True, metavar='PATTERN=CATEGORY',
+              help='Assign descriptions containing PATTERN to CATEGORY. Repeatable.')
+def import_transactions_command(file, username, fmt, batch_size, rules):
+    """Stream a CSV/OFX bank export into a user's transactions."""
+    user_id = _get_user_id(username)
+    category_rules = dict(current_app.config.get('IMPORT_CATEGORY_RULES', {}))
+    for rule in rules:
+        pattern, sep, category = rule.partition('=')
+        if not sep:
+            raise click.BadParameter(f'{rule!r} is not PATTERN=CATEGORY', param_hint='--rule')
+        category_rules[pattern] = category
+
+    started = time.perf_counter()
+
+    def progress(result):
+        click.echo(f"{result['imported']} imported, {result['duplicates']} duplicates", err=True)
+
+    try:
+        rows = importer.open_rows(file, fmt, file.name)
+        result = importer.import_transactions(user_id, rows, category_rules, batch_size, progress)
+    except importer.ImportFormatError as e:
+        raise click.ClickException(str(e))
+    elapsed = time.perf_counter() - started
+    click.echo(f"Imported {result['imported']} transactions "
+               f"({result['duplicates']} duplicates skipped) in {elapsed:.1f}s.")
+
+
+@click.command('bootstrap-admin')
+@click.option('--username', default='admin', show_default=True)
+@click.option('--password', envvar='ADMIN_PASSWORD', default='admin', show_default=True,
+              help='Also read from ADMIN_PASSWORD.')
+def bootstrap_admin_command(username, password):
+    """Create the approved admin account unless it already exists."""
+    if User.query.filter_by(username=username).first():
+        click.echo(f'User {username} already exists.')
+        return
+    admin = User(username=username, is_admin=True, is_approved=True)
+    admin.set_password(password)
+    db.session.add(admin)
+    db.session.commit()
+    click.echo(f'Admin {username} created.')
+
+
+@click.command('seed')
+@click.option('--users', default=1, show_default=True)
+@click.option('--categories', default=6, show_default=True, help='Categories per user.')
+@click.option('--transactions', default=1000, show_default=True, help='Transactions per user.')
+@click.option('--months', default=12, show_default=True, help='Spread data over this many past months.')
+@click.option('--prefix', default='seed', show_default=True, help='Usernames are PREFIX-1 .. PREFIX-N.')
+@click.option('--password', default='password', show_default=True)
+@click.option('--seed', 'random_seed', default=0, show_default=True, help='Random seed, for repeatable data.')
+def seed_command(users, categories, transactions, months, prefix, password, random_seed):
+    """Bulk-load synthetic users, categories, budgets and transactions."""
+    started = time.perf_counter()
+    try:
+        usernames = seed.seed_data(users, categories, transactions, months, prefix, password, random_seed)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    elapsed = time.perf_counter() - started
+    click.echo(f'Seeded {len(usernames)} users with {users * transactions} transactions in {elapsed:.1f}s.')
+
+
+@jobs_cli.command('worker')
+@click.option('--threads', default=1, show_default=True, help='Jobs run concurrently.')
+@click.option('--poll', 'poll_interval', default=jobs.JOB_POLL_INTERVAL, show_default=True,
+              help='Seconds between checks of an empty queue.')
+@click.option('--once', is_flag=True, help='Run the queued jobs, then exit.')
+def worker_command(threads, poll_interval, once):
+    """Process queued jobs (no broker: the job table is the queue)."""
+    if current_app.config.get('CACHE_BACKEND') == 'memory':
+        # Job writes (user purges, imports) must reach the web workers' caches
+        click.echo('Warning: CACHE_BACKEND=memory is private to this process; '
+                   'the web workers will not see its invalidations.', err=True)
+    if once:
+        click.echo(f'Ran {jobs.run_pending()} jobs.')
+        return
+    click.echo(f'Job worker started with {threads} threads.')
+    jobs.work(threads, poll_interval)
+
+
+@jobs_cli.command('enqueue')
+@click.argument('kind', type=click.Choice(sorted(jobs.JOB_HANDLERS)))
+@click.option('--param', 'params', multiple=True, metavar='KEY=VALUE',
+              help='Handler argument; VALUE is parsed as JSON when possible. Repeatable.')
+def enqueue_command(kind, params):
+    """Queue a job, e.g. `flask jobs enqueue backup`."""
+    kwargs = {}
+    for param in params:
+        key, sep, value = param.partition('=')
+        if not sep:
+            raise click.BadParameter(f'{param!r} is not KEY=VALUE', param_hint='--param')
+        try:
+            kwargs[key] = json.loads(value)
+        except ValueError:
+            kwargs[key] = value
+    job = jobs.enqueue(kind, **kwargs)
+    click.echo(f'Queued job {job.id} ({kind}).')
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from app import db
+from app.models import Category, Transaction
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = ('id', 'date', 'amount', 'description', 'type',
+                 'category_name', 'category_color', 'category_icon')
+
+
+def iter_export_rows(user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a user's transactions as plain dicts, oldest first.
+
+    One joined query fetched in server-side chunks (yield_per), so neither
+    ORM objects nor lazy category loads pile up however long the history.
+    """
+    query = db.session.query(
+        Transaction.id,
+        Transaction.date,
+        Transaction.amount,
+        Transaction.description,
+        Transaction.type,
+        Category.name,
+        Category.color,
+        Category.icon
+    ).outerjoin(Category, Transaction.category_id == Category.id).filter(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.date, Transaction.id).yield_per(chunk_size)
+
+    for id, date, amount, description, type, name, color, icon in query:
+        yield {
+            'id': id,
+            'date': date.isoformat(),
+            'amount': amount,
+            'description': description,
+            'type': type,
+            'category_name': name if name is not None else 'Uncategorized',
+            'category_color': color if color is not None else '#000000',
+            'category_icon': icon if icon is not None else '🏷️'
+        }
+
+
+def iter_csv(user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for i, row in enumerate(iter_export_rows(user_id, chunk_size), 1):
+        writer.writerow(row)
+        if i % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_jsonl(user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    lines = []
+    for row in iter_export_rows(user_id, chunk_size):
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
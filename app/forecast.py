@@ -0,0 +1,172 @@
+import calendar
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import and_, func, select
+from app import db
+from app.models import Category, Transaction, Budget
+
+# Days of daily spending a category's usual pattern is learned from, and the
+# most recent days checked against it
+FORECAST_HISTORY_DAYS = 90
+ANOMALY_RECENT_DAYS = 7
+ANOMALY_Z_SCORE = 3.0
+
+
+def _window(today):
+    # Columns of the daily matrix: the history, then the recent days ending
+    # today. The history always reaches back past the start of the month.
+    start = today - timedelta(days=FORECAST_HISTORY_DAYS + ANOMALY_RECENT_DAYS - 1)
+    return start, (today - start).days + 1
+
+
+def load_daily_spend(user_id, today):
+    """Categories and their daily expense totals as dense NumPy arrays.
+
+    One query whatever the number of categories: expense totals grouped
+    per category and day over the indexed date range, LEFT JOINed onto the
+    categories and this month's budgets. user_id None loads every user.
+    Returns (categories, limits, daily): limits[i] is category i's budget
+    (NaN when unset), daily[i][d] its spending d days into the window.
+    """
+    start, days = _window(today)
+    day = func.strftime('%Y-%m-%d', Transaction.date)
+    totals = select(
+        Transaction.category_id, day.label('day'), func.sum(Transaction.amount).label('total')
+    ).where(
+        Transaction.type == 'expense',
+        Transaction.category_id.isnot(None),
+        Transaction.date >= datetime.combine(start, datetime.min.time()),
+        Transaction.date < datetime.combine(today + timedelta(days=1), datetime.min.time())
+    ).group_by(Transaction.category_id, day)
+    query = select(
+        Category.id, Category.user_id, Category.name, Category.color, Category.icon, Budget.amount
+    ).outerjoin(Budget, and_(
+        Budget.category_id == Category.id,
+        Budget.month == today.month,
+        Budget.year == today.year
+    ))
+    if user_id is not None:
+        totals = totals.where(Transaction.user_id == user_id)
+        query = query.where(Category.user_id == user_id)
+    totals = totals.subquery('totals')
+    query = query.add_columns(totals.c.day, totals.c.total).outerjoin(
+        totals, totals.c.category_id == Category.id
+    ).order_by(Category.id)
+    rows = db.session.execute(query).all()
+
+    # One row per category and day it spent on (a single one when it did
+    # not): np.unique numbers the categories, in id order
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    _, first, row_index = np.unique(ids, return_index=True, return_inverse=True)
+    categories = [tuple(rows[i][:5]) for i in first]
+    limits = np.array([np.nan if rows[i][5] is None else rows[i][5] for i in first], dtype=float)
+
+    daily = np.zeros((len(categories), days))
+    spent = np.array([row[6] is not None for row in rows], dtype=bool)
+    if spent.any():
+        labels = np.array([row[6] for row in rows if row[6] is not None], dtype='datetime64[D]')
+        column = (labels - np.datetime64(start, 'D')).astype(int)
+        daily[row_index[spent], column] = [row[7] for row in rows if row[6] is not None]
+    return categories, limits, daily
+
+
+def score(limits, daily, today):
+    """Month-end projections and anomaly scores of every row at once.
+
+    The burn rate is the month's spending so far per elapsed day, and the
+    projection carries it to the end of the month. Each of the recent days
+    is turned into a z-score against the category's daily mean and standard
+    deviation over the history; flat histories score 0.
+    """
+    start, _ = _window(today)
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    month = daily[:, (today.replace(day=1) - start).days:]
+    spent = month.sum(axis=1)
+    burn_rate = spent / today.day
+    projected = burn_rate * days_in_month
+
+    # Day of the month an over-pace budget runs out, 0 when it lasts. No
+    # budget is NaN, which never compares as over.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        left = np.maximum(limits - spent, 0)
+        runs_out = np.where(burn_rate > 0, today.day + np.ceil(left / burn_rate), np.inf)
+        over_budget = projected > limits
+        runs_out = np.where(over_budget & (runs_out <= days_in_month), runs_out, 0).astype(int)
+
+    history, recent = daily[:, :-ANOMALY_RECENT_DAYS], daily[:, -ANOMALY_RECENT_DAYS:]
+    mean = history.mean(axis=1, keepdims=True)
+    std = history.std(axis=1, keepdims=True)
+    z = np.divide(recent - mean, std, out=np.zeros_like(recent), where=std > 0)
+    worst = z.argmax(axis=1)
+    z_max = z[np.arange(len(z)), worst]
+    return {
+        'spent': spent,
+        'burn_rate': burn_rate,
+        'projected': projected,
+        'over_budget': over_budget,
+        'runs_out': runs_out,
+        'z_score': z_max,
+        'anomaly': z_max >= ANOMALY_Z_SCORE,
+        'anomaly_day': worst - (ANOMALY_RECENT_DAYS - 1),
+    }
+
+
+def _category_forecast(category, limit, scores, i, today):
+    # JSON-friendly: forecasts are cached and served as JSON
+    runs_out = int(scores['runs_out'][i])
+    anomaly = bool(scores['anomaly'][i])
+    return {
+        'id': category[0],
+        'name': category[2],
+        'color': category[3],
+        'icon': category[4] or '🏷️',
+        'limit': None if np.isnan(limit) else float(limit),
+        'spent': round(float(scores['spent'][i]), 2),
+        'burn_rate': round(float(scores['burn_rate'][i]), 2),
+        'projected': round(float(scores['projected'][i]), 2),
+        'over_budget': bool(scores['over_budget'][i]),
+        'runs_out_on': today.replace(day=runs_out).isoformat() if runs_out else None,
+        'z_score': round(float(scores['z_score'][i]), 2),
+        'anomaly': anomaly,
+        'anomaly_on': (today + timedelta(days=int(scores['anomaly_day'][i]))).isoformat() if anomaly else None,
+    }
+
+
+def _forecast(categories, rows, limits, scores, today):
+    return {
+        'as_of': today.isoformat(),
+        'month': today.month,
+        'year': today.year,
+        'days_in_month': calendar.monthrange(today.year, today.month)[1],
+        'categories': [_category_forecast(categories[i], limits[i], scores, i, today) for i in rows],
+    }
+
+
+def get_forecast(user_id, today=None):
+    """Month-end forecast and anomaly flags for every category of a user."""
+    today = today or date.today()
+    categories, limits, daily = load_daily_spend(user_id, today)
+    scores = score(limits, daily, today)
+    return _forecast(categories, range(len(categories)), limits, scores, today)
+
+
+def score_all_users(today=None):
+    """Forecasts of every user from one load and one vectorized pass.
+
+    Returns {user_id: forecast}, users without categories left out.
+    """
+    today = today or date.today()
+    categories, limits, daily = load_daily_spend(None, today)
+    scores = score(limits, daily, today)
+    rows = {}
+    for i, category in enumerate(categories):
+        rows.setdefault(category[1], []).append(i)
+    return {user_id: _forecast(categories, indexes, limits, scores, today) for user_id, indexes in rows.items()}
+
+
+def flagged(forecasts):
+    """(user_id, category) of every category over pace or anomalous."""
+    return [(user_id, category)
+            for user_id, forecast in sorted(forecasts.items())
+            for category in forecast['categories']
+            if category['over_budget'] or category['anomaly']]
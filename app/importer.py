@@ -0,0 +1,234 @@
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import insert
+from app import db, rollup
+from app.cache import mark_user_dirty
+from app.models import Category, Transaction
+
+IMPORT_BATCH_SIZE = 1000
+
+CSV_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d.%m.%Y', '%Y/%m/%d')
+CSV_COLUMNS = {
+    'date': ('date', 'booking date', 'transaction date', 'posted'),
+    'amount': ('amount', 'value', 'sum'),
+    'description': ('description', 'memo', 'payee', 'name', 'details'),
+    'category': ('category',),
+    'type': ('type',),
+}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def parse_amount(text):
+    cleaned = re.sub(r'[^\d,.\-+]', '', text or '')
+    if ',' in cleaned and '.' in cleaned:
+        cleaned = cleaned.replace(',', '')
+    else:
+        cleaned = cleaned.replace(',', '.')
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        raise ImportFormatError(f'Invalid amount {text!r}')
+
+
+def parse_date(text, formats=CSV_DATE_FORMATS):
+    text = (text or '').strip()
+    if formats is CSV_DATE_FORMATS and len(text) == 10 and text[4] == '-':
+        # ISO dates are the common case and much cheaper than strptime
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ImportFormatError(f'Invalid date {text!r}')
+
+
+def _row_type(amount, explicit=None):
+    explicit = (explicit or '').strip().lower()
+    if explicit in ('income', 'expense'):
+        return explicit
+    # Bank exports sign debits negative
+    return 'expense' if amount < 0 else 'income'
+
+
+def iter_csv(stream, date_formats=CSV_DATE_FORMATS):
+    """Yield raw rows (date, amount, description, category, type) from a CSV text stream."""
+    reader = csv.reader(stream)
+    header = [h.strip().lower() for h in next(reader, [])]
+    columns = {}
+    for field, names in CSV_COLUMNS.items():
+        for i, name in enumerate(header):
+            if name in names:
+                columns[field] = i
+                break
+    if 'date' not in columns or 'amount' not in columns:
+        raise ImportFormatError('CSV needs at least a date and an amount column')
+
+    def get(row, field):
+        i = columns.get(field)
+        return row[i] if i is not None and i < len(row) else None
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        amount = parse_amount(get(row, 'amount'))
+        yield (
+            parse_date(get(row, 'date'), date_formats),
+            amount,
+            (get(row, 'description') or '').strip(),
+            get(row, 'category'),
+            _row_type(amount, get(row, 'type'))
+        )
+
+
+OFX_TAG = re.compile(r'<(/?)(\w+)>([^<\r\n]*)')
+
+
+def parse_ofx_date(text):
+    # YYYYMMDD[HHMMSS[.XXX]][[gmt offset:tz name]]
+    digits = re.match(r'\d+', text.strip())
+    if not digits or len(digits.group()) < 8:
+        raise ImportFormatError(f'Invalid OFX date {text!r}')
+    value = digits.group()
+    return datetime.strptime(value[:14] if len(value) >= 14 else value[:8],
+                             '%Y%m%d%H%M%S' if len(value) >= 14 else '%Y%m%d')
+
+
+def iter_ofx(stream):
+    """Yield raw rows from the <STMTTRN> blocks of an OFX (SGML or XML) stream."""
+    current = None
+    for line in stream:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    amount = parse_amount(current.get('TRNAMT'))
+                    yield (
+                        parse_ofx_date(current.get('DTPOSTED', '')),
+                        amount,
+                        (current.get('NAME') or current.get('MEMO') or '').strip(),
+                        None,
+                        _row_type(amount)
+                    )
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+class CategoryMatcher:
+    """Map imported rows onto the user's categories.
+
+    An explicit category column wins when it names an existing category.
+    Otherwise the first rule whose pattern occurs in the description
+    (case-insensitive) decides, then a category whose name occurs in it.
+    """
+
+    def __init__(self, user_id, rules=None):
+        categories = db.session.query(Category.id, Category.name).filter(Category.user_id == user_id).all()
+        self.by_name = {name.lower(): cat_id for cat_id, name in categories}
+        self.rules = []
+        for pattern, category_name in (rules or {}).items():
+            cat_id = self.by_name.get(category_name.lower())
+            if cat_id is not None:
+                self.rules.append((pattern.lower(), cat_id))
+
+    def match(self, description, category=None):
+        if category and category.strip().lower() in self.by_name:
+            return self.by_name[category.strip().lower()]
+        text = (description or '').lower()
+        for pattern, cat_id in self.rules:
+            if pattern in text:
+                return cat_id
+        for name, cat_id in self.by_name.items():
+            if name in text:
+                return cat_id
+        return None
+
+
+def _flush_batch(user_id, batch, result):
+    keys = [row['dedupe_key'] for row in batch]
+    existing = {
+        key for (key,) in db.session.query(Transaction.dedupe_key).filter(
+            Transaction.user_id == user_id,
+            Transaction.dedupe_key.in_(keys)
+        )
+    }
+    fresh = []
+    for row in batch:
+        if row['dedupe_key'] in existing:
+            result['duplicates'] += 1
+            continue
+        # Also drops repeats inside the same batch
+        existing.add(row['dedupe_key'])
+        fresh.append(row)
+
+    if fresh:
+        # Plain Core executemany: no ORM bookkeeping per row
+        db.session.execute(insert(Transaction.__table__), fresh)
+        # Core inserts bypass the flush hooks: keep rollup and cache in step
+        deltas = defaultdict(lambda: [0.0, 0])
+        for row in fresh:
+            if row['type'] == 'expense':
+                delta = deltas[(user_id, row['category_id'], row['date'].year, row['date'].month)]
+                delta[0] += row['amount']
+                delta[1] += 1
+        rollup.apply_deltas(db.session.connection(), deltas)
+        mark_user_dirty(db.session, user_id)
+    db.session.commit()
+    result['imported'] += len(fresh)
+
+
+def import_transactions(user_id, rows, rules=None, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Insert parsed rows for a user in batches, skipping duplicates.
+
+    rows is an iterator from iter_csv/iter_ofx; only one batch is held in
+    memory at a time. Each batch costs one dedupe lookup and one executemany,
+    and is committed on its own. Returns counts of imported/duplicate rows.
+    """
+    matcher = CategoryMatcher(user_id, rules)
+    result = {'imported': 0, 'duplicates': 0}
+    batch = []
+    for when, amount, description, category, type in rows:
+        amount = float(abs(amount))
+        batch.append({
+            'user_id': user_id,
+            'date': when,
+            'amount': amount,
+            'description': description[:100] or None,
+            'type': type,
+            'category_id': matcher.match(description, category),
+            'dedupe_key': Transaction.make_dedupe_key(when, amount, description[:100])
+        })
+        if len(batch) >= batch_size:
+            _flush_batch(user_id, batch, result)
+            batch = []
+            if progress:
+                progress(result)
+    if batch:
+        _flush_batch(user_id, batch, result)
+        if progress:
+            progress(result)
+    return result
+
+
+def open_rows(stream, fmt=None, filename=''):
+    """Pick the parser for a binary stream from fmt or the file extension."""
+    fmt = (fmt or filename.rsplit('.', 1)[-1]).lower()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    if fmt in ('ofx', 'qfx'):
+        return iter_ofx(text)
+    if fmt == 'csv':
+        return iter_csv(text)
+    raise ImportFormatError(f'Unsupported import format {fmt!r}')
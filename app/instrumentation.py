@@ -0,0 +1,116 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger('app.requests')
+
+
+def _timings():
+    # Per-request accumulators, or None outside a request
+    if not has_request_context():
+        return None
+    return g.get('request_timings')
+
+
+def record(metric, seconds):
+    timings = _timings()
+    if timings is not None:
+        timings[metric] = timings.get(metric, 0.0) + seconds
+
+
+@contextmanager
+def timed(metric):
+    """Add the time spent in the block to the current request's metric."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(metric, time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        timings = _timings()
+        if timings is not None:
+            timings['db'] = timings.get('db', 0.0) + time.perf_counter() - started
+            timings['statements'] += 1
+
+
+def _start_render(app, template, context, **extra):
+    if _timings() is not None:
+        g.render_started = time.perf_counter()
+
+
+def _end_render(app, template, context, **extra):
+    started = g.pop('render_started', None) if has_request_context() else None
+    if started is not None:
+        record('render', time.perf_counter() - started)
+
+
+def server_timing_header(timings, total):
+    ms = lambda metric: timings.get(metric, 0.0) * 1000
+    return ', '.join([
+        f'db;dur={ms("db"):.1f};desc="{timings["statements"]} queries"',
+        f'render;dur={ms("render"):.1f}',
+        f'hash;dur={ms("hash"):.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
+
+
+def init_instrumentation(app, engine):
+    """Time SQL, template rendering and hashing per request.
+
+    Results go out as a Server-Timing header (when SERVER_TIMING is set),
+    as one JSON log line per request on the 'app.requests' logger and into
+    the metrics registry behind /admin/metrics.
+    Streamed bodies are timed only up to the start of the response.
+    """
+    instrument_engine(engine)
+    # 'app.requests' propagates to the app's logger; touching it here
+    # installs Flask's default stderr handler before the first request
+    app.logger.debug('Request instrumentation enabled')
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+    before_render_template.connect(_start_render, app)
+    template_rendered.connect(_end_render, app)
+
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        g.request_timings = {'statements': 0}
+
+    @app.after_request
+    def finish_request(response):
+        timings = g.pop('request_timings', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - g.pop('request_started')
+        if app.config.get('SERVER_TIMING'):
+            header = server_timing_header(timings, total)
+            existing = response.headers.get('Server-Timing')
+            response.headers['Server-Timing'] = f'{existing}, {header}' if existing else header
+        metrics = app.extensions.get('metrics')
+        if metrics is not None:
+            metrics.observe_request(request.endpoint, request.method, response.status_code, total,
+                                    timings['statements'], timings.get('db', 0.0), timings.get('hash', 0.0))
+        logger.info(json.dumps({
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'statements': timings['statements'],
+            'db_ms': round(timings.get('db', 0.0) * 1000, 2),
+            'render_ms': round(timings.get('render', 0.0) * 1000, 2),
+            'hash_ms': round(timings.get('hash', 0.0) * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }))
+        return response
@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from app import db, rollup, importer, recurring, forecast
+from app.models import Job, User
+
+logger = logging.getLogger('app.jobs')
+
+JOB_POLL_INTERVAL = 1.0
+
+# kind -> handler(**params), returning a JSON-serializable result
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(f):
+        JOB_HANDLERS[kind] = f
+        return f
+    return register
+
+
+def enqueue(kind, created_by=None, **params):
+    """Queue a job and commit, returning it; a worker picks it up later."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    job = Job(kind=kind, params=json.dumps(params), created_by=created_by)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def requeue_stale(stale_after=None):
+    """Queue running jobs again once they ran longer than stale_after seconds.
+
+    A worker killed mid-job never marks it done or failed; without this the
+    job stays 'running' forever. Handlers must therefore be safe to run
+    twice. Returns the number of jobs requeued.
+    """
+    if stale_after is None:
+        stale_after = current_app.config.get('JOB_STALE_AFTER', 0)
+    if not stale_after:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    requeued = db.session.execute(
+        update(Job).where(Job.status == 'running', Job.started_at < cutoff).values(
+            status='queued', started_at=None
+        )
+    ).rowcount
+    db.session.commit()
+    if requeued:
+        logger.warning('Requeued %d jobs running for over %ss', requeued, stale_after)
+    return requeued
+
+
+def claim_next():
+    """Atomically move the oldest queued job to running and return it.
+
+    The conditional UPDATE only succeeds for one claimant, so any number of
+    worker threads and processes can share the table; SQLite serializes
+    the writes. Stale running jobs are requeued first. Returns None when
+    nothing is queued.
+    """
+    requeue_stale()
+    while True:
+        job_id = db.session.query(Job.id).filter(Job.status == 'queued').order_by(Job.id).limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued').values(
+                status='running', started_at=datetime.utcnow()
+            )
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+
+
+def run_job(job):
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f'Unknown job kind {job.kind!r}')
+        result = handler(**json.loads(job.params))
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+        logger.exception('Job %s (%s) failed', job.id, job.kind)
+    else:
+        job = db.session.get(Job, job.id)
+        job.status = 'done'
+        job.result = json.dumps(result)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def run_pending(limit=None):
+    """Run queued jobs in this thread until none is left (or limit ran)."""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def work(threads=1, poll_interval=JOB_POLL_INTERVAL, stop=None):
+    """Run jobs on `threads` threads, polling the table while it is empty."""
+    app = current_app._get_current_object()
+    stop = stop or threading.Event()
+
+    def loop():
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    ran = run_pending()
+                except Exception:
+                    # e.g. the job table not migrated yet, or "database is
+                    # locked": back off and retry, never let the thread die
+                    current_app.logger.exception('Job worker loop failed, retrying')
+                    ran = 0
+                finally:
+                    db.session.remove()
+                if not ran:
+                    stop.wait(poll_interval)
+
+    workers = [threading.Thread(target=loop, name=f'job-worker-{i}', daemon=True) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+
+@job_handler('delete_user')
+def delete_user(user_id):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return {'deleted': False}
+    db.session.delete(user)
+    db.session.commit()
+    return {'deleted': True}
+
+
+@job_handler('rebuild_rollup')
+def rebuild_rollup(user_id=None):
+    rollup.rebuild(user_id)
+    return {'mismatches': len(rollup.verify(user_id))}
+
+
+@job_handler('materialize_recurring')
+def materialize_recurring(user_id=None):
+    return {'stored': recurring.materialize_due(user_id)}
+
+
+@job_handler('score_forecasts')
+def score_forecasts():
+    forecasts = forecast.score_all_users()
+    flagged = forecast.flagged(forecasts)
+    return {
+        'users': len(forecasts),
+        'over_budget': sum(category['over_budget'] for _, category in flagged),
+        'anomalies': sum(category['anomaly'] for _, category in flagged),
+        'flagged': [{'user_id': user_id, 'category_id': category['id']} for user_id, category in flagged],
+    }
+
+
+@job_handler('import_file')
+def import_file(user_id, path, fmt=None, filename='', remove=True):
+    try:
+        with open(path, 'rb') as stream:
+            rows = importer.open_rows(stream, fmt, filename or path)
+            return importer.import_transactions(user_id, rows, current_app.config.get('IMPORT_CATEGORY_RULES'))
+    finally:
+        if remove:
+            os.remove(path)
+
+
+@job_handler('backup')
+def backup(directory=None):
+    """Copy the SQLite database with the online backup API."""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        raise ValueError('Backups are only supported for SQLite databases')
+    directory = directory or current_app.config.get('BACKUP_DIR') or os.path.join(current_app.instance_path, 'backups')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"backup-{datetime.utcnow():%Y%m%d-%H%M%S}.db")
+    source = engine.raw_connection()
+    try:
+        target = sqlite3.connect(path)
+        try:
+            source.driver_connection.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    return {'path': path, 'bytes': os.path.getsize(path)}
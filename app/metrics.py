@@ -0,0 +1,237 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from flask import current_app
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _histogram(buckets):
+    # Non-cumulative bucket counts (the last one is +Inf), then sum and count
+    return {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+
+
+def _observe(histogram, buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            break
+    else:
+        i = len(buckets)
+    histogram['buckets'][i] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+
+def _empty_state():
+    return {'requests': {}, 'duration': {}, 'statements': {}, 'db_seconds': {}, 'hash': {}}
+
+
+class MetricsRegistry:
+    """Request metrics of this process, optionally shared through a directory.
+
+    Observing a request only updates in-memory counters. With a directory,
+    a daemon thread per process writes them to the process's own JSON file
+    every flush_interval seconds (and at exit) when they changed, and a
+    scrape sums the files of every process, including ones that have since
+    exited, so counters stay monotonic across worker restarts.
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0, cache=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._state = _empty_state()
+        self._pid = None
+        self._path = None
+        self._dirty = False
+        self._flush_lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def _own_state(self):
+        # Counters inherited through fork() belong to the parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = None
+            self._state = _empty_state()
+            if self.directory and self.flush_interval > 0:
+                # Threads do not survive fork(): start one per process
+                threading.Thread(target=self._flush_loop, daemon=True).start()
+        return self._state
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def observe_request(self, endpoint, method, status, duration, statements, db_seconds, hash_seconds):
+        endpoint = endpoint or 'none'
+        with self._lock:
+            state = self._own_state()
+            key = f'{endpoint}|{method}|{status}'
+            state['requests'][key] = state['requests'].get(key, 0) + 1
+            _observe(state['duration'].setdefault(endpoint, _histogram(LATENCY_BUCKETS)),
+                     LATENCY_BUCKETS, duration)
+            state['statements'][endpoint] = state['statements'].get(endpoint, 0) + statements
+            state['db_seconds'][endpoint] = state['db_seconds'].get(endpoint, 0.0) + db_seconds
+            if hash_seconds:
+                _observe(state['hash'].setdefault(endpoint, _histogram(HASH_BUCKETS)),
+                         HASH_BUCKETS, hash_seconds)
+            self._dirty = True
+        if self.directory and self.flush_interval <= 0:
+            self.flush()
+
+    def _snapshot(self):
+        with self._lock:
+            state = json.loads(json.dumps(self._own_state()))
+        # The cache counts its own hits; like the rest, they are per process
+        cache = self.cache
+        state['cache'] = {'hits': cache.hits, 'misses': cache.misses} if cache else {'hits': 0, 'misses': 0}
+        return state
+
+    def flush(self):
+        if not self.directory:
+            return
+        with self._flush_lock:
+            self._dirty = False
+            state = self._snapshot()
+            if self._path is None:
+                # pid plus a random suffix: a recycled pid must not overwrite
+                # (and so decrease) the counters of an exited worker
+                self._path = os.path.join(self.directory, f'metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+            tmp = f'{self._path}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self._path)
+
+    def collect(self):
+        """Sum the counters of every process into one state dict."""
+        states = [self._snapshot()]
+        if self.directory:
+            self.flush()
+            own = self._path
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as f:
+                        states.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return _merge(states)
+
+    def clear(self):
+        with self._lock:
+            self._state = _empty_state()
+            self._path = None
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json*')):
+                os.remove(path)
+
+
+def _merge(states):
+    merged = _empty_state()
+    merged['cache'] = {'hits': 0, 'misses': 0}
+    for state in states:
+        for name in ('requests', 'statements', 'db_seconds'):
+            for key, value in state[name].items():
+                merged[name][key] = merged[name].get(key, 0) + value
+        for name in ('duration', 'hash'):
+            for key, histogram in state[name].items():
+                target = merged[name].setdefault(key, {'buckets': [0] * len(histogram['buckets']), 'sum': 0.0, 'count': 0})
+                target['buckets'] = [a + b for a, b in zip(target['buckets'], histogram['buckets'])]
+                target['sum'] += histogram['sum']
+                target['count'] += histogram['count']
+        for key in ('hits', 'misses'):
+            merged['cache'][key] += state['cache'][key]
+    return merged
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name, label, histograms, buckets):
+    lines = []
+    for key, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(list(buckets) + ['+Inf'], histogram['buckets']):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label}="{_label(key)}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{_label(key)}"}} {histogram["sum"]}')
+        lines.append(f'{name}_count{{{label}="{_label(key)}"}} {histogram["count"]}')
+    return lines
+
+
+def render_prometheus(state):
+    """Render a collected state in the Prometheus text exposition format."""
+    lines = [
+        '# HELP budget_requests_total Requests served.',
+        '# TYPE budget_requests_total counter',
+    ]
+    for key, count in sorted(state['requests'].items()):
+        endpoint, method, status = key.split('|')
+        lines.append(f'budget_requests_total{{endpoint="{_label(endpoint)}",method="{method}",status="{status}"}} {count}')
+
+    lines += [
+        '# HELP budget_request_duration_seconds Request latency.',
+        '# TYPE budget_request_duration_seconds histogram',
+    ]
+    lines += _histogram_lines('budget_request_duration_seconds', 'endpoint', state['duration'], LATENCY_BUCKETS)
+
+    lines += [
+        '# HELP budget_sql_statements_total SQL statements executed while serving requests.',
+        '# TYPE budget_sql_statements_total counter',
+    ]
+    for endpoint, count in sorted(state['statements'].items()):
+        lines.append(f'budget_sql_statements_total{{endpoint="{_label(endpoint)}"}} {count}')
+
+    lines += [
+        '# HELP budget_db_seconds_total Time spent in SQL while serving requests.',
+        '# TYPE budget_db_seconds_total counter',
+    ]
+    for endpoint, seconds in sorted(state['db_seconds'].items()):
+        lines.append(f'budget_db_seconds_total{{endpoint="{_label(endpoint)}"}} {seconds}')
+
+    lines += [
+        '# HELP budget_password_hash_seconds Password hashing time per request that hashed.',
+        '# TYPE budget_password_hash_seconds histogram',
+    ]
+    lines += _histogram_lines('budget_password_hash_seconds', 'endpoint', state['hash'], HASH_BUCKETS)
+
+    hits, misses = state['cache']['hits'], state['cache']['misses']
+    lines += [
+        '# HELP budget_cache_hits_total Aggregate cache hits.',
+        '# TYPE budget_cache_hits_total counter',
+        f'budget_cache_hits_total {hits}',
+        '# HELP budget_cache_misses_total Aggregate cache misses.',
+        '# TYPE budget_cache_misses_total counter',
+        f'budget_cache_misses_total {misses}',
+        '# HELP budget_cache_hit_ratio Aggregate cache hits over lookups.',
+        '# TYPE budget_cache_hit_ratio gauge',
+        f'budget_cache_hit_ratio {hits / (hits + misses) if hits + misses else 0.0}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    directory = None
+    if app.config.get('METRICS_MULTIPROCESS'):
+        directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+    app.extensions['metrics'] = MetricsRegistry(
+        directory,
+        app.config.get('METRICS_FLUSH_INTERVAL', 1.0),
+        app.extensions.get('aggregate_cache')
+    )
+
+
+def get_metrics():
+    return current_app.extensions['metrics']
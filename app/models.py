@@ -1,7 +1,12 @@
 from app import db, login_manager
+from app.instrumentation import timed
+from app.passwords import get_hasher, HashingBusy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import session
 from datetime import datetime
+from sqlalchemy import event
+import hashlib
+import json
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,26 +15,93 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     is_approved = db.Column(db.Boolean, default=False)
     last_login = db.Column(db.DateTime)
-    categories = db.relationship('Category', backref='user', lazy=True)
-    transactions = db.relationship('Transaction', backref='user', lazy=True)
+    # Bumped on every credential change; sessions stamped with an older
+    # version are logged out
+    auth_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped in every transaction that writes the user's data; pages derive
+    # their ETag from it (see routes.conditional_get)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Children are removed by the database's ON DELETE CASCADE: deleting a
+    # user is one DELETE, without loading anything into the session.
+    # Write-only: the collections can be added to or queried with .select(),
+    # but never load every row by accident.
+    categories = db.relationship('Category', backref='user', lazy='write_only',
+                                 cascade='all, delete-orphan', passive_deletes=True)
+    transactions = db.relationship('Transaction', backref='user', lazy='write_only',
+                                   cascade='all, delete-orphan', passive_deletes=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        with timed('hash'):
+            self.password_hash = get_hasher().hash(password)
+        self.auth_version = (self.auth_version or 0) + 1
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        with timed('hash'):
+            return get_hasher().verify(self.password_hash, password)
+
+    def upgrade_password_hash(self, password):
+        """Rehash a verified password made with outdated hash parameters.
+
+        Returns whether the hash changed. auth_version stays: the password
+        itself is the same, so other sessions remain valid.
+        """
+        hasher = get_hasher()
+        if not hasher.needs_rehash(self.password_hash):
+            return False
+        try:
+            with timed('hash'):
+                self.password_hash = hasher.hash(password)
+        except HashingBusy:
+            # The login itself succeeded: upgrade at a quieter one
+            return False
+        return True
+
+    def identity(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'is_admin': self.is_admin,
+            'is_approved': self.is_approved,
+            'auth_version': self.auth_version
+        }
+
+class CachedUser(UserMixin):
+    """Read-only identity of the logged-in user, served from the cache.
+
+    Routes that modify the account must load the User model instead.
+    """
+
+    def __init__(self, identity):
+        self.id = identity['id']
+        self.username = identity['username']
+        self.is_admin = identity['is_admin']
+        self.is_approved = identity['is_approved']
+        self.auth_version = identity['auth_version']
+
+def _load_identity(user_id):
+    user = db.session.get(User, user_id)
+    return user.identity() if user else None
 
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    from app.cache import cached
+
+    identity = cached(int(id), ('identity',), lambda: _load_identity(int(id)))
+    if identity is None or not identity['is_approved']:
+        return None
+    # A password change elsewhere invalidates this session
+    if session.get('_auth_version') != identity['auth_version']:
+        return None
+    return CachedUser(identity)
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     color = db.Column(db.String(7), nullable=False, default="#ffffff")
     icon = db.Column(db.String(50), nullable=True, default="🏷️") 
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    transactions = db.relationship('Transaction', backref='category', lazy=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    # ON DELETE SET NULL turns a deleted category's transactions into Uncategorized
+    transactions = db.relationship('Transaction', backref='category', lazy='write_only', passive_deletes=True)
     
     # Ensure name is unique per user
     __table_args__ = (db.UniqueConstraint('name', 'user_id', name='_category_user_uc'),)
@@ -49,8 +121,24 @@ class Transaction(db.Model):
     description = db.Column(db.String(100))
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     type = db.Column(db.String(10), nullable=False) # 'income' or 'expense'
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id', ondelete='SET NULL'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    # Hash of (date, amount, description) used to skip duplicate imports
+    dedupe_key = db.Column(db.String(40))
+
+    # Month filters are half-open date ranges, so these indexes serve the
+    # dashboard/budget/stats lookups without scanning the whole history.
+    __table_args__ = (
+        db.Index('ix_transaction_user_type_date', 'user_id', 'type', 'date'),
+        db.Index('ix_transaction_category_date', 'category_id', 'date'),
+        db.Index('ix_transaction_user_date', 'user_id', 'date'),
+        db.Index('ix_transaction_user_dedupe_key', 'user_id', 'dedupe_key'),
+    )
+
+    @staticmethod
+    def make_dedupe_key(date, amount, description):
+        raw = f"{date.isoformat()}|{amount:.2f}|{(description or '').strip().lower()}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
 
     def to_dict(self):
         return {
@@ -66,13 +154,22 @@ class Transaction(db.Model):
             'user_id': self.user_id
         }
 
+@event.listens_for(Transaction, 'before_insert')
+@event.listens_for(Transaction, 'before_update')
+def _set_dedupe_key(mapper, connection, target):
+    if target.date is None:
+        target.date = datetime.utcnow()
+    target.dedupe_key = Transaction.make_dedupe_key(target.date, target.amount, target.description)
+
 class Budget(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
     month = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
-    category = db.relationship('Category', backref='budgets', lazy=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id', ondelete='CASCADE'), nullable=False)
+    # Joined: a budget is never used without its category's name
+    category = db.relationship('Category', lazy='joined', innerjoin=True, backref=db.backref(
+        'budgets', lazy='write_only', cascade='all, delete-orphan', passive_deletes=True))
 
     __table_args__ = (db.UniqueConstraint('category_id', 'month', 'year', name='_category_month_year_uc'),)
 
@@ -85,3 +182,100 @@ class Budget(db.Model):
             'category_id': self.category_id,
             'category_name': self.category.name
         }
+
+class MonthlyCategoryTotal(db.Model):
+    # Rollup of expense transactions per user/category/month, kept in sync
+    # by app.rollup in the same DB transaction as the writes.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    # Deleting a category first folds its rows into the NULL bucket
+    # (rollup.recategorize), so CASCADE only removes leftovers
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id', ondelete='CASCADE'), nullable=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category_id', 'year', 'month', name='_rollup_user_category_month_uc'),
+        db.Index('ix_rollup_category_month', 'category_id', 'year', 'month'),
+    )
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'category_id': self.category_id,
+            'year': self.year,
+            'month': self.month,
+            'total': self.total,
+            'count': self.count
+        }
+
+class Job(db.Model):
+    # Background work queued by requests and run by `flask jobs worker`
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(10), nullable=False, default='queued')
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    # Workers claim the oldest queued job
+    __table_args__ = (db.Index('ix_job_status_id', 'status', 'id'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': json.loads(self.params),
+            'status': self.status,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class RecurringRule(db.Model):
+    # A repeating transaction (rent, salary, subscriptions). Occurrences
+    # are computed on the fly by app.recurring; only the due ones are
+    # stored, as ordinary transactions, by recurring.materialize_due().
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id', ondelete='SET NULL'), nullable=True)
+    amount = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(100))
+    type = db.Column(db.String(10), nullable=False, default='expense')
+    frequency = db.Column(db.String(10), nullable=False)  # 'monthly' or 'weekly'
+    # Every `interval` months (on day `day`, clamped to short months) or
+    # weeks (on start_date's weekday), from start_date to end_date inclusive
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    day = db.Column(db.Integer)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date)
+    # First occurrence not stored yet; NULL once the rule has ended
+    next_due = db.Column(db.Date)
+    category = db.relationship('Category')
+
+    # Materialization looks up the rules that fell due
+    __table_args__ = (db.Index('ix_recurring_rule_user_next_due', 'user_id', 'next_due'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'category_id': self.category_id,
+            'amount': self.amount,
+            'description': self.description,
+            'type': self.type,
+            'frequency': self.frequency,
+            'interval': self.interval,
+            'day': self.day,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'next_due': self.next_due.isoformat() if self.next_due else None
+        }
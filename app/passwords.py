@@ -0,0 +1,90 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(ServiceUnavailable):
+    """Raised when a process already has its limit of requests hashing.
+
+    A 503 with Retry-After when it reaches Flask.
+    """
+    description = 'Too many sign-ins at once. Please try again in a moment.'
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a small per-process thread pool.
+
+    `method` is a werkzeug method string ('scrypt:32768:8:1',
+    'pbkdf2:sha256:600000', ...). At most `threads` hashes run at once in
+    a process; the calling request thread waits for its result. Hashing is
+    CPU and (for scrypt) memory heavy, and a waiting request still holds
+    its worker thread, so at most `max_pending` requests per process may
+    hash or wait for the pool at once: any more are refused straight away
+    with HashingBusy instead of queueing. With `max_pending` below the
+    worker's request threads, a login spike always leaves some of them to
+    serve pages. 0 lifts the limit.
+    """
+
+    def __init__(self, method, threads=2, max_pending=2):
+        self.method = method
+        self.threads = threads
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = None
+        self._pid = None
+        self._prefix = None
+
+    def _process_state(self):
+        # Neither pool threads nor a semaphore held at fork time survive
+        # fork(): each process starts its own
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix='password-hash') \
+                    if self.threads > 0 else None
+                self._pending = threading.BoundedSemaphore(self.max_pending) if self.max_pending > 0 else None
+            return self._pool, self._pending
+
+    def _run(self, fn, *args, **kwargs):
+        pool, pending = self._process_state()
+        if pending is not None and not pending.acquire(blocking=False):
+            raise HashingBusy(retry_after=1)
+        try:
+            if pool is None:
+                return fn(*args, **kwargs)
+            return pool.submit(fn, *args, **kwargs).result()
+        finally:
+            if pending is not None:
+                pending.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, method=self.method)
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with other than the configured parameters."""
+        if self._prefix is None:
+            # The method as werkzeug stores it, with defaults filled in
+            # ('scrypt' -> 'scrypt:32768:8:1'); computed on first use, not at boot
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return not password_hash or password_hash.split('$', 1)[0] != self._prefix
+
+
+def init_passwords(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        app.config.get('PASSWORD_HASH_THREADS', 2),
+        app.config.get('PASSWORD_HASH_MAX_PENDING', 2)
+    )
+
+
+def get_hasher():
+    return current_app.extensions['password_hasher']
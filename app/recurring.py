@@ -0,0 +1,166 @@
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, update
+from sqlalchemy.orm import joinedload
+from app import db, rollup
+from app.cache import mark_user_dirty
+from app.models import RecurringRule, Transaction
+
+RECURRING_FREQUENCIES = ('monthly', 'weekly')
+# Every ten years for monthly rules, a little over two years for weekly ones
+RECURRING_MAX_INTERVAL = 120
+
+
+def _month_day(year, month, day):
+    # Day N of a month, clamped: "monthly on the 31st" is the 30th in April
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def occurrences(rule, start, end):
+    """Dates of a rule's occurrences in [start, end), oldest first.
+
+    Computed from the rule's start: the first occurrence in the window is
+    found arithmetically and only actual occurrences are stepped through,
+    never every day of the window.
+    """
+    first = max(start, rule.start_date)
+    last = end - timedelta(days=1)
+    if rule.end_date is not None:
+        last = min(last, rule.end_date)
+    if first > last:
+        return []
+
+    dates = []
+    if rule.frequency == 'weekly':
+        step = timedelta(weeks=rule.interval)
+        # Round up to the first occurrence on or after `first`
+        k = -(-(first - rule.start_date).days // step.days)
+        day = rule.start_date + k * step
+        while day <= last:
+            dates.append(day)
+            day += step
+        return dates
+
+    day_of_month = rule.day or rule.start_date.day
+    start_index = rule.start_date.year * 12 + rule.start_date.month - 1
+    offset = first.year * 12 + first.month - 1 - start_index
+    index = start_index + -(-offset // rule.interval) * rule.interval
+    # The first candidate month may hold an occurrence just before `first`
+    # (and the rule's own first month one before start_date): skip it
+    if _month_day(index // 12, index % 12 + 1, day_of_month) < first:
+        index += rule.interval
+    while True:
+        day = _month_day(index // 12, index % 12 + 1, day_of_month)
+        if day > last:
+            return dates
+        dates.append(day)
+        index += rule.interval
+
+
+def horizon(frequency, interval):
+    """A span from any date that always holds a rule's next occurrence.
+
+    Expanding a rule steps up to one more interval past it, so rules are
+    only accepted with dates at least two horizons short of date.max.
+    """
+    step = timedelta(weeks=interval) if frequency == 'weekly' else timedelta(days=31 * interval)
+    return step + timedelta(days=1)
+
+
+def next_occurrence(rule, after):
+    """First occurrence on or after `after`, None when the rule has ended."""
+    dates = occurrences(rule, after, after + horizon(rule.frequency, rule.interval))
+    return dates[0] if dates else None
+
+
+def expand(rules, start, end):
+    """Occurrences of rules in [start, end) not stored yet, ordered by date.
+
+    One pass over the rules, each expanded from its next_due. Occurrences
+    are JSON-friendly dicts shaped like transaction rows, so they can be
+    cached and listed next to real transactions.
+    """
+    items = []
+    for rule in rules:
+        if rule.next_due is None:
+            continue
+        category = rule.category
+        for day in occurrences(rule, max(start, rule.next_due), end):
+            items.append({
+                'rule_id': rule.id,
+                'date': day.isoformat(),
+                'amount': rule.amount,
+                'description': rule.description,
+                'type': rule.type,
+                'category_id': rule.category_id,
+                'category_name': category.name if category else 'Uncategorized',
+                'category_color': category.color if category else '#000000',
+                'category_icon': category.icon if category and category.icon else '🏷️'
+            })
+    items.sort(key=lambda item: (item['date'], item['rule_id']))
+    return items
+
+
+def scheduled(user_id, start, end):
+    """A user's occurrences in [start, end) that are not transactions yet."""
+    rules = RecurringRule.query.options(joinedload(RecurringRule.category)).filter(
+        RecurringRule.user_id == user_id,
+        RecurringRule.next_due < end
+    ).all()
+    return expand(rules, start, end)
+
+
+def materialize_due(user_id=None, today=None):
+    """Store every occurrence due by today as a transaction, in bulk.
+
+    Each due rule is claimed by moving next_due forward with a conditional
+    UPDATE, so concurrent callers (two logins, the cron job) never store an
+    occurrence twice. The occurrences of all claimed rules then go in with
+    one Core executemany, with the rollup and cache kept in step. Returns
+    the number of transactions stored.
+    """
+    today = today or date.today()
+    end = today + timedelta(days=1)
+    query = RecurringRule.query.filter(RecurringRule.next_due <= today)
+    if user_id is not None:
+        query = query.filter(RecurringRule.user_id == user_id)
+    due = [(rule.id, rule.user_id, rule.category_id, rule.amount, rule.description, rule.type,
+            rule.next_due, occurrences(rule, rule.next_due, end), next_occurrence(rule, end))
+           for rule in query.all()]
+
+    rows = []
+    deltas = defaultdict(lambda: [0.0, 0])
+    users = set()
+    for rule_id, owner, category_id, amount, description, type, next_due, dates, following in due:
+        claimed = db.session.execute(
+            update(RecurringRule).where(RecurringRule.id == rule_id, RecurringRule.next_due == next_due)
+            .values(next_due=following).execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            continue
+        users.add(owner)
+        for day in dates:
+            when = datetime.combine(day, datetime.min.time())
+            rows.append({
+                'amount': amount,
+                'description': description,
+                'date': when,
+                'type': type,
+                'category_id': category_id,
+                'user_id': owner,
+                'dedupe_key': Transaction.make_dedupe_key(when, amount, description)
+            })
+            if type == 'expense':
+                delta = deltas[(owner, category_id, day.year, day.month)]
+                delta[0] += amount
+                delta[1] += 1
+
+    if rows:
+        # Core inserts bypass the flush hooks: keep rollup and cache in step
+        db.session.execute(insert(Transaction.__table__), rows)
+        rollup.apply_deltas(db.session.connection(), deltas)
+    for owner in users:
+        mark_user_dirty(db.session, owner)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,151 @@
+from collections import defaultdict
+from app import db
+from app.models import Transaction, MonthlyCategoryTotal
+from sqlalchemy import event, func, and_, select, insert, update, delete
+from sqlalchemy.orm import attributes
+
+rollup_table = MonthlyCategoryTotal.__table__
+
+TRACKED_ATTRS = ('user_id', 'category_id', 'date', 'type', 'amount')
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the replaced value on assignment, even when the attribute was expired,
+# so the flush hook can subtract the old contribution.
+for _attr in TRACKED_ATTRS:
+    event.listen(getattr(Transaction, _attr), 'set', _load_previous_value, active_history=True)
+
+
+def _key_filter(user_id, category_id, year, month):
+    c = rollup_table.c
+    category_filter = c.category_id.is_(None) if category_id is None else c.category_id == category_id
+    return and_(c.user_id == user_id, category_filter, c.year == year, c.month == month)
+
+
+def apply_deltas(connection, deltas):
+    """Add {(user_id, category_id, year, month): [total, count]} to the rollup."""
+    c = rollup_table.c
+    for (user_id, category_id, year, month), (total, count) in deltas.items():
+        if not total and not count:
+            continue
+        where = _key_filter(user_id, category_id, year, month)
+        result = connection.execute(
+            update(rollup_table).where(where).values(total=c.total + total, count=c.count + count)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(rollup_table).values(
+                user_id=user_id, category_id=category_id, year=year, month=month,
+                total=total, count=count
+            ))
+        elif count < 0:
+            # Drop buckets that no longer hold any transaction
+            connection.execute(delete(rollup_table).where(where, c.count <= 0))
+
+
+def _values(obj, committed):
+    values = []
+    for attr in TRACKED_ATTRS:
+        history = attributes.get_history(obj, attr)
+        if committed and history.deleted:
+            values.append(history.deleted[0])
+        else:
+            values.append(getattr(obj, attr))
+    return values
+
+
+def _add(deltas, values, sign):
+    user_id, category_id, when, type, amount = values
+    if type != 'expense' or when is None:
+        return
+    delta = deltas[(user_id, category_id, when.year, when.month)]
+    delta[0] += sign * amount
+    delta[1] += sign
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_rollup(session, flush_context):
+    # In after_flush new/dirty/deleted and attribute history still describe
+    # the pre-flush state, while generated values (ids, default dates) are set.
+    deltas = defaultdict(lambda: [0.0, 0])
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            _add(deltas, _values(obj, committed=False), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            _add(deltas, _values(obj, committed=True), -1)
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj):
+            _add(deltas, _values(obj, committed=True), -1)
+            _add(deltas, _values(obj, committed=False), 1)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def recategorize(category_id, new_category_id=None):
+    # Mirror a bulk Transaction.category_id update, which bypasses the flush hook
+    deltas = defaultdict(lambda: [0.0, 0])
+    rows = MonthlyCategoryTotal.query.filter_by(category_id=category_id).all()
+    for row in rows:
+        delta = deltas[(row.user_id, new_category_id, row.year, row.month)]
+        delta[0] += row.total
+        delta[1] += row.count
+    MonthlyCategoryTotal.query.filter_by(category_id=category_id).delete()
+    apply_deltas(db.session.connection(), deltas)
+
+
+def _raw_totals(user_id=None):
+    year = func.extract('year', Transaction.date)
+    month = func.extract('month', Transaction.date)
+    stmt = select(
+        Transaction.user_id,
+        Transaction.category_id,
+        year,
+        month,
+        func.sum(Transaction.amount),
+        func.count(Transaction.id)
+    ).where(Transaction.type == 'expense').group_by(
+        Transaction.user_id, Transaction.category_id, year, month
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+    return stmt
+
+
+def rebuild(user_id=None):
+    """Recompute the rollup from raw transactions with one INSERT ... SELECT."""
+    c = rollup_table.c
+    stmt = delete(rollup_table)
+    if user_id is not None:
+        stmt = stmt.where(c.user_id == user_id)
+    db.session.execute(stmt)
+    db.session.execute(insert(rollup_table).from_select(
+        [c.user_id, c.category_id, c.year, c.month, c.total, c.count],
+        _raw_totals(user_id)
+    ))
+    db.session.commit()
+
+
+def verify(user_id=None, tolerance=1e-6):
+    """Compare the rollup with the raw transactions, return the mismatches."""
+    query = MonthlyCategoryTotal.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    stored = {
+        (r.user_id, r.category_id, r.year, r.month): (r.total, r.count)
+        for r in query
+    }
+
+    mismatches = []
+    result = db.session.execute(_raw_totals(user_id).execution_options(yield_per=1000))
+    for user, category, year, month, total, count in result:
+        key = (user, category, int(year), int(month))
+        actual = stored.pop(key, (0.0, 0))
+        if actual[1] != count or abs(actual[0] - total) > tolerance:
+            mismatches.append((key, (total, count), actual))
+    for key, actual in stored.items():
+        if actual[1] or abs(actual[0]) > tolerance:
+            mismatches.append((key, (0.0, 0), actual))
+    return mismatches
@@ -1,14 +1,114 @@
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify, flash
-from app import db
-from app.models import Category, Transaction, Budget, User
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, jsonify, flash, current_app, session,
+    Response, stream_with_context
+)
+from app import db, rollup, importer, exporter, jobs, recurring, forecast
+from app.search import parse_search_args, search_transactions
+from app.models import Category, Transaction, User, Job, RecurringRule
+from app.cache import cached, get_cache
+from app.metrics import get_metrics, render_prometheus
+from app.services import (
+    get_budget_progress, get_budget_form, month_range, get_transactions_page, get_spending_series, default_stats_range,
+    get_budget_year, save_budgets, copy_budget_month, previous_month, next_months, get_user_directory,
+    transaction_rows, transaction_row_to_dict,
+    HISTORY_PAGE_SIZE, STATS_PERIOD_FORMATS, BUDGET_COPY_MAX_MONTHS
+)
 from flask_login import login_user, logout_user, login_required, current_user
-from datetime import datetime, timedelta, date
-from sqlalchemy import func
+from datetime import datetime, date, MINYEAR, MAXYEAR
+from sqlalchemy.orm import joinedload
 from functools import wraps
+from werkzeug.utils import secure_filename
+import hashlib
+import os
+import uuid
 from flask import abort
 
 bp = Blueprint('main', __name__)
 
+def scheduled_between(start, end):
+    """Recurring occurrences of the current user in [start, end) not stored yet.
+
+    Occurrences that already fell due are stored first, so they show up as
+    real transactions.
+    """
+    compute = lambda: recurring.scheduled(current_user.id, start, end)
+    items = cached(current_user.id, ('scheduled', start, end), compute)
+    if items and items[0]['date'] <= date.today().isoformat():
+        recurring.materialize_due(current_user.id)
+        items = cached(current_user.id, ('scheduled', start, end), compute)
+    return items
+
+def selected_period(values, today):
+    """(month, year) picked in request values, today's by default.
+
+    Raises ValueError when either is not a number or out of range: a month
+    must lie in 1-12, and month_range needs the month after it to be a
+    valid date too.
+    """
+    month = int(values.get('month', today.month))
+    year = int(values.get('year', today.year))
+    if not (1 <= month <= 12 and MINYEAR <= year < MAXYEAR):
+        raise ValueError('Month out of range')
+    return month, year
+
+def _code_digest():
+    # Digest of the app package (code, templates, static files): identical
+    # in every worker of a deploy, different after any change to it
+    digest = hashlib.sha1()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for directory, dirnames, filenames in sorted(os.walk(root)):
+        dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            digest.update(os.path.relpath(path, root).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+@bp.record_once
+def _init_page_version(state):
+    state.app.extensions['page_version'] = state.app.config.get('APP_VERSION') or _code_digest()
+
+def conditional_get(f):
+    """Answer GETs with 304 Not Modified while the user's data is unchanged.
+
+    The weak ETag combines the user's data version, read from the database
+    with one primary key lookup so writes made by any process count, today's
+    date, which pages default to, and the deployed version of the app. A
+    match returns before the view runs any aggregate query or render.
+    Pages carrying a flashed message are always rendered.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != 'GET' or session.get('_flashes'):
+            return f(*args, **kwargs)
+        data_version = db.session.execute(
+            db.select(User.data_version).where(User.id == current_user.id)
+        ).scalar()
+        etag = '-'.join([str(current_user.id), str(data_version), f'{date.today():%Y%m%d}',
+                         current_app.extensions['page_version']])
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # Revalidate on every use, and only in the user's own browser
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
+def forecast_for(user_id, today):
+    return cached(user_id, ('forecast', today), lambda: forecast.get_forecast(user_id, today))
+
+def start_session(user):
+    # Stamp the session with the credential version and prime the identity
+    # cache, so following requests need no user query at all.
+    login_user(user)
+    session['_auth_version'] = user.auth_version
+    get_cache().set(user.id, ('identity',), user.identity())
+
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -26,8 +126,12 @@ def login():
             error = 'Account pending approval. Please contact the administrator.'
         else:
             user.last_login = datetime.utcnow()
+            # Hashes from before a PASSWORD_HASH_METHOD change are upgraded
+            # now, while the plain password is at hand
+            user.upgrade_password_hash(password)
             db.session.commit()
-            login_user(user)
+            recurring.materialize_due(user.id)
+            start_session(user)
             return redirect(url_for('main.index'))
             
     return render_template('login.html', error=error)
@@ -67,7 +171,7 @@ def register():
             db.session.commit()
             
             if is_first_user:
-                login_user(user)
+                start_session(user)
                 return redirect(url_for('main.index'))
             else:
                 flash('Registration successful. Please wait for admin approval.', 'info')
@@ -92,8 +196,47 @@ def admin_required(f):
 @login_required
 @admin_required
 def admin_dashboard():
-    users = User.query.all()
-    return render_template('admin_dashboard.html', users=users)
+    q = request.args.get('q', '').strip()
+    status = request.args.get('status', 'all')
+    try:
+        users, next_cursor = get_user_directory(q, status, after=request.args.get('after'))
+    except ValueError:
+        abort(400)
+    return render_template('admin_dashboard.html', users=users, next_cursor=next_cursor, q=q, status=status)
+
+@bp.route('/admin/cache')
+@login_required
+@admin_required
+def cache_stats():
+    return jsonify(get_cache().stats())
+
+@bp.route('/admin/metrics')
+@login_required
+@admin_required
+def metrics():
+    return Response(render_prometheus(get_metrics().collect()), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/admin/rollup/rebuild', methods=['POST'])
+@login_required
+@admin_required
+def rebuild_rollup():
+    job = jobs.enqueue('rebuild_rollup', created_by=current_user.id)
+    flash(f'Rollup rebuild queued (job {job.id}).', 'success')
+    return redirect(url_for('main.admin_dashboard'))
+
+@bp.route('/admin/backup', methods=['POST'])
+@login_required
+@admin_required
+def backup():
+    job = jobs.enqueue('backup', created_by=current_user.id)
+    flash(f'Backup queued (job {job.id}).', 'success')
+    return redirect(url_for('main.admin_dashboard'))
+
+@bp.route('/admin/jobs/<int:job_id>')
+@login_required
+@admin_required
+def job_status(job_id):
+    return jsonify(db.get_or_404(Job, job_id).to_dict())
 
 @bp.route('/admin/approve/<int:user_id>')
 @login_required
@@ -128,26 +271,11 @@ def delete_user(user_id):
         return redirect(url_for('main.admin_dashboard'))
     
     user = User.query.get_or_404(user_id)
-    
-    # Delete related data first
-    Category.query.filter_by(user_id=user.id).delete()
-    Transaction.query.filter_by(user_id=user.id).delete()
-    Budget.query.filter_by(user_id=user.id).delete() # If budget has user_id, or join?
-    # Budget doesn't have user_id directly, it links to Category.
-    # But since we deleted Categories, Budgets might violate foreign key if not cascade?
-    # Budget links to Category. If we delete Category, what happens to Budget?
-    # Let's check model. Models usually cascade or we delete manual.
-    # Category model: categories = db.relationship('Category', backref='user', lazy=True)
-    # Budget model: category_id. 
-    # Let's clean up properly.
-    # Find all categories for user
-    cats = Category.query.filter_by(user_id=user.id).all()
-    for c in cats:
-        Budget.query.filter_by(category_id=c.id).delete()
-        
-    db.session.delete(user)
+    # Lock the account out now; the purge itself runs on a job worker
+    user.is_approved = False
     db.session.commit()
-    flash(f'User {user.username} deleted.', 'success')
+    job = jobs.enqueue('delete_user', created_by=current_user.id, user_id=user.id)
+    flash(f'Deletion of {user.username} queued (job {job.id}).', 'success')
     return redirect(url_for('main.admin_dashboard'))
 
 @bp.route('/admin/toggle_admin/<int:user_id>')
@@ -173,13 +301,16 @@ def change_password():
         new_password = request.form.get('new_password')
         confirm_password = request.form.get('confirm_password')
 
-        if not current_user.check_password(current_password):
+        user = db.session.get(User, current_user.id)
+        if not user.check_password(current_password):
             flash('Invalid current password', 'error')
         elif new_password != confirm_password:
             flash('New passwords do not match', 'error')
         else:
-            current_user.set_password(new_password)
+            # Bumps auth_version: every other session of this user ends
+            user.set_password(new_password)
             db.session.commit()
+            session['_auth_version'] = user.auth_version
             flash('Password updated successfully', 'success')
             return redirect(url_for('main.index'))
     
@@ -187,57 +318,38 @@ def change_password():
 
 @bp.route('/')
 @login_required
-
+@conditional_get
 def index():
     # Helper to get period from query params or default to today
     today = date.today()
     try:
-        selected_month = int(request.args.get('month', today.month))
-        selected_year = int(request.args.get('year', today.year))
+        selected_month, selected_year = selected_period(request.args, today)
     except ValueError:
         selected_month = today.month
         selected_year = today.year
         
-    # Budget Progress Logic for SELECTED PERIOD
-    categories = Category.query.filter_by(user_id=current_user.id).all()
-    budget_data = []
-    
-    for cat in categories:
-        # Get budget for this category for selected month
-        budget = Budget.query.filter_by(
-            category_id=cat.id, 
-            month=selected_month, 
-            year=selected_year
-        ).first()
-        
-        limit = budget.amount if budget else 0
-        
-        # Calculate spent for this category this month
-        spent = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.category_id == cat.id,
-            Transaction.type == 'expense',
-            Transaction.user_id == current_user.id,
-            func.extract('month', Transaction.date) == selected_month,
-            func.extract('year', Transaction.date) == selected_year
-        ).scalar() or 0
-        
-        available = limit - spent
-        
-        budget_data.append({
-            'name': cat.name,
-            'color': cat.color,
-            'icon': cat.icon,
-            'limit': limit,
-            'spent': spent,
-            'available': available,
-            'percent': (spent / limit * 100) if limit > 0 else 0
-        })
+    # Stores recurring occurrences that fell due, before anything is read
+    month_start, month_end = month_range(selected_month, selected_year)
+    scheduled = scheduled_between(month_start.date(), month_end.date())
+
+    # Budget Progress Logic for SELECTED PERIOD (single grouped query)
+    budget_data = cached(
+        current_user.id, ('progress', selected_month, selected_year),
+        lambda: get_budget_progress(current_user.id, selected_month, selected_year)
+    )
+
+    # Month-end forecast, only meaningful while the month is running
+    projections = {}
+    if (selected_month, selected_year) == (today.month, today.year):
+        projections = {item['id']: item for item in forecast_for(current_user.id, today)['categories']}
 
     # Recent transactions should arguably filtered or just last 5 global? 
     # Usually "Recent" means global recent. Let's keep it global recent for now or filter?
     # User might want to see transactions for that month. Let's show recent for that month if filtered, else global?
     # Simple approach: "Recent Activity" is usually timeline. Let's keep it global for now to avoid confusion.
-    recent_transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).limit(5).all()
+    recent_transactions = transaction_rows().filter(
+        Transaction.user_id == current_user.id
+    ).order_by(Transaction.date.desc()).limit(5).all()
     
     # Calculate Monthly Overview (Total Limit vs Total Spent for selected period)
     total_monthly_limit = sum(item['limit'] for item in budget_data)
@@ -247,7 +359,9 @@ def index():
     return render_template(
         'index.html', 
         transactions=recent_transactions, 
+        scheduled=scheduled,
         budget_data=budget_data, 
+        projections=projections,
         user=current_user,
         selected_month=selected_month,
         selected_year=selected_year,
@@ -280,12 +394,97 @@ def add_transaction():
     categories = Category.query.filter_by(user_id=current_user.id).all()
     return render_template('add_expense.html', categories=categories)
 
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_transactions():
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Please choose a file to import.', 'error')
+            return redirect(url_for('main.import_transactions'))
+        fmt = request.form.get('format') or None
+        if (request.content_length or 0) > current_app.config.get('IMPORT_INLINE_MAX_BYTES', 0):
+            # Too large to import within the request timeout: park the file
+            # for a job worker
+            directory = current_app.config.get('IMPORT_UPLOAD_DIR') or os.path.join(current_app.instance_path, 'uploads')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'{uuid.uuid4().hex}-{secure_filename(upload.filename)}')
+            upload.save(path)
+            jobs.enqueue('import_file', created_by=current_user.id, user_id=current_user.id,
+                         path=path, fmt=fmt, filename=upload.filename)
+            flash('Large file: the import was queued and will appear in your history shortly.', 'success')
+            return redirect(url_for('main.history'))
+        try:
+            rows = importer.open_rows(upload.stream, fmt, upload.filename)
+            result = importer.import_transactions(
+                current_user.id, rows, current_app.config.get('IMPORT_CATEGORY_RULES')
+            )
+        except importer.ImportFormatError as e:
+            db.session.rollback()
+            flash(f'Import failed: {e}', 'error')
+            return redirect(url_for('main.import_transactions'))
+        flash(f"Imported {result['imported']} transactions, skipped {result['duplicates']} duplicates.", 'success')
+        return redirect(url_for('main.history'))
+
+    return render_template('import.html')
+
 @bp.route('/history')
 @login_required
+@conditional_get
 def history():
-    transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).all()
-    transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).all()
-    return render_template('history.html', transactions=transactions)
+    next_cursor = next_page_url = None
+    scheduled = []
+    try:
+        search = parse_search_args(request.args)
+        if search:
+            transactions, has_next = search_transactions(current_user.id, **search)
+            if has_next:
+                next_page_url = url_for('main.history', **dict(request.args.to_dict(), page=search['page'] + 1))
+        else:
+            if not request.args.get('before'):
+                # Upcoming recurring transactions of this month head the first page
+                month_start, month_end = month_range(date.today().month, date.today().year)
+                scheduled = scheduled_between(month_start.date(), month_end.date())
+            transactions, next_cursor = get_transactions_page(current_user.id, before=request.args.get('before'))
+    except (ValueError, OverflowError):
+        # Malformed filters, or numbers too large for SQLite
+        abort(400)
+    categories = Category.query.filter_by(user_id=current_user.id).order_by(Category.name).all()
+    return render_template('history.html', transactions=transactions, next_cursor=next_cursor, scheduled=scheduled,
+                           search=search, next_page_url=next_page_url, categories=categories)
+
+@bp.route('/api/transactions')
+@login_required
+def api_transactions():
+    try:
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        transactions, next_cursor = get_transactions_page(
+            current_user.id, before=request.args.get('before'), limit=limit
+        )
+    except ValueError:
+        abort(400)
+    return jsonify({
+        'transactions': [transaction_row_to_dict(t) for t in transactions],
+        'next_cursor': next_cursor
+    })
+
+@bp.route('/export.csv')
+@login_required
+def export_csv():
+    return Response(
+        stream_with_context(exporter.iter_csv(current_user.id)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=transactions.csv'}
+    )
+
+@bp.route('/export.jsonl')
+@login_required
+def export_jsonl():
+    return Response(
+        stream_with_context(exporter.iter_jsonl(current_user.id)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=transactions.jsonl'}
+    )
 
 @bp.route('/transactions/<int:id>/delete')
 @login_required
@@ -301,25 +500,25 @@ def delete_transaction(id):
 
 @bp.route('/api/stats/<period>')
 @login_required
+@conditional_get
 def stats(period):
-    data = db.session.query(
-        Category.name, 
-        Category.color, 
-        func.sum(Transaction.amount)
-    ).join(Transaction).filter(
-        Transaction.type == 'expense',
-        Transaction.user_id == current_user.id
-    ).group_by(Category.id).all()
-    
-    labels = [d[0] for d in data]
-    colors = [d[1] for d in data]
-    values = [d[2] for d in data]
+    # Bucketed spending over an inclusive ?from=YYYY-MM-DD&to=YYYY-MM-DD range
+    if period not in STATS_PERIOD_FORMATS:
+        abort(400)
+    try:
+        start, end = default_stats_range(period)
+        if request.args.get('from'):
+            start = date.fromisoformat(request.args['from'])
+        if request.args.get('to'):
+            end = date.fromisoformat(request.args['to'])
+        data = cached(
+            current_user.id, ('stats', period, start, end),
+            lambda: get_spending_series(current_user.id, period, start, end)
+        )
+    except (ValueError, OverflowError):
+        abort(400)
     
-    return jsonify({
-        'labels': labels,
-        'colors': colors,
-        'data': values
-    })
+    return jsonify(data)
 
 @bp.route('/budgets/copy', methods=['POST'])
 @login_required
@@ -327,137 +526,76 @@ def copy_budgets():
     # Helper to calculate previous month from today
     today = date.today()
     
-    # Get target month/year from form data
+    # Get target month/year from form data; never write to a made-up month
     try:
-        target_month = int(request.form.get('month', today.month))
-        target_year = int(request.form.get('year', today.year))
+        target_month, target_year = selected_period(request.form, today)
     except ValueError:
-        target_month = today.month
-        target_year = today.year
-
-    # Calculate previous month relative to TARGET month
-    prev_month = target_month - 1
-    prev_year = target_year
-    if prev_month == 0:
-        prev_month = 12
-        prev_year -= 1
-        
-    # Get previous budgets
-    prev_budgets = Budget.query.filter_by(
-        month=prev_month,
-        year=prev_year
-    ).join(Category).filter(Category.user_id == current_user.id).all()
-    
-    if not prev_budgets:
-        flash('No budgets found in previous month to copy.')
-        return redirect(url_for('main.manage_budgets', month=target_month, year=target_year))
-        
-    # Apply to current (target) month
-    for pb in prev_budgets:
-        # Check if budget already exists for target month
-        cb = Budget.query.filter_by(
-            category_id=pb.category_id,
-            month=target_month,
-            year=target_year
-        ).first()
-        
-        if not cb:
-            new_budget = Budget(
-                category_id=pb.category_id,
-                amount=pb.amount,
-                month=target_month,
-                year=target_year
-            )
-            db.session.add(new_budget)
-        else:
-            # Overwrite logic
-            cb.amount = pb.amount
-            
-    db.session.commit()
+        abort(400)
+
+    mode = request.form.get('mode', 'previous')
+    if mode == 'forward':
+        # Copy the selected month onto the following N months
+        try:
+            count = int(request.form.get('count', 1))
+        except ValueError:
+            count = 1
+        count = max(1, min(count, BUDGET_COPY_MAX_MONTHS))
+        targets = next_months(target_month, target_year, count)
+    elif mode == 'year':
+        # Copy the selected month onto the rest of its year
+        targets = next_months(target_month, target_year, 12 - target_month)
+    else:
+        targets = None
+
+    if targets is None:
+        prev_month, prev_year = previous_month(target_month, target_year)
+        if not copy_budget_month(current_user.id, prev_month, prev_year, [(target_month, target_year)]):
+            flash('No budgets found in previous month to copy.')
+    elif not targets:
+        flash('No months left in this year to copy to.')
+    elif not copy_budget_month(current_user.id, target_month, target_year, targets):
+        flash('No budgets found in this month to copy.')
+    else:
+        flash(f'Budgets copied to {len(targets)} months.', 'success')
     return redirect(url_for('main.manage_budgets', month=target_month, year=target_year))
 
 @bp.route('/budgets', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 def manage_budgets():
     today = date.today()
     
     # Get target month/year from query params or form data (default to current)
     try:
         if request.method == 'POST':
-            selected_month = int(request.form.get('month', today.month))
-            selected_year = int(request.form.get('year', today.year))
+            selected_month, selected_year = selected_period(request.form, today)
         else:
-            selected_month = int(request.args.get('month', today.month))
-            selected_year = int(request.args.get('year', today.year))
+            selected_month, selected_year = selected_period(request.args, today)
     except ValueError:
+        if request.method == 'POST':
+            # Saving to another month than the one asked for would be wrong
+            abort(400)
         selected_month = today.month
         selected_year = today.year
 
     if request.method == 'POST':
+        amounts = {}
         for key, value in request.form.items():
             if key.startswith('budget_'):
-                cat_id = int(key.split('_')[1])
-                # Ensure category belongs to user
-                cat = Category.query.get(cat_id)
-                if not cat or cat.user_id != current_user.id:
+                try:
+                    amounts[int(key.split('_')[1])] = float(value) if value else 0.0
+                except ValueError:
                     continue
-                    
-                amount = float(value) if value else 0.0
-                
-                budget = Budget.query.filter_by(
-                    category_id=cat_id,
-                    month=selected_month,
-                    year=selected_year
-                ).first()
-                
-                if budget:
-                    budget.amount = amount
-                else:
-                    budget = Budget(
-                        category_id=cat_id,
-                        amount=amount,
-                        month=selected_month,
-                        year=selected_year
-                    )
-                    db.session.add(budget)
-        
-        db.session.commit()
+        # Ownership check and upsert are one statement each, however many fields
+        save_budgets(current_user.id, selected_month, selected_year, amounts)
         # Redirect back to manage budgets for same period, or index? 
         return redirect(url_for('main.manage_budgets', month=selected_month, year=selected_year))
 
-    categories = Category.query.filter_by(user_id=current_user.id).all()
-    
-    # Logic to pre-fill from previous month if currently selected month is empty
-    current_month_budgets = Budget.query.filter_by(
-        month=selected_month, 
-        year=selected_year
-    ).join(Category).filter(Category.user_id==current_user.id).first()
-    
-    use_previous_month = False
-    
-    # Calculate previous month explicitly
-    prev_month = selected_month - 1
-    prev_year = selected_year
-    if prev_month == 0:
-        prev_month = 12
-        prev_year -= 1
-        
-    if not current_month_budgets:
-        use_previous_month = True
-        
-    categories_with_budgets = []
-    for cat in categories:
-        # Try to find budget for current month first
-        budget = Budget.query.filter_by(category_id=cat.id, month=selected_month, year=selected_year).first()
-        
-        # If no budget for current month and we decided to copy, try previous month
-        if not budget and use_previous_month:
-             budget = Budget.query.filter_by(category_id=cat.id, month=prev_month, year=prev_year).first()
-        
-        categories_with_budgets.append({
-            'category': cat,
-            'amount': budget.amount if budget else ''
-        })
+    # Pre-filled from the previous month when the selected month is empty
+    categories_with_budgets = cached(
+        current_user.id, ('budget_form', selected_month, selected_year),
+        lambda: get_budget_form(current_user.id, selected_month, selected_year)
+    )
         
     return render_template('budgets.html', 
                            items=categories_with_budgets, 
@@ -466,8 +604,40 @@ def manage_budgets():
                            selected_month=selected_month, 
                            selected_year=selected_year)
 
+@bp.route('/budgets/year')
+@login_required
+def budget_year():
+    today = date.today()
+    try:
+        selected_year = int(request.args.get('year', today.year))
+    except ValueError:
+        selected_year = today.year
+
+    matrix = cached(
+        current_user.id, ('budget_year', selected_year),
+        lambda: get_budget_year(current_user.id, selected_year)
+    )
+    return render_template('budget_year.html', matrix=matrix, today=today, date=date,
+                           selected_year=selected_year)
+
+@bp.route('/api/budgets/<int:year>')
+@login_required
+def budget_year_api(year):
+    # Dense categories x 12 months arrays of limits and spending
+    return jsonify(cached(
+        current_user.id, ('budget_year', year),
+        lambda: get_budget_year(current_user.id, year)
+    ))
+
+@bp.route('/api/forecast')
+@login_required
+def forecast_api():
+    # Month-end projection and anomaly flags of every category
+    return jsonify(forecast_for(current_user.id, date.today()))
+
 @bp.route('/categories')
 @login_required
+@conditional_get
 def categories():
     categories = Category.query.filter_by(user_id=current_user.id).all()
     return render_template('categories.html', categories=categories)
@@ -511,15 +681,74 @@ def delete_category(id):
     if cat.user_id != current_user.id:
         return redirect(url_for('main.categories'))
     
-    # Manually delete related budgets
-    Budget.query.filter_by(category_id=cat.id).delete()
-    
-    # Set transactions to null category (Uncategorized)
-    Transaction.query.filter_by(category_id=cat.id).update({Transaction.category_id: None})
-    
+    # Fold its rollup rows into Uncategorized; the DELETE then drops its
+    # budgets (CASCADE) and uncategorizes its transactions (SET NULL)
+    rollup.recategorize(cat.id, None)
     db.session.delete(cat)
     db.session.commit()
     return redirect(url_for('main.categories'))
 
+@bp.route('/recurring', methods=['GET', 'POST'])
+@login_required
+def recurring_rules():
+    categories = Category.query.filter_by(user_id=current_user.id).order_by(Category.name).all()
+    if request.method == 'POST':
+        try:
+            amount = float(request.form.get('amount'))
+            frequency = request.form.get('frequency', 'monthly')
+            interval = int(request.form.get('interval') or 1)
+            start_date = date.fromisoformat(request.form.get('start_date') or date.today().isoformat())
+            end_date = date.fromisoformat(request.form['end_date']) if request.form.get('end_date') else None
+            day = int(request.form.get('day') or start_date.day)
+            category_id = int(request.form['category']) if request.form.get('category') else None
+            if frequency not in recurring.RECURRING_FREQUENCIES or not 1 <= day <= 31 \
+                    or not 1 <= interval <= recurring.RECURRING_MAX_INTERVAL \
+                    or amount <= 0 or (end_date and end_date < start_date):
+                raise ValueError
+            if date.max - (end_date or start_date) < 2 * recurring.horizon(frequency, interval):
+                raise ValueError
+            if category_id is not None and category_id not in {c.id for c in categories}:
+                raise ValueError
+        except (TypeError, ValueError, OverflowError):
+            flash('Invalid recurring transaction.', 'error')
+            return redirect(url_for('main.recurring_rules'))
+
+        rule = RecurringRule(
+            user_id=current_user.id,
+            category_id=category_id,
+            amount=amount,
+            description=request.form.get('description'),
+            type='income' if request.form.get('type') == 'income' else 'expense',
+            frequency=frequency,
+            interval=interval,
+            day=day if frequency == 'monthly' else None,
+            start_date=start_date,
+            end_date=end_date
+        )
+        rule.next_due = recurring.next_occurrence(rule, start_date)
+        db.session.add(rule)
+        db.session.commit()
+        # A start date in the past backfills the occurrences due so far
+        stored = recurring.materialize_due(current_user.id)
+        flash(f'Recurring transaction added ({stored} past occurrences recorded).' if stored
+              else 'Recurring transaction added.', 'success')
+        return redirect(url_for('main.recurring_rules'))
+
+    rules = RecurringRule.query.options(joinedload(RecurringRule.category)).filter_by(
+        user_id=current_user.id
+    ).order_by(RecurringRule.next_due.is_(None), RecurringRule.next_due).all()
+    return render_template('recurring.html', rules=rules, categories=categories, today=date.today())
+
+@bp.route('/recurring/<int:id>/delete', methods=['POST'])
+@login_required
+def delete_recurring_rule(id):
+    rule = db.get_or_404(RecurringRule, id)
+    if rule.user_id == current_user.id:
+        # Transactions already recorded stay; only future occurrences go
+        db.session.delete(rule)
+        db.session.commit()
+        flash('Recurring transaction deleted.', 'success')
+    return redirect(url_for('main.recurring_rules'))
+
 
 
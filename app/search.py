@@ -0,0 +1,131 @@
+import re
+from datetime import date, datetime
+from sqlalchemy import event, table, column
+from app import db
+from app.models import Transaction
+from app.services import transaction_rows, HISTORY_PAGE_SIZE
+
+# External-content FTS5 index over transaction descriptions: the text lives
+# only in "transaction", the index maps words to transaction ids. Triggers
+# keep it in sync with every write, including Core bulk inserts and ON
+# DELETE CASCADE. A batch migration that rebuilds "transaction" drops the
+# triggers and must recreate them (create_search_index).
+FTS_TABLE = 'transaction_fts'
+FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, content='transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+)
+FTS_DROP = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+fts = table(FTS_TABLE, column('rowid'), column('rank'), column(FTS_TABLE))
+
+
+def create_search_index(connection):
+    """Create the index and its triggers, and index the existing rows."""
+    for statement in FTS_DDL:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection):
+    for statement in FTS_DROP:
+        connection.exec_driver_sql(statement)
+
+
+# db.create_all()/drop_all() (tests, throwaway benchmark databases) manage
+# the index along with the table; deployed databases get it from a migration
+@event.listens_for(Transaction.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        create_search_index(connection)
+
+
+@event.listens_for(Transaction.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        drop_search_index(connection)
+
+
+def search_words(text):
+    return re.findall(r'\w+', text or '')
+
+
+def match_expression(words):
+    # Every word must appear, as a word prefix ("groc" finds "Groceries").
+    # Quoting each one keeps user input out of the FTS5 query syntax.
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+SEARCH_ARGS = ('q', 'category', 'start', 'end', 'min', 'max')
+
+
+def parse_search_args(args):
+    """Search filters from query string args, {} when none is set.
+
+    Raises ValueError for malformed values.
+    """
+    if not any(args.get(name) for name in SEARCH_ARGS):
+        return {}
+    optional = lambda name, parse: parse(args[name]) if args.get(name) else None
+    return {
+        'q': args.get('q', '').strip(),
+        'category_id': optional('category', int),
+        'start': optional('start', date.fromisoformat),
+        'end': optional('end', date.fromisoformat),
+        'min_amount': optional('min', float),
+        'max_amount': optional('max', float),
+        'page': max(1, int(args.get('page') or 1)),
+    }
+
+
+def search_transactions(user_id, q='', category_id=None, start=None, end=None,
+                        min_amount=None, max_amount=None, page=1, limit=HISTORY_PAGE_SIZE):
+    """One page of a user's transactions matching a text query and filters.
+
+    Text matches come from the FTS5 index and are ranked by relevance
+    (bm25), newest first among equals; without text the filtered history
+    is listed newest first. `end` is inclusive. Returns (rows, has_next),
+    rows from transaction_rows().
+    """
+    query = transaction_rows().filter(Transaction.user_id == user_id)
+    order = [Transaction.date.desc(), Transaction.id.desc()]
+    words = search_words(q)
+    if words and db.engine.dialect.name == 'sqlite':
+        query = query.join(fts, fts.c.rowid == Transaction.id).filter(
+            fts.c[FTS_TABLE].op('MATCH')(match_expression(words))
+        )
+        order.insert(0, fts.c.rank)
+    else:
+        for word in words:
+            query = query.filter(Transaction.description.ilike(f'%{word}%'))
+    if category_id is not None:
+        query = query.filter(Transaction.category_id == category_id)
+    if start is not None:
+        query = query.filter(Transaction.date >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        # Through the end of that day, without stepping to the next one
+        query = query.filter(Transaction.date <= datetime.combine(end, datetime.max.time()))
+    if min_amount is not None:
+        query = query.filter(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        query = query.filter(Transaction.amount <= max_amount)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(*order).offset((page - 1) * limit).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
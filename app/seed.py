@@ -0,0 +1,115 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import db, rollup
+from app.cache import mark_user_dirty
+from app.models import User, Category, Transaction, Budget
+from app.passwords import get_hasher
+from app.services import month_range, previous_month
+
+SEED_BATCH_SIZE = 5000
+
+SEED_CATEGORIES = (
+    ('Food', '#FF6384', '🍔'),
+    ('Transport', '#36A2EB', '🚗'),
+    ('Housing', '#FFCE56', '🏠'),
+    ('Entertainment', '#4BC0C0', '🎬'),
+    ('Health', '#9966FF', '💊'),
+    ('Shopping', '#FF9F40', '🛍️'),
+    ('Utilities', '#C9CBCF', '💡'),
+    ('Travel', '#2ECC71', '✈️'),
+)
+SEED_DESCRIPTIONS = (
+    'Groceries', 'Coffee', 'Uber trip', 'Rent', 'Cinema', 'Pharmacy', 'Amazon order',
+    'Electricity bill', 'Restaurant', 'Train ticket', 'Gym', 'Book store', 'Fuel', 'Lunch',
+)
+
+
+def _month_starts(months, today):
+    # The last `months` calendar months, oldest first, ending with today's
+    month, year = today.month, today.year
+    starts = []
+    for _ in range(months):
+        starts.append((month, year))
+        month, year = previous_month(month, year)
+    return starts[::-1]
+
+
+def seed_data(users=1, categories=6, transactions=1000, months=12, prefix='seed',
+              password='password', seed=0, today=None):
+    """Bulk-load synthetic users with categories, budgets and transactions.
+
+    Users are named <prefix>-1 .. <prefix>-N and share one password hash;
+    each gets `categories` categories with a budget for each of the last
+    `months` months and `transactions` transactions spread over them (about
+    one in ten is income). Rows go in with Core executemany batches and the
+    seeded users' rollup is rebuilt at the end. Returns the created usernames.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.utcnow()
+    month_starts = _month_starts(months, today)
+
+    # Hashing is deliberately slow: do it once for all seeded users
+    password_hash = get_hasher().hash(password)
+    usernames = [f'{prefix}-{i}' for i in range(1, users + 1)]
+    taken = {u for (u,) in db.session.query(User.username).filter(User.username.in_(usernames))}
+    if taken:
+        raise ValueError(f'Users already exist: {", ".join(sorted(taken))}')
+
+    seeded = [User(username=username, password_hash=password_hash, is_approved=True)
+              for username in usernames]
+    db.session.add_all(seeded)
+    db.session.flush()
+
+    names = [SEED_CATEGORIES[i % len(SEED_CATEGORIES)] for i in range(categories)]
+    for user in seeded:
+        user_categories = [
+            Category(name=name if i < len(SEED_CATEGORIES) else f'{name} {i // len(SEED_CATEGORIES) + 1}',
+                     color=color, icon=icon, user_id=user.id)
+            for i, (name, color, icon) in enumerate(names)
+        ]
+        db.session.add_all(user_categories)
+        db.session.flush()
+        category_ids = [c.id for c in user_categories]
+
+        budgets = [
+            {'category_id': category_id, 'month': month, 'year': year,
+             'amount': float(rng.randrange(100, 1500, 50))}
+            for category_id in category_ids for month, year in month_starts
+        ]
+        if budgets:
+            db.session.execute(insert(Budget.__table__), budgets)
+
+        batch = []
+        for _ in range(transactions):
+            month, year = rng.choice(month_starts)
+            start, end = month_range(month, year)
+            end = min(end, today)
+            when = start + timedelta(seconds=rng.randrange(max(int((end - start).total_seconds()), 1)))
+            is_income = rng.random() < 0.1
+            amount = round(rng.uniform(1000, 3000) if is_income else rng.lognormvariate(3, 1), 2)
+            description = 'Salary' if is_income else rng.choice(SEED_DESCRIPTIONS)
+            batch.append({
+                'user_id': user.id,
+                'date': when,
+                'amount': amount,
+                'description': description,
+                'type': 'income' if is_income else 'expense',
+                'category_id': None if is_income or not category_ids else rng.choice(category_ids),
+                # Core inserts skip the ORM hook that normally sets this
+                'dedupe_key': Transaction.make_dedupe_key(when, amount, description)
+            })
+            if len(batch) >= SEED_BATCH_SIZE:
+                db.session.execute(insert(Transaction.__table__), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(Transaction.__table__), batch)
+
+    user_ids = [user.id for user in seeded]
+    db.session.commit()
+    for user_id in user_ids:
+        # Only the seeded users' rows changed; the rebuild's Core writes
+        # bypass the flush hooks, so their cached aggregates are dropped here
+        mark_user_dirty(db.session, user_id)
+        rollup.rebuild(user_id)
+    return usernames
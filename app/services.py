@@ -0,0 +1,505 @@
+import calendar
+from app import db
+from app.cache import mark_user_dirty
+from app import recurring
+from app.models import User, Category, Transaction, Budget, MonthlyCategoryTotal
+from sqlalchemy import func, and_, or_, case, select, literal, union_all, true
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, date, timedelta
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+BUDGET_COPY_MAX_MONTHS = 24
+ADMIN_USERS_PAGE_SIZE = 50
+USER_STATUS_FILTERS = ('all', 'approved', 'pending', 'admin')
+
+# SQLite strftime formats used to bucket transaction dates per stats period
+STATS_PERIOD_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+STATS_MAX_BUCKETS = 1000
+
+
+def month_range(month, year):
+    """Half-open [start, next_start) datetime range covering a month.
+
+    Comparing the raw date column against a range keeps the predicate
+    sargable, unlike extract('month', ...), so the date indexes are used.
+    """
+    start = datetime(year, month, 1)
+    if month == 12:
+        return start, datetime(year + 1, 1, 1)
+    return start, datetime(year, month + 1, 1)
+
+
+def get_budget_progress(user_id, month, year):
+    """Budget progress for every category of a user in a single query.
+
+    Category LEFT JOIN Budget LEFT JOIN MonthlyCategoryTotal for the month.
+    Both joined tables are unique per (category, month, year), so every
+    category yields exactly one row.
+    """
+    spent_expr = func.coalesce(MonthlyCategoryTotal.total, 0)
+    limit_expr = func.coalesce(Budget.amount, 0)
+
+    rows = db.session.query(
+        Category.id,
+        Category.name,
+        Category.color,
+        Category.icon,
+        limit_expr,
+        spent_expr
+    ).outerjoin(Budget, and_(
+        Budget.category_id == Category.id,
+        Budget.month == month,
+        Budget.year == year
+    )).outerjoin(MonthlyCategoryTotal, and_(
+        MonthlyCategoryTotal.category_id == Category.id,
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.month == month,
+        MonthlyCategoryTotal.year == year
+    )).filter(
+        Category.user_id == user_id
+    ).order_by(Category.id).all()
+
+    budget_data = []
+    for cat_id, name, color, icon, limit, spent in rows:
+        budget_data.append({
+            'id': cat_id,
+            'name': name,
+            'color': color,
+            'icon': icon,
+            'limit': limit,
+            'spent': spent,
+            'available': limit - spent,
+            'percent': (spent / limit * 100) if limit > 0 else 0
+        })
+    return budget_data
+
+
+
+def previous_month(month, year):
+    if month == 1:
+        return 12, year - 1
+    return month - 1, year
+
+
+def next_months(month, year, count):
+    """The `count` (month, year) pairs following a month."""
+    months = []
+    for _ in range(count):
+        month, year = (1, year + 1) if month == 12 else (month + 1, year)
+        months.append((month, year))
+    return months
+
+
+def get_budget_matrix(user_id, months, with_spent=True):
+    """Budget limits (and spending) of every category over a list of months.
+
+    One pivot query: per-category subqueries over Budget and the spending
+    rollup turn each (month, year) into a column via MAX(CASE ...), and are
+    LEFT JOINed onto the user's categories. Returns dense arrays aligned
+    with `months`: limits[i][j] is category i's budget in months[j] (None
+    when unset), spent[i][j] its expense total (0.0 when none).
+    """
+    years = {y for _, y in months}
+
+    def pivot(value, month_col, year_col):
+        return [
+            func.max(case((and_(month_col == m, year_col == y), value))).label(f'm{j}')
+            for j, (m, y) in enumerate(months)
+        ]
+
+    limits = select(Budget.category_id, *pivot(Budget.amount, Budget.month, Budget.year)).join(
+        Category, Category.id == Budget.category_id
+    ).where(
+        Category.user_id == user_id,
+        Budget.year.in_(years)
+    ).group_by(Budget.category_id).subquery('limits')
+    columns = [Category.id, Category.name, Category.color, Category.icon,
+               *[limits.c[f'm{j}'] for j in range(len(months))]]
+    query = select(*columns).outerjoin(limits, limits.c.category_id == Category.id)
+
+    if with_spent:
+        rollup = MonthlyCategoryTotal
+        spent = select(rollup.category_id, *pivot(rollup.total, rollup.month, rollup.year)).where(
+            rollup.user_id == user_id,
+            rollup.category_id.isnot(None),
+            rollup.year.in_(years)
+        ).group_by(rollup.category_id).subquery('spent')
+        query = query.add_columns(*[spent.c[f'm{j}'] for j in range(len(months))]).outerjoin(
+            spent, spent.c.category_id == Category.id
+        )
+
+    rows = db.session.execute(query.where(Category.user_id == user_id).order_by(Category.id)).all()
+    n = len(months)
+    return {
+        'months': [{'month': m, 'year': y} for m, y in months],
+        'categories': [{'id': r[0], 'name': r[1], 'color': r[2], 'icon': r[3]} for r in rows],
+        'limits': [list(r[4:4 + n]) for r in rows],
+        'spent': [[value or 0.0 for value in r[4 + n:]] for r in rows] if with_spent else None
+    }
+
+
+def get_budget_form(user_id, month, year):
+    """Budget form rows for a month, pre-filled from the previous month.
+
+    When the month has no budget at all, each category falls back to its
+    previous-month amount. Both months come from one pivot query.
+    """
+    matrix = get_budget_matrix(user_id, [previous_month(month, year), (month, year)], with_spent=False)
+    use_previous_month = all(current is None for _, current in matrix['limits'])
+    items = []
+    for category, (previous_amount, current_amount) in zip(matrix['categories'], matrix['limits']):
+        amount = previous_amount if use_previous_month else current_amount
+        items.append({
+            'category': {'id': category['id'], 'name': category['name'], 'color': category['color']},
+            'amount': amount if amount is not None else ''
+        })
+    return items
+
+
+def get_budget_year(user_id, year):
+    """Categories x 12 months of limits and spending, with monthly totals."""
+    matrix = get_budget_matrix(user_id, [(m, year) for m in range(1, 13)])
+    matrix['year'] = year
+    matrix['total_limits'] = [sum(row[j] or 0.0 for row in matrix['limits']) for j in range(12)]
+    matrix['total_spent'] = [sum(row[j] for row in matrix['spent']) for j in range(12)]
+    return matrix
+
+
+def _budget_upsert():
+    # INSERT ... ON CONFLICT(category_id, month, year) DO UPDATE SET amount,
+    # against the _category_month_year_uc unique constraint
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(Budget.__table__)
+
+
+def _on_conflict_update_amount(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=['category_id', 'month', 'year'],
+        set_={'amount': stmt.excluded.amount}
+    )
+
+
+def save_budgets(user_id, month, year, amounts):
+    """Upsert a month's budgets from {category_id: amount}.
+
+    Ids of categories the user does not own are dropped, checked with one
+    IN query; the rest are written with one bulk upsert. Returns the number
+    of budgets written.
+    """
+    owned = [cat_id for (cat_id,) in db.session.query(Category.id).filter(
+        Category.user_id == user_id,
+        Category.id.in_(list(amounts))
+    )] if amounts else []
+    if owned:
+        stmt = _budget_upsert().values([
+            {'category_id': cat_id, 'month': month, 'year': year, 'amount': amounts[cat_id]}
+            for cat_id in owned
+        ])
+        db.session.execute(_on_conflict_update_amount(stmt))
+        # Core statements bypass the ORM flush hooks that invalidate the cache
+        mark_user_dirty(db.session, user_id)
+    db.session.commit()
+    return len(owned)
+
+
+def copy_budget_month(user_id, source_month, source_year, targets):
+    """Copy a month's budgets onto each (month, year) in targets.
+
+    One INSERT ... SELECT of the source budgets crossed with the target
+    months, overwriting budgets that already exist there. Returns the
+    number of budgets written.
+    """
+    target_months = union_all(*[
+        select(literal(m).label('month'), literal(y).label('year')) for m, y in targets
+    ]).subquery('targets')
+    source = select(
+        Budget.category_id, Budget.amount, target_months.c.month, target_months.c.year
+    ).join(Category, Category.id == Budget.category_id).join(
+        # Cross join: every source budget onto every target month
+        target_months, true()
+    ).where(
+        Category.user_id == user_id,
+        Budget.month == source_month,
+        Budget.year == source_year
+    )
+    stmt = _budget_upsert().from_select(['category_id', 'amount', 'month', 'year'], source)
+    written = db.session.execute(_on_conflict_update_amount(stmt)).rowcount
+    if written:
+        mark_user_dirty(db.session, user_id)
+    db.session.commit()
+    return written
+
+def transaction_rows():
+    """Query of flat transaction rows for list views.
+
+    The transaction's columns plus its category's display fields through one
+    LEFT JOIN: no ORM objects are built and no category is lazy-loaded per
+    row. Rows have the keys of Transaction.to_dict().
+    """
+    return db.session.query(
+        Transaction.id,
+        Transaction.amount,
+        Transaction.description,
+        Transaction.date,
+        Transaction.type,
+        Transaction.category_id,
+        Transaction.user_id,
+        func.coalesce(Category.name, 'Uncategorized').label('category_name'),
+        func.coalesce(Category.color, '#000000').label('category_color'),
+        func.coalesce(Category.icon, '🏷️').label('category_icon')
+    ).outerjoin(Category, Category.id == Transaction.category_id)
+
+
+def transaction_row_to_dict(row):
+    return dict(row._asdict(), date=row.date.isoformat())
+
+
+def encode_cursor(transaction):
+    return f"{transaction.date.isoformat()}_{transaction.id}"
+
+
+def decode_cursor(cursor):
+    """Parse a "<iso date>_<id>" cursor, raise ValueError when malformed."""
+    when, _, id = cursor.rpartition('_')
+    return datetime.fromisoformat(when), int(id)
+
+
+def get_transactions_page(user_id, before=None, limit=HISTORY_PAGE_SIZE):
+    """One page of a user's transactions, newest first, keyset-paginated on (date, id).
+
+    Returns (rows, next_cursor), rows from transaction_rows(); next_cursor is
+    None on the last page.
+    Seeking from the cursor instead of OFFSET keeps every page as cheap as
+    the first one, whatever the size of the history.
+    """
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    query = transaction_rows().filter(Transaction.user_id == user_id)
+    if before is not None:
+        before_date, before_id = decode_cursor(before)
+        # The redundant date <= bound lets the (user_id, date) index seek
+        # straight to the cursor instead of walking from the newest row.
+        query = query.filter(Transaction.date <= before_date, or_(
+            Transaction.date < before_date,
+            and_(Transaction.date == before_date, Transaction.id < before_id)
+        ))
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1).all()
+    transactions = rows[:limit]
+    next_cursor = encode_cursor(transactions[-1]) if len(rows) > limit else None
+    return transactions, next_cursor
+
+
+def _prefix_range(column, prefix):
+    # username LIKE 'ab%' as a range, so the unique index on username is
+    # searched instead of scanned (LIKE is case-insensitive in SQLite and
+    # cannot use a case-sensitive index)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def get_user_directory(prefix='', status='all', after=None, limit=ADMIN_USERS_PAGE_SIZE):
+    """One page of the admin user directory, ordered by username.
+
+    Keyset-paginated on the (unique) username, filtered by username prefix
+    and status. Every user comes with the number of transactions, total
+    spent, date of the last transaction and number of categories, all in
+    one statement: the page is selected first and each aggregate is grouped
+    over the page's users only. Returns (rows, next_cursor), rows being
+    (user, transactions, spent, last_transaction, categories) tuples.
+    Raises ValueError for an unknown status.
+    """
+    if status not in USER_STATUS_FILTERS:
+        raise ValueError(f'Unknown status {status!r}')
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
+    page = select(User.id, User.username)
+    if prefix:
+        page = page.where(_prefix_range(User.username, prefix))
+    if after is not None:
+        page = page.where(User.username > after)
+    if status == 'approved':
+        page = page.where(User.is_approved.is_(True))
+    elif status == 'pending':
+        page = page.where(User.is_approved.is_(False))
+    elif status == 'admin':
+        page = page.where(User.is_admin.is_(True))
+    # Fetch one extra row to know whether another page exists
+    page = page.order_by(User.username).limit(limit + 1).cte('page')
+    page_ids = select(page.c.id)
+
+    transactions = select(
+        Transaction.user_id,
+        func.count().label('count'),
+        func.max(Transaction.date).label('last')
+    ).where(Transaction.user_id.in_(page_ids)).group_by(Transaction.user_id).subquery()
+    # Expense totals come from the rollup rather than every transaction
+    spent = select(
+        MonthlyCategoryTotal.user_id,
+        func.sum(MonthlyCategoryTotal.total).label('total')
+    ).where(MonthlyCategoryTotal.user_id.in_(page_ids)).group_by(MonthlyCategoryTotal.user_id).subquery()
+    categories = select(
+        Category.user_id,
+        func.count().label('count')
+    ).where(Category.user_id.in_(page_ids)).group_by(Category.user_id).subquery()
+
+    rows = db.session.query(
+        User,
+        func.coalesce(transactions.c.count, 0),
+        func.coalesce(spent.c.total, 0.0),
+        transactions.c.last,
+        func.coalesce(categories.c.count, 0)
+    ).select_from(page).join(User, User.id == page.c.id) \
+        .outerjoin(transactions, transactions.c.user_id == User.id) \
+        .outerjoin(spent, spent.c.user_id == User.id) \
+        .outerjoin(categories, categories.c.user_id == User.id) \
+        .order_by(page.c.username).all()
+
+    users = [tuple(row) for row in rows[:limit]]
+    next_cursor = users[-1][0].username if len(rows) > limit else None
+    return users, next_cursor
+
+
+def default_stats_range(period, today=None):
+    """Default (start, end) inclusive date range for a stats period."""
+    today = today or date.today()
+    if period == 'day':
+        return today - timedelta(days=29), today
+    if period == 'week':
+        return today - timedelta(weeks=11, days=today.weekday()), today
+    if period == 'year':
+        return date(today.year - 4, 1, 1), date(today.year, 12, 31)
+    # month: the last 12 months including the current one
+    start_month = today.month - 11
+    start_year = today.year
+    if start_month < 1:
+        start_month += 12
+        start_year -= 1
+    next_month_start = month_range(today.month, today.year)[1]
+    return date(start_year, start_month, 1), (next_month_start - timedelta(days=1)).date()
+
+
+def _stats_bucket_count(period, start, end):
+    # Buckets in [start, end] from the calendar alone; for weeks a lower
+    # bound, as a new year splits the week it starts in
+    if period == 'day':
+        return (end - start).days + 1
+    if period == 'week':
+        return (end - start).days // 7 + 1
+    if period == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return end.year - start.year + 1
+
+
+def _bucket_days(period, day):
+    # Days from `day` to the first day of the bucket after its own
+    if period == 'day':
+        return 1
+    to_new_year = (date(day.year, 12, 31) - day).days + 1
+    if period == 'year':
+        return to_new_year
+    if period == 'month':
+        return calendar.monthrange(day.year, day.month)[1] - day.day + 1
+    return min(7 - day.weekday(), to_new_year)
+
+
+def _stats_buckets(period, start, end):
+    # Dense, ordered bucket labels, formatted like the SQL side. Oversized
+    # ranges are refused before stepping, and stepping goes a bucket at a
+    # time, never a day at a time.
+    if _stats_bucket_count(period, start, end) > STATS_MAX_BUCKETS:
+        raise ValueError('Too many buckets for the requested range')
+    fmt = STATS_PERIOD_FORMATS[period]
+    buckets = []
+    day = start
+    while True:
+        buckets.append(day.strftime(fmt))
+        if len(buckets) > STATS_MAX_BUCKETS:
+            raise ValueError('Too many buckets for the requested range')
+        step = _bucket_days(period, day)
+        if (end - day).days < step:
+            return buckets
+        day += timedelta(days=step)
+
+
+def _is_month_aligned(start, end):
+    return start.day == 1 and (end + timedelta(days=1)).day == 1
+
+
+def get_spending_series(user_id, period, start, end):
+    """Expense totals per category, bucketed by period over [start, end].
+
+    Bucketing and summing happen in SQL: month and year buckets read the
+    monthly rollup when the range covers whole months, anything else groups
+    raw transactions with strftime over the indexed date range. The result
+    is columnar: one label per bucket and one dense series per category,
+    plus the recurring expenses scheduled but not stored yet per bucket.
+    """
+    if period not in STATS_PERIOD_FORMATS:
+        raise ValueError(f'Unknown period {period}')
+    if start > end:
+        raise ValueError('Start of the range is after its end')
+    if end >= date.max:
+        # The half-open SQL bounds and the recurring window end a day later
+        raise ValueError('End of the range is past the last supported date')
+    buckets = _stats_buckets(period, start, end)
+
+    if period in ('month', 'year') and _is_month_aligned(start, end):
+        r = MonthlyCategoryTotal
+        month_index = r.year * 12 + r.month
+        group_cols = [r.year] if period == 'year' else [r.year, r.month]
+        rows = db.session.query(
+            Category.id, Category.name, Category.color, *group_cols, func.sum(r.total)
+        ).join(r, r.category_id == Category.id).filter(
+            r.user_id == user_id,
+            month_index >= start.year * 12 + start.month,
+            month_index <= end.year * 12 + end.month
+        ).group_by(Category.id, *group_cols).all()
+        if period == 'year':
+            rows = [(cat_id, name, color, f'{year:04d}', total) for cat_id, name, color, year, total in rows]
+        else:
+            rows = [(cat_id, name, color, f'{year:04d}-{month:02d}', total)
+                    for cat_id, name, color, year, month, total in rows]
+    else:
+        bucket = func.strftime(STATS_PERIOD_FORMATS[period], Transaction.date)
+        rows = db.session.query(
+            Category.id, Category.name, Category.color, bucket, func.sum(Transaction.amount)
+        ).join(Transaction, Transaction.category_id == Category.id).filter(
+            Transaction.user_id == user_id,
+            Transaction.type == 'expense',
+            Transaction.date >= datetime.combine(start, datetime.min.time()),
+            Transaction.date < datetime.combine(end + timedelta(days=1), datetime.min.time())
+        ).group_by(Category.id, bucket).all()
+
+    positions = {label: i for i, label in enumerate(buckets)}
+    categories = {}
+    for cat_id, name, color, label, total in rows:
+        if cat_id not in categories:
+            categories[cat_id] = (name, color, [0] * len(buckets))
+        categories[cat_id][2][positions[label]] = total
+
+    ordered = sorted(categories.items())
+    series = [values for _, (_, _, values) in ordered]
+
+    # Recurring expenses not stored as transactions yet, per bucket
+    scheduled = [0] * len(buckets)
+    for item in recurring.scheduled(user_id, start, end + timedelta(days=1)):
+        if item['type'] == 'expense':
+            scheduled[positions[date.fromisoformat(item['date']).strftime(STATS_PERIOD_FORMATS[period])]] += item['amount']
+    return {
+        'period': period,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'buckets': buckets,
+        'category_ids': [cat_id for cat_id, _ in ordered],
+        'labels': [name for _, (name, _, _) in ordered],
+        'colors': [color for _, (_, color, _) in ordered],
+        'data': [sum(values) for values in series],
+        'series': series,
+        'scheduled': scheduled
+    }
@@ -1,7 +1,14 @@
 document.addEventListener('DOMContentLoaded', function () {
     const ctx = document.getElementById('expensesChart');
     if (ctx) {
-        fetch('/api/stats/month')
+        // Twelve months ending with the month selected on the dashboard
+        const month = parseInt(ctx.dataset.month, 10);
+        const year = parseInt(ctx.dataset.year, 10);
+        const isoDate = d => `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+        const from = isoDate(new Date(year, month - 12, 1));
+        const to = isoDate(new Date(year, month, 0));
+
+        fetch(`/api/stats/month?from=${from}&to=${to}`)
             .then(response => response.json())
             .then(data => {
                 if (data.data.length === 0) {
@@ -9,6 +16,32 @@ document.addEventListener('DOMContentLoaded', function () {
                     return;
                 }
 
+                const trendCtx = document.getElementById('trendChart');
+                if (trendCtx) {
+                    new Chart(trendCtx, {
+                        type: 'bar',
+                        data: {
+                            labels: data.buckets,
+                            datasets: data.series.map((values, i) => ({
+                                label: data.labels[i],
+                                data: values,
+                                backgroundColor: data.colors[i]
+                            }))
+                        },
+                        options: {
+                            responsive: true,
+                            maintainAspectRatio: false,
+                            scales: {
+                                x: { stacked: true, ticks: { color: '#B0B0B0' } },
+                                y: { stacked: true, ticks: { color: '#B0B0B0' } }
+                            },
+                            plugins: {
+                                legend: { display: false }
+                            }
+                        }
+                    });
+                }
+
                 new Chart(ctx, {
                     type: 'doughnut',
                     data: {
@@ -35,4 +68,62 @@ document.addEventListener('DOMContentLoaded', function () {
             })
             .catch(error => console.error('Error fetching stats:', error));
     }
+
+    const historyList = document.getElementById('history-list');
+    const historyMore = document.getElementById('history-more');
+    if (historyList && historyMore && 'IntersectionObserver' in window) {
+        let nextCursor = historyMore.dataset.nextCursor;
+        let loading = false;
+
+        const escapeHtml = text => {
+            const div = document.createElement('div');
+            div.textContent = text == null ? '' : text;
+            return div.innerHTML;
+        };
+
+        const renderTransaction = t => {
+            const date = new Date(t.date).toLocaleDateString('en-US', { month: 'short', day: '2-digit', year: 'numeric' });
+            const li = document.createElement('li');
+            li.className = 'transaction-item';
+            li.innerHTML = `
+                <div class="transaction-info">
+                    <div style="display: flex; align-items: center;">
+                        <span style="font-size: 1.5rem; margin-right: 10px;">${escapeHtml(t.category_icon)}</span>
+                        <div>
+                            <h4>${escapeHtml(t.description)}</h4>
+                            <p>${escapeHtml(t.category_name)} • ${date}</p>
+                        </div>
+                    </div>
+                </div>
+                <div style="display: flex; align-items: center; gap: 10px;">
+                    <div class="amount ${escapeHtml(t.type)}">
+                        ${t.type === 'income' ? '+' : '-'}$${t.amount.toFixed(2)}
+                    </div>
+                    <a href="/transactions/${t.id}/delete"
+                        style="color: var(--text-secondary); text-decoration: none; font-size: 1.2rem;"
+                        onclick="return confirm('Delete this transaction?')">&times;</a>
+                </div>`;
+            return li;
+        };
+
+        const observer = new IntersectionObserver(entries => {
+            if (!entries[0].isIntersecting || loading || !nextCursor) {
+                return;
+            }
+            loading = true;
+            fetch(`/api/transactions?before=${encodeURIComponent(nextCursor)}&limit=50`)
+                .then(response => response.json())
+                .then(data => {
+                    data.transactions.forEach(t => historyList.appendChild(renderTransaction(t)));
+                    nextCursor = data.next_cursor;
+                    if (!nextCursor) {
+                        observer.disconnect();
+                        historyMore.remove();
+                    }
+                })
+                .catch(error => console.error('Error fetching transactions:', error))
+                .finally(() => { loading = false; });
+        });
+        observer.observe(historyMore);
+    }
 });
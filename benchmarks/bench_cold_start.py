@@ -0,0 +1,142 @@
+"""Worker cold-start benchmark.
+
+Measures how long a worker takes from process start until it has served its
+first request, in two modes:
+
+- fresh:   every worker is a new interpreter that imports the app, calls
+           create_app() and serves GET /login (gunicorn without preload_app).
+           The "bootstrap" column is what create_app() used to add on top:
+           db.create_all() plus the default-admin lookup.
+- preload: the app is built once, then workers are forked from it
+           (gunicorn with preload_app = True).
+
+    python benchmarks/bench_cold_start.py --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_config(db_path):
+    from config import Config
+
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'CACHE_BACKEND': 'memory',
+    })
+
+
+def setup_database(db_path):
+    from app import create_app, db
+
+    app = create_app(make_config(db_path))
+    with app.app_context():
+        db.create_all()
+
+
+def first_request(app):
+    response = app.test_client().get('/login')
+    assert response.status_code == 200, response.status_code
+
+
+def child(db_path):
+    # Runs in a fresh interpreter; reports phase timings as JSON on stdout
+    started = time.perf_counter()
+    from app import create_app, db
+    from app.models import User
+    imported = time.perf_counter()
+    app = create_app(make_config(db_path))
+    created = time.perf_counter()
+    first_request(app)
+    served = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        User.query.filter_by(username='admin').first()
+    bootstrapped = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (served - created) * 1000,
+        'bootstrap_ms': (bootstrapped - served) * 1000,
+    }))
+
+
+def run_fresh(db_path, workers):
+    results = []
+    for _ in range(workers):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', db_path],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        # Wall time includes interpreter startup, excludes the bootstrap probe
+        result['ready_ms'] = (time.perf_counter() - started) * 1000 - result['bootstrap_ms']
+        results.append(result)
+    return results
+
+
+def run_preload(db_path, workers):
+    from app import create_app, db
+
+    started = time.perf_counter()
+    app = create_app(make_config(db_path))
+    master_ms = (time.perf_counter() - started) * 1000
+
+    results = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            with app.app_context():
+                db.engine.dispose(close=False)
+            first_request(app)
+            os.write(write_fd, str((time.perf_counter() - forked) * 1000).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            ready_ms = float(pipe.read())
+        os.waitpid(pid, 0)
+        results.append({'ready_ms': ready_ms})
+    return master_ms, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--child', metavar='DB_PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        setup_database(db_path)
+        fresh = run_fresh(db_path, args.workers)
+        master_ms, preload = run_preload(db_path, args.workers)
+
+    print('fresh interpreter per worker')
+    print(f"{'worker':<8}{'import ms':>11}{'create ms':>11}{'first req':>11}{'ready ms':>10}{'bootstrap':>11}")
+    for i, r in enumerate(fresh, 1):
+        print(f"{i:<8}{r['import_ms']:>11.1f}{r['create_app_ms']:>11.1f}{r['first_request_ms']:>11.1f}"
+              f"{r['ready_ms']:>10.1f}{r['bootstrap_ms']:>11.1f}")
+
+    print(f'\npreload_app (master built the app once in {master_ms:.1f} ms)')
+    print(f"{'worker':<8}{'ready ms':>10}")
+    for i, r in enumerate(preload, 1):
+        print(f"{i:<8}{r['ready_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""In-process endpoint benchmark with a JSON baseline.
+
+Seeds a throwaway SQLite database at each data size, logs in as a seeded
+user and drives the main endpoints through app.test_client(), recording
+latency percentiles and the number of SQL statements per request.
+
+    python benchmarks/bench_endpoints.py --save benchmarks/baseline.json
+    python benchmarks/bench_endpoints.py --compare benchmarks/baseline.json
+
+With --compare the run fails (exit status 1) when an endpoint's p50 or p95
+is more than --threshold slower than the baseline, or when it issues more
+SQL statements than before.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event  # noqa: E402
+from config import Config  # noqa: E402
+
+# name -> (users, categories, transactions per user, months)
+SIZES = {
+    'small': (1, 6, 500, 6),
+    'medium': (5, 8, 5000, 12),
+    'large': (10, 12, 50000, 24),
+}
+
+
+def endpoints():
+    today = date.today()
+    return {
+        'dashboard': ('GET', '/', None),
+        'history': ('GET', '/history', None),
+        'history_search': ('GET', '/history?q=groc', None),
+        'budgets': ('GET', '/budgets', None),
+        'stats_month': ('GET', '/api/stats/month', None),
+        'budgets_copy': ('POST', '/budgets/copy', {'month': str(today.month), 'year': str(today.year)}),
+    }
+
+
+def make_config(db_path):
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'CACHE_BACKEND': 'memory',
+        # Measure the queries, not the cache
+        'CACHE_TTL': 0,
+    })
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_size(size, repeat):
+    from app import create_app, db
+    from app.seed import seed_data
+
+    users, categories, transactions, months = SIZES[size]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(os.path.join(tmp, 'bench.db')))
+        with app.app_context():
+            db.create_all()
+            seed_data(users, categories, transactions, months, prefix='bench')
+            db.session.remove()
+
+        client = app.test_client()
+        with app.app_context():
+            client.post('/login', data={'username': 'bench-1', 'password': 'password'})
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        results = {}
+        for name, (method, url, data) in endpoints().items():
+            latencies, counts = [], []
+            for _ in range(repeat):
+                # A fresh app context per request, like a real worker
+                with app.app_context():
+                    event.listen(db.engine, 'before_cursor_execute', count)
+                    statements.clear()
+                    started = time.perf_counter()
+                    response = client.open(url, method=method, data=data)
+                    latencies.append(time.perf_counter() - started)
+                    event.remove(db.engine, 'before_cursor_execute', count)
+                if response.status_code not in (200, 302):
+                    raise RuntimeError(f'{method} {url} returned {response.status_code}')
+                counts.append(len(statements))
+            results[name] = {
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'statements': max(counts),
+            }
+        with app.app_context():
+            db.engine.dispose()
+    return results
+
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """Return the regressions of current against baseline as messages."""
+    regressions = []
+    for size, results in current.items():
+        for name, r in results.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                # Ignore sub-millisecond jitter on fast endpoints
+                if r[metric] > base[metric] * (1 + threshold) and r[metric] - base[metric] > min_delta_ms:
+                    regressions.append(f'{size}/{name} {metric}: {base[metric]:.1f} -> {r[metric]:.1f}')
+            if r['statements'] > base['statements']:
+                regressions.append(f"{size}/{name} statements: {base['statements']} -> {r['statements']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='small,medium', help=f"Comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=30, help='Requests per endpoint and size')
+    parser.add_argument('--save', metavar='PATH', help='Write the results as the new baseline')
+    parser.add_argument('--compare', metavar='PATH', help='Fail on regressions against this baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.getLogger('app').setLevel(logging.CRITICAL)
+    logging.getLogger('app.requests').setLevel(logging.WARNING)
+    current = {}
+    print(f"{'size':<8}{'endpoint':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'SQL':>6}")
+    for size in args.sizes.split(','):
+        current[size] = run_size(size, args.repeat)
+        for name, r in current[size].items():
+            print(f"{size:<8}{name:<16}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['statements']:>6}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.save}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+        if regressions:
+            print('Regressions:')
+            for message in regressions:
+                print(f'  {message}')
+            sys.exit(1)
+        print('No regressions.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Login-throughput benchmark for the password hashing settings.
+
+Like a gthread gunicorn worker, one fixed pool of request threads
+(GUNICORN_THREADS, default 4) serves every request, against a throwaway
+SQLite database. Client threads log in as separate users in a loop while a
+probe client keeps fetching a cheap page through the same pool, so a spike
+of logins holding every request thread shows up as probe latency. Each
+combination of hash method, hash pool size and pending limit reports
+logins per second, logins refused with 503, login latency and the latency
+of the cheap page during the spike.
+
+    python benchmarks/bench_login.py --clients 8 --logins 20
+    python benchmarks/bench_login.py --methods scrypt:16384:8:1 --hash-threads 0,1,2,4 --max-pending 0,2
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config  # noqa: E402
+
+
+def make_config(db_path, method, hash_threads, max_pending):
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'CACHE_BACKEND': 'memory',
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_HASH_THREADS': hash_threads,
+        'PASSWORD_HASH_MAX_PENDING': max_pending,
+    })
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(method, hash_threads, max_pending, threads, clients, logins):
+    from app import create_app, db
+    from app.models import User
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(os.path.join(tmp, 'bench.db'), method, hash_threads, max_pending))
+        with app.app_context():
+            db.create_all()
+            users = [User(username=f'bench-{i}', is_approved=True) for i in range(clients)]
+            users[0].set_password('password')
+            for user in users[1:]:
+                user.password_hash = users[0].password_hash
+            db.session.add_all(users)
+            db.session.commit()
+
+        login_latencies, probe_latencies, refused = [], [], []
+        done = threading.Event()
+        request_threads = ThreadPoolExecutor(threads, thread_name_prefix='request')
+
+        def request(client, verb, url, **kwargs):
+            # Served on a request thread; the latency includes waiting for one
+            def serve():
+                with app.app_context():
+                    return client.open(url, method=verb, **kwargs)
+            started = time.perf_counter()
+            response = request_threads.submit(serve).result()
+            return response, time.perf_counter() - started
+
+        def login(i):
+            client = app.test_client()
+            for _ in range(logins):
+                response, elapsed = request(client, 'POST', '/login',
+                                            data={'username': f'bench-{i}', 'password': 'password'})
+                if response.status_code == 302:
+                    login_latencies.append(elapsed)
+                    request(client, 'GET', '/logout')
+                else:
+                    refused.append(response.status_code)
+
+        def probe():
+            client = app.test_client()
+            while not done.is_set():
+                _, elapsed = request(client, 'GET', '/login')
+                probe_latencies.append(elapsed)
+                time.sleep(0.005)
+
+        senders = [threading.Thread(target=login, args=(i,)) for i in range(clients)]
+        prober = threading.Thread(target=probe)
+        prober.start()
+        started = time.perf_counter()
+        for sender in senders:
+            sender.start()
+        for sender in senders:
+            sender.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.join()
+        request_threads.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+
+    return {
+        'logins_per_s': len(login_latencies) / elapsed,
+        'refused': len(refused),
+        'login_p50_ms': percentile(login_latencies, 50) * 1000,
+        'login_p99_ms': percentile(login_latencies, 99) * 1000,
+        'probe_p50_ms': percentile(probe_latencies, 50) * 1000,
+        'probe_p99_ms': percentile(probe_latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('GUNICORN_THREADS') or 4),
+                        help='Request threads serving every request (GUNICORN_THREADS)')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent login clients')
+    parser.add_argument('--logins', type=int, default=20, help='Logins per client')
+    parser.add_argument('--methods', default='scrypt:32768:8:1,pbkdf2:sha256:600000',
+                        help='Comma-separated werkzeug hash methods')
+    parser.add_argument('--hash-threads', default='0,2',
+                        help='Comma-separated PASSWORD_HASH_THREADS values (0: hash on the request thread)')
+    parser.add_argument('--max-pending', default='2',
+                        help='Comma-separated PASSWORD_HASH_MAX_PENDING values (0: no limit)')
+    args = parser.parse_args()
+
+    logging.getLogger('app').setLevel(logging.CRITICAL)
+    logging.getLogger('app.requests').setLevel(logging.WARNING)
+    print(f"{'method':<24}{'pool':>5}{'pending':>8}{'logins/s':>10}{'refused':>9}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'probe p50':>11}{'probe p99':>11}")
+    for method in args.methods.split(','):
+        for hash_threads in (int(n) for n in args.hash_threads.split(',')):
+            for max_pending in (int(n) for n in args.max_pending.split(',')):
+                r = run(method, hash_threads, max_pending, args.threads, args.clients, args.logins)
+                print(f"{method:<24}{hash_threads:>5}{max_pending:>8}{r['logins_per_s']:>10.1f}{r['refused']:>9}"
+                      f"{r['login_p50_ms']:>9.1f}{r['login_p99_ms']:>9.1f}"
+                      f"{r['probe_p50_ms']:>11.1f}{r['probe_p99_ms']:>11.1f}")
+
+if __name__ == '__main__':
+    main()
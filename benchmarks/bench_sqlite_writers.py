@@ -0,0 +1,122 @@
+"""Concurrent-writer benchmark for the SQLite engine profile.
+
+Several processes hammer POST /add and POST /budgets against one SQLite file,
+once with SQLAlchemy's defaults and once with SQLITE_PRODUCTION_PRAGMAS, and
+report write throughput, latency percentiles and failed requests.
+
+    python benchmarks/bench_sqlite_writers.py --processes 8 --requests 200
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config, SQLITE_PRODUCTION_PRAGMAS  # noqa: E402
+
+PROFILES = {
+    'default': {},
+    'production': SQLITE_PRODUCTION_PRAGMAS,
+}
+
+
+def make_config(db_path, pragmas):
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SQLITE_PRAGMAS': pragmas,
+        'CACHE_BACKEND': 'memory',
+    })
+
+
+def setup_database(config):
+    from app import create_app, db
+    from app.models import User, Category
+
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', is_approved=True)
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+        category = Category(name='Bench', color='#000000', user_id=user.id)
+        db.session.add(category)
+        db.session.commit()
+        return category.id
+
+
+def worker(args):
+    db_path, profile, category_id, requests = args
+    from app import create_app
+
+    logging.getLogger('app').setLevel(logging.CRITICAL)
+    logging.getLogger('app.requests').setLevel(logging.WARNING)
+    app = create_app(make_config(db_path, PROFILES[profile]))
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    latencies = []
+    errors = 0
+    for i in range(requests):
+        started = time.perf_counter()
+        if i % 2:
+            response = client.post('/budgets', data={f'budget_{category_id}': str(i), 'month': '1', 'year': '2030'})
+        else:
+            response = client.post('/add', data={'amount': '1.5', 'description': f'w{i}', 'category': str(category_id)})
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 302:
+            errors += 1
+    return latencies, errors
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_profile(profile, processes, requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        category_id = setup_database(make_config(db_path, PROFILES[profile]))
+
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(processes) as pool:
+            started = time.perf_counter()
+            results = pool.map(worker, [(db_path, profile, category_id, requests)] * processes)
+            elapsed = time.perf_counter() - started
+
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    errors = sum(worker_errors for _, worker_errors in results)
+    return {
+        'profile': profile,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': (len(latencies) - errors) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per process')
+    parser.add_argument('--profile', choices=['default', 'production', 'both'], default='both')
+    args = parser.parse_args()
+
+    profiles = list(PROFILES) if args.profile == 'both' else [args.profile]
+    print(f"{'profile':<12}{'requests':>10}{'errors':>8}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for profile in profiles:
+        r = run_profile(profile, args.processes, args.requests)
+        print(f"{r['profile']:<12}{r['requests']:>10}{r['errors']:>8}{r['throughput']:>10.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,17 +3,79 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Applied on every new SQLite connection. WAL lets readers run alongside the
+# single writer, and busy_timeout makes writers queue instead of failing with
+# "database is locked". SQLite ignores ON DELETE CASCADE / SET NULL unless
+# foreign_keys is switched on for each connection, so every config sets it.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'foreign_keys': 'ON',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_PRAGMAS = {'foreign_keys': 'ON'}
+    # Per-user aggregate cache. 'memory' is private to each process; use
+    # 'sqlite' when several gunicorn workers must share invalidations.
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')
+    CACHE_MAXSIZE = int(os.environ.get('CACHE_MAXSIZE') or 1024)
+    CACHE_TTL = int(os.environ.get('CACHE_TTL') or 300)
+    # Per-request db/render/hash timings in a Server-Timing response header
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+    # /admin/metrics. Multiprocess mode sums per-worker snapshot files kept
+    # in METRICS_DIR (default: <instance>/metrics); turn it on whenever
+    # gunicorn runs several workers.
+    METRICS_MULTIPROCESS = os.environ.get('METRICS_MULTIPROCESS') == '1'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    # Uploads larger than this are imported by a job worker, not the request
+    IMPORT_INLINE_MAX_BYTES = int(os.environ.get('IMPORT_INLINE_MAX_BYTES') or 5 * 1024 * 1024)
+    IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR')
+    # Seconds a job may stay 'running' before workers assume its worker died
+    # and queue it again; keep it above the slowest job. 0 disables this.
+    JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER') or 3600)
+    # Where the backup job writes SQLite copies (default: <instance>/backups)
+    BACKUP_DIR = os.environ.get('BACKUP_DIR')
+    # Description substring -> category name, applied to imported rows
+    IMPORT_CATEGORY_RULES = {}
+    # Werkzeug method (and cost) for new password hashes. Stored hashes made
+    # with other parameters are upgraded on the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # Concurrent hashes per process; 0 hashes on the request thread
+    PASSWORD_HASH_THREADS = int(os.environ.get('PASSWORD_HASH_THREADS') or 2)
+    # Requests hashing or waiting for the pool per process; more get a 503.
+    # Keep it below GUNICORN_THREADS so a login spike never holds them all.
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 2)
+    # Part of page ETags, so a deploy never answers 304 for old HTML.
+    # Defaults to a digest of the app package.
+    APP_VERSION = os.environ.get('APP_VERSION')
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    # docker-compose runs this config under multi-worker gunicorn and sets
+    # CACHE_BACKEND=sqlite; the single-process dev server can keep 'memory'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    CACHE_BACKEND = 'memory'
+    # Fast hashes keep the suite quick; nothing here needs to resist cracking
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
 
 class ProductionConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    # Workers must share invalidations: cached identities back revocation
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'sqlite'
+    METRICS_MULTIPROCESS = True
+    # Timings reveal e.g. whether a login hashed a password; opt in only
+    SERVER_TIMING = os.environ.get('SERVER_TIMING') == '1'
@@ -0,0 +1,32 @@
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+# Several request threads per worker (gthread): at most
+# PASSWORD_HASH_MAX_PENDING of them hash passwords or wait for the hashing
+# pool, the rest keep serving pages during a login spike
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+
+# Import and build the app once in the master; workers fork from it instead
+# of each paying for imports and create_app() on boot.
+preload_app = True
+
+
+def on_starting(server):
+    from app.cache import check_shared_cache
+    from run import app
+
+    # Never serve revoked sessions from another worker's stale cache
+    check_shared_cache(app, server.cfg.workers)
+    # Metrics snapshots of a previous run would be summed into this one
+    app.extensions['metrics'].clear()
+
+
+def post_fork(server, worker):
+    # Never share pooled database connections across processes
+    from app import db
+    from run import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,46 @@
+"""cascading foreign keys
+
+Revision ID: 8565a70a10a3
+Revises: 86dd8502281f
+Create Date: 2026-10-18 20:02:08.189015
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8565a70a10a3'
+down_revision = '86dd8502281f'
+branch_labels = None
+depends_on = None
+
+# The initial schema created its foreign keys unnamed; batch mode can only
+# drop them when reflected through a naming convention.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+# table -> [(column, referred table, ON DELETE action)]
+FOREIGN_KEYS = {
+    'category': [('user_id', 'user', 'CASCADE')],
+    'transaction': [('user_id', 'user', 'CASCADE'), ('category_id', 'category', 'SET NULL')],
+    'budget': [('category_id', 'category', 'CASCADE')],
+    'monthly_category_total': [('user_id', 'user', 'CASCADE'), ('category_id', 'category', 'CASCADE')],
+}
+
+
+def _recreate_foreign_keys(with_actions):
+    for table, foreign_keys in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred, ondelete in foreign_keys:
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'],
+                                            ondelete=ondelete if with_actions else None)
+
+
+def upgrade():
+    _recreate_foreign_keys(with_actions=True)
+
+
+def downgrade():
+    _recreate_foreign_keys(with_actions=False)
@@ -0,0 +1,47 @@
+"""transaction search index
+
+Revision ID: b43796a91837
+Revises: b74c73cf31df
+Create Date: 2026-10-18 21:12:40.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b43796a91837'
+down_revision = 'b74c73cf31df'
+branch_labels = None
+depends_on = None
+
+
+# FTS5 index over transaction.description, kept in sync by triggers (see
+# app/search.py). SQLite only; autogenerate ignores these objects.
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("""CREATE VIRTUAL TABLE transaction_fts USING fts5(
+        description, content='transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""")
+    op.execute("""CREATE TRIGGER transaction_fts_ai AFTER INSERT ON "transaction" BEGIN
+        INSERT INTO transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END""")
+    op.execute("""CREATE TRIGGER transaction_fts_ad AFTER DELETE ON "transaction" BEGIN
+        INSERT INTO transaction_fts(transaction_fts, rowid, description) VALUES ('delete', old.id, old.description);
+    END""")
+    op.execute("""CREATE TRIGGER transaction_fts_au AFTER UPDATE OF description ON "transaction" BEGIN
+        INSERT INTO transaction_fts(transaction_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END""")
+    # Index the existing transactions
+    op.execute("INSERT INTO transaction_fts(transaction_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER transaction_fts_au')
+    op.execute('DROP TRIGGER transaction_fts_ad')
+    op.execute('DROP TRIGGER transaction_fts_ai')
+    op.execute('DROP TABLE transaction_fts')
@@ -1,7 +1,8 @@
 import pytest
+from sqlalchemy import event
 from app import create_app, db
 from config import TestingConfig
-from app.models import Category, Transaction, Budget
+from app.models import User, Category, Transaction, Budget
 
 @pytest.fixture
 def app():
@@ -19,3 +20,79 @@ def client(app):
 @pytest.fixture
 def runner(app):
     return app.test_cli_runner()
+
+@pytest.fixture
+def make_user(app):
+    """Factory for committed users, approved and with password 'pw' by default."""
+    def make_user(username='user', password='pw', is_approved=True, **fields):
+        user = User(username=username, is_approved=is_approved, **fields)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+@pytest.fixture
+def make_category(app):
+    """Factory for committed categories of a user."""
+    def make_category(user, name='Food', color='#000000', **fields):
+        category = Category(name=name, color=color, user_id=user.id, **fields)
+        db.session.add(category)
+        db.session.commit()
+        return category
+    return make_category
+
+@pytest.fixture
+def user_with_category(make_user, make_category):
+    """Factory for an approved user and one category of theirs, as (user, category)."""
+    def user_with_category(username='user', name='Food', **category_fields):
+        user = make_user(username)
+        return user, make_category(user, name, **category_fields)
+    return user_with_category
+
+@pytest.fixture
+def count_statements(app):
+    """Run fn and return the SQL statements it sent to the database."""
+    def count_statements(fn):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return statements
+    return count_statements
+
+@pytest.fixture
+def query_plans(app):
+    """Run fn and return (statement, EXPLAIN QUERY PLAN text) of each statement it sent."""
+    def query_plans(fn):
+        captured = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        connection = db.session.connection()
+        return [(statement, ' '.join(row[-1] for row in connection.exec_driver_sql(
+            'EXPLAIN QUERY PLAN ' + statement, parameters).fetchall())) for statement, parameters in captured]
+    return query_plans
+
+@pytest.fixture
+def bank_csv():
+    # A bank export: an expense with a thousands separator, income, and a
+    # row naming its category
+    return """Date,Description,Amount,Category
+2025-01-05,Uber trip,-12.50,
+2025-01-06,Weekly groceries,"-1,020.40",
+2025-01-07,Salary,2500.00,
+2025-01-08,Mystery,-3.00,Food
+"""
@@ -0,0 +1,70 @@
+from datetime import datetime
+from app import db
+from app.models import Transaction
+from app.services import get_user_directory
+
+def add_spending(user, category, spending):
+    # Expenses on the given (day, amount) of March 2025, and a salary
+    for day, amount in spending:
+        db.session.add(Transaction(amount=amount, description='x', type='expense', category_id=category.id,
+                                   user_id=user.id, date=datetime(2025, 3, day)))
+    db.session.add(Transaction(amount=1000, description='pay', type='income', user_id=user.id,
+                               date=datetime(2025, 3, 1)))
+    db.session.commit()
+
+def test_directory_aggregates(make_user, user_with_category):
+    add_spending(*user_with_category('alice'), [(3, 10.0), (9, 5.5)])
+    make_user('bob')
+
+    users, next_cursor = get_user_directory()
+    assert next_cursor is None
+    rows = {user.username: row for user, *row in users}
+    assert rows['alice'] == [3, 15.5, datetime(2025, 3, 9), 1]
+    assert rows['bob'] == [0, 0.0, None, 0]
+
+def test_directory_filters_and_pages(make_user):
+    for i in range(5):
+        make_user(f'user{i}', is_approved=i % 2 == 0)
+    make_user('admin', is_admin=True)
+    make_user('other')
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = get_user_directory('user', after=cursor, limit=2)
+        seen.extend(user.username for user, *_ in page)
+        if cursor is None:
+            break
+    assert seen == [f'user{i}' for i in range(5)]
+
+    pending, _ = get_user_directory('user', 'pending')
+    assert [user.username for user, *_ in pending] == ['user1', 'user3']
+    admins, _ = get_user_directory(status='admin')
+    assert [user.username for user, *_ in admins] == ['admin']
+
+def test_directory_is_one_statement(user_with_category, count_statements, query_plans):
+    for i in range(3):
+        add_spending(*user_with_category(f'user{i}'), [(1, 1.0)])
+    db.session.expire_all()
+
+    statements = count_statements(lambda: get_user_directory('user'))
+    assert len(statements) == 1
+
+    # The prefix search seeks on the username index
+    plan_text = query_plans(lambda: get_user_directory('user'))[0][1]
+    assert 'USING COVERING INDEX sqlite_autoindex_user_1 (username>? AND username<?)' in plan_text
+
+def test_admin_dashboard_search(client, make_user, user_with_category):
+    make_user('root', is_admin=True)
+    add_spending(*user_with_category('alice'), [(3, 12.0)])
+    make_user('bob', is_approved=False)
+    client.post('/login', data={'username': 'root', 'password': 'pw'})
+
+    response = client.get('/admin?q=al')
+    assert response.status_code == 200
+    assert b'alice' in response.data and b'bob' not in response.data
+    assert b'12.00' in response.data
+
+    response = client.get('/admin?status=pending')
+    assert b'bob' in response.data and b'alice' not in response.data
+
+    assert client.get('/admin?status=bogus').status_code == 400
@@ -0,0 +1,50 @@
+import pytest
+from app.cache import check_shared_cache
+
+def call(app, client, method, url, **kwargs):
+    # A fresh app context per request, so g (and the loaded user) is not
+    # shared between the test clients
+    with app.app_context():
+        return client.open(url, method=method, **kwargs)
+
+def test_authenticated_requests_skip_user_query(client, app, make_user, count_statements):
+    make_user('alice')
+    client.post('/login', data={'username': 'alice', 'password': 'pw'})
+    responses = []
+    with app.app_context():
+        statements = count_statements(lambda: responses.append(client.get('/api/transactions')))
+    assert responses[0].status_code == 200
+    assert [s for s in statements if 'FROM user' in s] == []
+
+def test_revoke_and_demote_apply_immediately(client, app, make_user):
+    make_user('root', is_admin=True)
+    bob = make_user('bob', is_admin=True)
+    bob_client = app.test_client()
+    call(app, bob_client, 'POST', '/login', data={'username': 'bob', 'password': 'pw'})
+    assert call(app, bob_client, 'GET', '/admin').status_code == 200
+
+    call(app, client, 'POST', '/login', data={'username': 'root', 'password': 'pw'})
+    call(app, client, 'GET', f'/admin/toggle_admin/{bob.id}')
+    assert call(app, bob_client, 'GET', '/admin').status_code == 403
+
+    call(app, client, 'GET', f'/admin/revoke/{bob.id}')
+    response = call(app, bob_client, 'GET', '/api/stats/month')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+def test_password_change_ends_other_sessions(client, app, make_user):
+    make_user('carol')
+    other = app.test_client()
+    call(app, client, 'POST', '/login', data={'username': 'carol', 'password': 'pw'})
+    call(app, other, 'POST', '/login', data={'username': 'carol', 'password': 'pw'})
+
+    call(app, client, 'POST', '/change_password', data={
+        'current_password': 'pw', 'new_password': 'new', 'confirm_password': 'new'
+    })
+    assert call(app, client, 'GET', '/api/stats/month').status_code == 200
+    assert call(app, other, 'GET', '/api/stats/month').status_code == 302
+
+def test_memory_cache_refused_for_several_workers(app):
+    check_shared_cache(app, 1)
+    with pytest.raises(RuntimeError, match='CACHE_BACKEND=sqlite'):
+        check_shared_cache(app, 3)
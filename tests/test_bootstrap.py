@@ -0,0 +1,36 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import create_app
+from app.models import User
+from config import TestingConfig
+
+def test_create_app_does_not_touch_the_database():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        create_app(TestingConfig)
+    finally:
+        event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+    assert statements == []
+
+def test_bootstrap_admin(app, runner):
+    assert User.query.count() == 0
+    result = runner.invoke(args=['bootstrap-admin'])
+    assert result.exit_code == 0, result.output
+    admin = User.query.filter_by(username='admin').one()
+    assert admin.is_admin and admin.is_approved
+    assert admin.check_password('admin')
+
+    # Safe to run on every deploy
+    result = runner.invoke(args=['bootstrap-admin'])
+    assert 'already exists' in result.output
+    assert User.query.count() == 1
+
+def test_bootstrap_admin_password_from_env(app, runner):
+    result = runner.invoke(args=['bootstrap-admin', '--username', 'root'], env={'ADMIN_PASSWORD': 's3cret'})
+    assert result.exit_code == 0, result.output
+    assert User.query.filter_by(username='root').one().check_password('s3cret')
@@ -0,0 +1,75 @@
+from datetime import date, datetime
+from app.models import Category, Transaction, Budget
+from app.services import get_budget_progress, get_spending_series, month_range
+from app import db
+
+def add_spending(user, n_categories):
+    # March 2025 budgets and spending in n new categories of the user
+    for i in range(n_categories):
+        cat = Category(name=f'Cat{i}', color='#000000', user_id=user.id)
+        db.session.add(cat)
+        db.session.flush()
+        db.session.add(Budget(amount=100, month=3, year=2025, category_id=cat.id))
+        db.session.add(Transaction(amount=10, description='a', type='expense', category_id=cat.id,
+                                   user_id=user.id, date=datetime(2025, 3, 5)))
+        db.session.add(Transaction(amount=15, description='b', type='expense', category_id=cat.id,
+                                   user_id=user.id, date=datetime(2025, 3, 20)))
+        # Outside of the selected month
+        db.session.add(Transaction(amount=99, description='c', type='expense', category_id=cat.id,
+                                   user_id=user.id, date=datetime(2025, 4, 1)))
+    db.session.commit()
+    return user
+
+def test_budget_progress_values(make_user):
+    user = add_spending(make_user('progress'), 2)
+    # A category without budget or spending still shows up
+    db.session.add(Category(name='Empty', color='#ffffff', user_id=user.id))
+    db.session.commit()
+
+    data = get_budget_progress(user.id, 3, 2025)
+    assert len(data) == 3
+    first = data[0]
+    assert first['limit'] == 100
+    assert first['spent'] == 25
+    assert first['available'] == 75
+    assert first['percent'] == 25
+    assert data[2]['name'] == 'Empty'
+    assert data[2]['limit'] == 0
+    assert data[2]['spent'] == 0
+    assert data[2]['percent'] == 0
+
+def test_dashboard_statement_count_is_constant(client, app, make_user, count_statements):
+    add_spending(make_user('few'), 2)
+    add_spending(make_user('many'), 40)
+
+    counts = {}
+    for username in ('few', 'many'):
+        client.post('/login', data={'username': username, 'password': 'pw'})
+        # Fresh app context: empty session and g, so the user loader is counted too
+        with app.app_context():
+            statements = count_statements(lambda: client.get('/?month=3&year=2025'))
+        counts[username] = len(statements)
+        client.get('/logout')
+
+    # ETag data version + budget progress + scheduled recurring + recent
+    # transactions; the identity comes from the cache
+    assert counts['few'] == 4
+    assert counts['many'] == counts['few']
+
+def test_month_range_is_half_open():
+    assert month_range(12, 2024) == (datetime(2024, 12, 1), datetime(2025, 1, 1))
+    assert month_range(2, 2025) == (datetime(2025, 2, 1), datetime(2025, 3, 1))
+
+def test_month_filter_uses_transaction_indexes(make_user, query_plans):
+    user = add_spending(make_user('plan'), 3)
+    # Day buckets group raw transactions over the month's date range
+    plans = query_plans(lambda: get_spending_series(user.id, 'day', date(2025, 3, 1), date(2025, 3, 31)))
+    plan_text = [plan for statement, plan in plans if 'strftime' in statement][0]
+    assert 'ix_transaction_user_type_date' in plan_text
+    assert 'date>? AND date<?' in plan_text
+
+    # Budget progress reads the rollup by key, never transactions
+    plans = query_plans(lambda: get_budget_progress(user.id, 3, 2025))
+    plan_text = [plan for statement, plan in plans if 'monthly_category_total' in statement][0]
+    assert 'SEARCH monthly_category_total USING INDEX' in plan_text
+    assert 'transaction' not in plan_text
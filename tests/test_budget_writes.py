@@ -0,0 +1,99 @@
+from app import db
+from app.models import User, Category, Budget
+from app.services import next_months
+
+def add_categories(user, n_categories):
+    # Ids of n new categories of the user
+    categories = [Category(name=f'Cat{i}', color='#000000', user_id=user.id) for i in range(n_categories)]
+    db.session.add_all(categories)
+    db.session.commit()
+    return [category.id for category in categories]
+
+def budgets(user_id):
+    return {
+        (b.category_id, b.month, b.year): b.amount
+        for b in Budget.query.join(Category).filter(Category.user_id == user_id)
+    }
+
+def test_next_months():
+    assert next_months(11, 2025, 3) == [(12, 2025), (1, 2026), (2, 2026)]
+    assert next_months(12, 2025, 0) == []
+
+def test_save_budgets_is_set_based(client, app, make_user, count_statements):
+    user = make_user('saver')
+    cat_ids = add_categories(user, 12)
+    other_ids = add_categories(make_user('other'), 1)
+    client.post('/login', data={'username': 'saver', 'password': 'pw'})
+
+    form = {f'budget_{cat_id}': '50' for cat_id in cat_ids}
+    form.update({'month': '3', 'year': '2025', f'budget_{other_ids[0]}': '999', 'budget_x': '1'})
+    with app.app_context():
+        statements = count_statements(lambda: client.post('/budgets', data=form))
+    writes = [s for s in statements if s.startswith(('SELECT', 'INSERT', 'UPDATE'))]
+    # Ownership check + one upsert, whatever the number of categories, and
+    # the user's data version
+    assert len(writes) == 3
+    assert 'ON CONFLICT' in writes[1]
+    assert 'data_version' in writes[2]
+
+    assert len(budgets(user.id)) == 12
+    assert budgets(User.query.filter_by(username='other').one().id) == {}
+
+    # Saving again updates in place
+    form[f'budget_{cat_ids[0]}'] = '75'
+    client.post('/budgets', data=form)
+    saved = budgets(user.id)
+    assert len(saved) == 12
+    assert saved[(cat_ids[0], 3, 2025)] == 75
+
+def test_saved_budgets_reach_the_dashboard(client, app, make_user):
+    cat_ids = add_categories(make_user('fresh'), 1)
+    client.post('/login', data={'username': 'fresh', 'password': 'pw'})
+    with app.app_context():
+        client.get('/budgets?month=3&year=2025')
+        client.post('/budgets', data={'month': '3', 'year': '2025', f'budget_{cat_ids[0]}': '123'})
+    with app.app_context():
+        response = client.get('/budgets?month=3&year=2025')
+    assert b'value="123.0"' in response.data
+
+def test_copy_forward_and_rest_of_year(client, app, make_user, count_statements):
+    user = make_user('copier')
+    cat_ids = add_categories(user, 2)
+    db.session.add_all([Budget(amount=10 * (i + 1), month=10, year=2025, category_id=cat_id)
+                        for i, cat_id in enumerate(cat_ids)])
+    db.session.add(Budget(amount=1, month=11, year=2025, category_id=cat_ids[0]))
+    db.session.commit()
+    client.post('/login', data={'username': 'copier', 'password': 'pw'})
+
+    with app.app_context():
+        statements = count_statements(lambda: client.post('/budgets/copy', data={
+            'month': '10', 'year': '2025', 'mode': 'forward', 'count': '4'
+        }))
+    assert len([s for s in statements if s.startswith('INSERT')]) == 1
+    saved = budgets(user.id)
+    for month, year in [(11, 2025), (12, 2025), (1, 2026), (2, 2026)]:
+        assert saved[(cat_ids[0], month, year)] == 10
+        assert saved[(cat_ids[1], month, year)] == 20
+    assert (cat_ids[0], 3, 2026) not in saved
+
+    client.post('/budgets/copy', data={'month': '1', 'year': '2026', 'mode': 'year'})
+    saved = budgets(user.id)
+    assert all((cat_ids[1], month, 2026) in saved for month in range(1, 13))
+
+    response = client.post('/budgets/copy', data={'month': '12', 'year': '2026', 'mode': 'year'},
+                           follow_redirects=True)
+    assert b'No months left' in response.data
+
+def test_out_of_range_months_are_rejected(client, app, make_user):
+    user = make_user('typo')
+    cat_ids = add_categories(user, 1)
+    client.post('/login', data={'username': 'typo', 'password': 'pw'})
+
+    assert client.post('/budgets', data={'month': '13', 'year': '2025',
+                                         f'budget_{cat_ids[0]}': '50'}).status_code == 400
+    for form in ({'month': '13', 'year': '2025', 'mode': 'forward', 'count': '3'},
+                 {'month': '0', 'year': '2025', 'mode': 'year'},
+                 {'month': '1', 'year': '10000'}):
+        assert client.post('/budgets/copy', data=form).status_code == 400
+    assert budgets(user.id) == {}
+    assert client.get('/budgets?month=13&year=2025').status_code == 200
@@ -0,0 +1,64 @@
+from datetime import datetime
+from app import db
+from app.models import Category, Transaction, Budget
+from app.services import get_budget_year, get_budget_matrix
+
+def add_plans(user, n_categories):
+    # 2025 budgets in January, June and December for n new categories of the user
+    for i in range(n_categories):
+        cat = Category(name=f'Cat{i}', color='#000000', user_id=user.id)
+        db.session.add(cat)
+        db.session.flush()
+        for month in (1, 6, 12):
+            db.session.add(Budget(amount=100 + month, month=month, year=2025, category_id=cat.id))
+        db.session.add(Transaction(amount=40, description='a', type='expense', category_id=cat.id,
+                                   user_id=user.id, date=datetime(2025, 6, 5)))
+        db.session.add(Transaction(amount=7, description='b', type='expense', category_id=cat.id,
+                                   user_id=user.id, date=datetime(2024, 6, 5)))
+    db.session.commit()
+    return user
+
+def test_budget_year_matrix(make_user):
+    user = add_plans(make_user('planner'), 2)
+    other = add_plans(make_user('other'), 1)
+    db.session.add(Category(name='Empty', color='#ffffff', user_id=user.id))
+    db.session.commit()
+
+    matrix = get_budget_year(user.id, 2025)
+    assert [c['name'] for c in matrix['categories']] == ['Cat0', 'Cat1', 'Empty']
+    assert len(matrix['months']) == 12
+    assert matrix['limits'][0] == [101, None, None, None, None, 106, None, None, None, None, None, 112]
+    assert matrix['limits'][2] == [None] * 12
+    assert matrix['spent'][0][5] == 40
+    assert matrix['spent'][0][4] == 0.0
+    assert matrix['total_limits'][0] == 202
+    assert matrix['total_spent'][5] == 80
+
+    # Months may span years
+    matrix = get_budget_matrix(other.id, [(12, 2024), (1, 2025)])
+    assert matrix['limits'] == [[None, 101]]
+    assert matrix['spent'] == [[0.0, 0.0]]
+
+def year_view_statements(app, client, count_statements, username):
+    client.post('/login', data={'username': username, 'password': 'pw'})
+    with app.app_context():
+        statements = count_statements(lambda: client.get('/budgets/year?year=2025'))
+    client.get('/logout')
+    return len(statements)
+
+def test_year_view_query_count_is_constant(client, app, make_user, count_statements):
+    add_plans(make_user('small'), 2)
+    add_plans(make_user('large'), 50)
+    assert (year_view_statements(app, client, count_statements, 'small')
+            == year_view_statements(app, client, count_statements, 'large') == 1)
+
+def test_year_view_and_api(client, app, make_user):
+    add_plans(make_user('viewer'), 1)
+    client.post('/login', data={'username': 'viewer', 'password': 'pw'})
+    response = client.get('/budgets/year?year=2025')
+    assert response.status_code == 200
+    assert b'40 / 106' in response.data
+
+    data = client.get('/api/budgets/2025').get_json()
+    assert data['year'] == 2025
+    assert data['limits'] == [[101, None, None, None, None, 106, None, None, None, None, None, 112]]
@@ -0,0 +1,101 @@
+import time
+from datetime import datetime
+from app.cache import MemoryBackend, SQLiteBackend, AggregateCache, get_cache
+from app.models import Transaction, Budget
+from app import db
+
+def test_memory_backend_lru_and_ttl(monkeypatch):
+    backend = MemoryBackend(maxsize=2, ttl=10)
+    backend.set(1, 'a', 1)
+    backend.set(1, 'b', 2)
+    backend.get(1, 'a')
+    backend.set(2, 'c', 3)
+    # 'b' was the least recently used entry
+    assert backend.get(1, 'b') == (False, None)
+    assert backend.get(1, 'a') == (True, 1)
+
+    backend.invalidate_user(1)
+    assert backend.get(1, 'a') == (False, None)
+    assert backend.get(2, 'c') == (True, 3)
+
+    now = time.monotonic()
+    monkeypatch.setattr('app.cache.time.monotonic', lambda: now + 11)
+    assert backend.get(2, 'c') == (False, None)
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    first = SQLiteBackend(path)
+    second = SQLiteBackend(path)
+    first.set(1, 'progress', [{'spent': 1.5}])
+    assert second.get(1, 'progress') == (True, [{'spent': 1.5}])
+    second.invalidate_user(1)
+    assert first.get(1, 'progress') == (False, None)
+
+def test_sqlite_backend_prunes_in_batches(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'cache.db'), maxsize=2, prune_every=3)
+    backend.set(1, 'a', 1)
+    backend.set(1, 'b', 2)
+    backend.set(1, 'c', 3)
+    # Pruned on the third set: only the two newest entries are left
+    assert len(backend) == 2 and backend.get(1, 'a') == (False, None)
+    backend.set(1, 'd', 4)
+    assert len(backend) == 3
+
+    plan = backend._connect().execute(
+        'EXPLAIN QUERY PLAN DELETE FROM aggregate_cache WHERE expires < ?', (time.time(),)
+    ).fetchall()
+    assert 'ix_aggregate_cache_expires' in ' '.join(row[-1] for row in plan)
+
+def test_counters():
+    cache = AggregateCache(MemoryBackend())
+    calls = []
+    compute = lambda: calls.append(1) or 42
+    assert cache.get_or_compute(1, ('k', 1), compute) == 42
+    assert cache.get_or_compute(1, ('k', 1), compute) == 42
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_writes_invalidate_dashboard(client, app, user_with_category):
+    user, cat = user_with_category('cache')
+    client.post('/login', data={'username': 'cache', 'password': 'pw'})
+    cache = get_cache()
+
+    response = client.get('/?month=3&year=2025')
+    assert b'Spent: $0.00' in response.data
+    client.get('/?month=3&year=2025')
+    # Budget progress and scheduled recurring transactions
+    assert cache.hits == 2
+
+    db.session.add(Transaction(amount=30, type='expense', category_id=cat.id, user_id=user.id,
+                               date=datetime(2025, 3, 2)))
+    db.session.commit()
+    assert b'Spent: $30.00' in client.get('/?month=3&year=2025').data
+
+    budget = Budget(amount=100, month=3, year=2025, category_id=cat.id)
+    db.session.add(budget)
+    db.session.commit()
+    assert b'Available: $70.00' in client.get('/?month=3&year=2025').data
+
+    budget.amount = 50
+    db.session.commit()
+    assert b'Available: $20.00' in client.get('/?month=3&year=2025').data
+
+def test_other_users_writes_keep_entries(client, app, make_user, user_with_category):
+    make_user('a')
+    other, other_cat = user_with_category('b')
+    client.post('/login', data={'username': 'a', 'password': 'pw'})
+    client.get('/api/stats/month')
+    db.session.add(Transaction(amount=1, type='expense', category_id=other_cat.id, user_id=other.id))
+    db.session.commit()
+    client.get('/api/stats/month')
+    assert get_cache().hits == 1
+
+def test_cache_stats_admin_only(client, app, make_user):
+    make_user('plain')
+    make_user('boss', is_admin=True)
+    client.post('/login', data={'username': 'plain', 'password': 'pw'})
+    assert client.get('/admin/cache').status_code == 403
+    client.get('/logout')
+    client.post('/login', data={'username': 'boss', 'password': 'pw'})
+    assert client.get('/admin/cache').get_json()['backend'] == 'MemoryBackend'
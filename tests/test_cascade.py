@@ -0,0 +1,54 @@
+import time
+from datetime import datetime
+from app import db, rollup, jobs
+from app.models import User, Category, Transaction, Budget, MonthlyCategoryTotal, Job
+from app.seed import seed_data
+
+def row_counts(user_id):
+    return {
+        'categories': Category.query.filter_by(user_id=user_id).count(),
+        'budgets': Budget.query.join(Category).filter(Category.user_id == user_id).count(),
+        'transactions': Transaction.query.filter_by(user_id=user_id).count(),
+        'rollup': MonthlyCategoryTotal.query.filter_by(user_id=user_id).count(),
+    }
+
+def test_delete_category_uncategorizes_and_drops_budgets(client, app):
+    seed_data(users=1, categories=2, transactions=200, months=3, today=datetime(2025, 3, 15))
+    user = User.query.filter_by(username='seed-1').one()
+    client.post('/login', data={'username': 'seed-1', 'password': 'password'})
+    category = Category.query.filter_by(user_id=user.id).first()
+    in_category = Transaction.query.filter_by(category_id=category.id).count()
+    uncategorized = Transaction.query.filter_by(user_id=user.id, category_id=None).count()
+
+    client.get(f'/categories/{category.id}/delete')
+    db.session.expire_all()
+    assert db.session.get(Category, category.id) is None
+    assert Budget.query.filter_by(category_id=category.id).count() == 0
+    assert Transaction.query.filter_by(user_id=user.id, category_id=None).count() == uncategorized + in_category
+    assert rollup.verify(user.id) == []
+
+def test_purge_large_user(client, app, make_user, count_statements):
+    seed_data(users=1, categories=8, transactions=100000, months=24, prefix='big')
+    seed_data(users=1, categories=2, transactions=100, months=2, prefix='keep')
+    big = User.query.filter_by(username='big-1').one().id
+    keep = User.query.filter_by(username='keep-1').one().id
+    kept = row_counts(keep)
+    assert row_counts(big) == {'categories': 8, 'budgets': 8 * 24, 'transactions': 100000,
+                               'rollup': row_counts(big)['rollup']}
+    make_user('root', is_admin=True)
+    client.post('/login', data={'username': 'root', 'password': 'pw'})
+
+    client.get(f'/admin/delete/{big}')
+    job = Job.query.filter_by(kind='delete_user').one()
+    started = time.perf_counter()
+    statements = count_statements(lambda: jobs.run_job(job))
+    elapsed = time.perf_counter() - started
+
+    # Lookup + a single DELETE; the database cascades the rest
+    assert [s.split()[0] for s in statements if 'FROM job' not in s and 'UPDATE job' not in s] == ['SELECT', 'DELETE']
+    assert elapsed < 10
+    db.session.expire_all()
+    assert db.session.get(User, big) is None
+    assert row_counts(big) == {'categories': 0, 'budgets': 0, 'transactions': 0, 'rollup': 0}
+    assert row_counts(keep) == kept
+    assert rollup.verify() == []
@@ -0,0 +1,98 @@
+from datetime import date, datetime
+from app import db, recurring
+from app.models import User, Transaction, RecurringRule
+
+PAGES = ['/', '/?month=3&year=2025', '/history', '/budgets', '/categories', '/api/stats/month']
+
+def version(user_id):
+    return db.session.execute(db.select(User.data_version).where(User.id == user_id)).scalar()
+
+def test_writes_bump_the_owners_version(app, user_with_category):
+    user, cat = user_with_category('phone')
+    other, _ = user_with_category('other')
+    start, other_start = version(user.id), version(other.id)
+
+    db.session.add(Transaction(amount=5, type='expense', category_id=cat.id, user_id=user.id,
+                               date=datetime(2025, 3, 1)))
+    db.session.commit()
+    assert version(user.id) == start + 1
+    cat.name = 'Groceries'
+    db.session.commit()
+    assert version(user.id) == start + 2
+    # Nothing written: no bump
+    db.session.commit()
+    assert version(user.id) == start + 2
+    assert version(other.id) == other_start
+
+    # Core writes marked dirty are counted too
+    rule = RecurringRule(user_id=user.id, type='expense', frequency='weekly', interval=1, amount=1,
+                         description='Paper', start_date=date(2025, 1, 6), next_due=date(2025, 1, 6))
+    db.session.add(rule)
+    db.session.commit()
+    before = version(user.id)
+    recurring.materialize_due(user.id, today=date(2025, 1, 6))
+    assert version(user.id) == before + 1
+
+def test_unchanged_pages_are_not_modified(client, app, make_user, count_statements):
+    make_user('phone')
+    client.post('/login', data={'username': 'phone', 'password': 'pw'})
+
+    responses = []
+    for page in PAGES:
+        response = client.get(page)
+        assert response.status_code == 200
+        etag, weak = response.get_etag()
+        assert weak and response.headers['Cache-Control'] == 'private, no-cache'
+
+        with app.app_context():
+            statements = count_statements(lambda: responses.append(
+                client.get(page, headers={'If-None-Match': f'W/"{etag}"'})))
+        assert responses[-1].status_code == 304, page
+        assert responses[-1].data == b''
+        # Only the data version is read, before any aggregate query or render
+        assert len(statements) == 1 and 'data_version' in statements[0]
+
+def test_writes_change_the_etag(client, app, user_with_category):
+    user, cat = user_with_category('phone')
+    other, other_cat = user_with_category('other')
+    client.post('/login', data={'username': 'phone', 'password': 'pw'})
+    etag = client.get('/').headers['ETag']
+
+    # Another user's writes leave this user's pages alone
+    db.session.add(Transaction(amount=5, type='expense', category_id=other_cat.id, user_id=other.id,
+                               date=datetime.now()))
+    db.session.commit()
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/add', data={'amount': '12', 'description': 'Lunch', 'type': 'expense',
+                              'category': str(cat.id), 'date': date.today().isoformat()})
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and b'Lunch' in response.data
+    assert response.headers['ETag'] != etag
+
+    etag = response.headers['ETag']
+    client.post('/budgets', data={'month': '3', 'year': '2025', f'budget_{cat.id}': '40'})
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 200
+
+def test_flashed_messages_are_always_rendered(client, app, make_user):
+    make_user('phone')
+    client.post('/login', data={'username': 'phone', 'password': 'pw'})
+    etag = client.get('/history').headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Saved!')]
+    response = client.get('/history', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and b'Saved!' in response.data
+
+def test_writes_from_other_processes_and_deploys_change_the_etag(client, app, user_with_category):
+    user, cat = user_with_category('phone')
+    client.post('/login', data={'username': 'phone', 'password': 'pw'})
+    etag = client.get('/').headers['ETag']
+
+    # Another worker's write bumps the version without touching this cache
+    db.session.execute(db.update(User).where(User.id == user.id).values(data_version=User.data_version + 1))
+    db.session.commit()
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 200
+
+    etag = client.get('/').headers['ETag']
+    app.extensions['page_version'] = 'next-release'
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+from datetime import datetime
+from app.models import Transaction
+from app import db
+
+def add_items(user, category, n=5):
+    db.session.add_all([
+        Transaction(amount=i + 1, description=f'item {i}', type='expense', user_id=user.id,
+                    category_id=category.id if i % 2 else None, date=datetime(2025, 1, i + 1))
+        for i in range(n)
+    ])
+    db.session.commit()
+
+def test_export_csv(client, app, user_with_category):
+    add_items(*user_with_category('exporter', color='#123456', icon='🍔'))
+    client.post('/login', data={'username': 'exporter', 'password': 'pw'})
+    response = client.get('/export.csv')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert rows[0]['description'] == 'item 0'
+    assert rows[0]['category_name'] == 'Uncategorized'
+    assert rows[1]['category_name'] == 'Food'
+    assert rows[1]['category_color'] == '#123456'
+
+def test_export_jsonl_uses_one_query(client, app, user_with_category, count_statements):
+    add_items(*user_with_category('exporter', color='#123456', icon='🍔'), 30)
+    client.post('/login', data={'username': 'exporter', 'password': 'pw'})
+    bodies = []
+    statements = count_statements(lambda: bodies.append(client.get('/export.jsonl').get_data(as_text=True)))
+    body = bodies[0]
+
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert len(lines) == 30
+    assert lines[1]['category_icon'] == '🍔'
+    # Only the joined export query; the identity comes from the cache
+    assert len(statements) == 1
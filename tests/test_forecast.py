@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta
+from app import db, forecast, jobs
+from app.models import Category, Transaction, Budget
+
+TODAY = date(2025, 3, 10)
+
+def add_spending(user):
+    food = Category(name='Food', color='#000000', user_id=user.id)
+    fun = Category(name='Fun', color='#000000', user_id=user.id)
+    travel = Category(name='Travel', color='#000000', user_id=user.id)
+    db.session.add_all([food, fun, travel])
+    db.session.commit()
+    db.session.add(Budget(amount=300, month=3, year=2025, category_id=food.id))
+
+    def spend(category, amount, day):
+        db.session.add(Transaction(amount=amount, type='expense', category_id=category.id, user_id=user.id,
+                                   date=datetime.combine(day, datetime.min.time())))
+
+    # Food: 20 a day this month. Fun: 5 or 15 a day for months, then a spike.
+    for day in range(1, 11):
+        spend(food, 20, date(2025, 3, day))
+    for offset in range(10, 120):
+        spend(fun, 5 if offset % 2 else 15, TODAY - timedelta(days=offset))
+    spend(fun, 100, date(2025, 3, 8))
+    # Other months and income do not count
+    spend(food, 500, date(2025, 2, 28))
+    db.session.add(Transaction(amount=1000, type='income', category_id=food.id, user_id=user.id,
+                               date=datetime(2025, 3, 5)))
+    db.session.commit()
+    return user
+
+def by_name(result):
+    return {category['name']: category for category in result['categories']}
+
+def test_projection_and_anomalies(app, make_user):
+    user = add_spending(make_user('planner'))
+    result = forecast.get_forecast(user.id, TODAY)
+    assert result['as_of'] == '2025-03-10' and result['days_in_month'] == 31
+    food, fun, travel = (by_name(result)[name] for name in ('Food', 'Fun', 'Travel'))
+
+    assert food['spent'] == 200.0 and food['burn_rate'] == 20.0 and food['projected'] == 620.0
+    assert food['over_budget'] and food['runs_out_on'] == '2025-03-15'
+    assert not food['anomaly']
+
+    assert fun['limit'] is None and not fun['over_budget'] and fun['runs_out_on'] is None
+    assert fun['anomaly'] and fun['anomaly_on'] == '2025-03-08' and fun['z_score'] > 3
+
+    assert travel == dict(travel, spent=0.0, projected=0.0, z_score=0.0, over_budget=False, anomaly=False)
+
+def test_forecast_is_one_query(app, make_user, count_statements):
+    user = add_spending(make_user('planner'))
+    user_id = user.id
+    db.session.expire_all()
+    results = []
+    statements = count_statements(lambda: results.append(forecast.get_forecast(user_id, TODAY)))
+    assert len(statements) == 1
+    assert len(results[0]['categories']) == 3
+
+def test_batch_scores_every_user(app, make_user):
+    planner = add_spending(make_user('planner'))
+    other = add_spending(make_user('other'))
+    make_user('idle')
+
+    forecasts = forecast.score_all_users(TODAY)
+    assert set(forecasts) == {planner.id, other.id}
+    assert forecasts[planner.id] == forecast.get_forecast(planner.id, TODAY)
+    assert [(user_id, c['name']) for user_id, c in forecast.flagged(forecasts)] == [
+        (planner.id, 'Food'), (planner.id, 'Fun'), (other.id, 'Food'), (other.id, 'Fun')]
+
+def test_batch_job_and_command(app, runner, make_user):
+    add_spending(make_user('planner'))
+    job = jobs.run_job(jobs.enqueue('score_forecasts'))
+    assert job.status == 'done'
+
+    result = runner.invoke(args=['forecast', 'score'])
+    assert result.exit_code == 0
+    assert 'Scored 1 users' in result.output
+
+def test_dashboard_and_api(client, app, user_with_category):
+    user, cat = user_with_category('today')
+    today = date.today()
+    db.session.add(Budget(amount=10, month=today.month, year=today.year, category_id=cat.id))
+    db.session.add(Transaction(amount=50, type='expense', category_id=cat.id, user_id=user.id,
+                               date=datetime.combine(today, datetime.min.time())))
+    db.session.commit()
+    client.post('/login', data={'username': 'today', 'password': 'pw'})
+
+    assert b'On pace for' in client.get('/').data
+    assert b'On pace for' not in client.get('/?month=1&year=2024').data
+    data = client.get('/api/forecast').get_json()
+    assert data['categories'][0]['over_budget'] and data['categories'][0]['spent'] == 50.0
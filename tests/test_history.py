@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from app.models import Transaction
+import pytest
+from app.services import get_transactions_page, transaction_rows, transaction_row_to_dict
+from app import db
+
+def add_history(user, category, n):
+    base = datetime(2025, 1, 1)
+    db.session.add_all([
+        # Pairs of transactions share a timestamp to exercise the id tie-breaker
+        Transaction(amount=i + 1, description=f't{i}', type='expense', category_id=category.id,
+                    user_id=user.id, date=base + timedelta(days=i // 2))
+        for i in range(n)
+    ])
+    db.session.commit()
+    return user
+
+def test_keyset_pages_cover_history_once(app, user_with_category):
+    user = add_history(*user_with_category('hist'), 25)
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = get_transactions_page(user.id, before=cursor, limit=10)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 25
+    assert len({t.id for t in seen}) == 25
+    keys = [(t.date, t.id) for t in seen]
+    assert keys == sorted(keys, reverse=True)
+
+def test_history_page_and_api(client, app, user_with_category):
+    add_history(*user_with_category('hist'), 60)
+    client.post('/login', data={'username': 'hist', 'password': 'pw'})
+
+    response = client.get('/history')
+    assert response.status_code == 200
+    assert response.data.count(b'class="transaction-item"') == 50
+    assert b'data-next-cursor=' in response.data
+
+    first = client.get('/api/transactions?limit=50').get_json()
+    assert len(first['transactions']) == 50
+    rest = client.get(f"/api/transactions?before={first['next_cursor']}&limit=50").get_json()
+    assert len(rest['transactions']) == 10
+    assert rest['next_cursor'] is None
+    assert rest['transactions'][0]['category_name'] == 'Food'
+
+    assert client.get('/api/transactions?before=garbage').status_code == 400
+
+def test_history_is_scoped_to_user(client, app, user_with_category):
+    add_history(*user_with_category('alice'), 3)
+    add_history(*user_with_category('bob'), 2)
+    client.post('/login', data={'username': 'bob', 'password': 'pw'})
+    data = client.get('/api/transactions').get_json()
+    assert len(data['transactions']) == 2
+
+def test_keyset_page_seeks_with_index(app, user_with_category, query_plans):
+    user = add_history(*user_with_category('hist'), 5)
+    plans = query_plans(lambda: get_transactions_page(user.id, before='2025-01-02T00:00:00_3', limit=2))
+    statement, plan_text = plans[-1]
+    assert 'ix_transaction_user_date (user_id=? AND date<?)' in plan_text
+
+def test_listing_is_one_query_without_lazy_loads(app, user_with_category, count_statements):
+    user = add_history(*user_with_category('hist'), 1000)
+    db.session.add(Transaction(amount=5, description='loose', type='expense', user_id=user.id,
+                               date=datetime(2026, 1, 1)))
+    db.session.commit()
+    user_id = user.id
+    db.session.expire_all()
+
+    rows = []
+    statements = count_statements(lambda: rows.extend(
+        transaction_row_to_dict(t) for t in transaction_rows().filter(Transaction.user_id == user_id)
+    ))
+    assert len(rows) == 1001
+    assert len(statements) == 1
+    by_description = {row['description']: row for row in rows}
+    assert by_description['t0']['category_name'] == 'Food'
+    assert by_description['loose']['category_name'] == 'Uncategorized'
+    assert by_description['loose']['date'] == '2026-01-01T00:00:00'
+    assert set(by_description['t0']) == set(Transaction.query.first().to_dict())
+
+def test_collections_are_write_only(app, user_with_category):
+    user = add_history(*user_with_category('hist'), 3)
+    # Collections never load in full; they are queried explicitly
+    with pytest.raises(TypeError):
+        list(user.transactions)
+    assert len(db.session.scalars(user.transactions.select()).all()) == 3
@@ -0,0 +1,104 @@
+import io
+from datetime import datetime
+from decimal import Decimal
+from app.models import Category, Transaction, MonthlyCategoryTotal
+from app import db, importer, rollup
+
+OFX_DATA = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250203120000.000[-5:EST]
+<TRNAMT>-42.00
+<FITID>1
+<NAME>Cinema tickets
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250204
+<TRNAMT>-8.10
+<FITID>2
+<MEMO>Bus pass
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+def add_categories(user):
+    db.session.add_all([
+        Category(name='Food', color='#000000', user_id=user.id),
+        Category(name='Transport', color='#000000', user_id=user.id),
+        Category(name='Entertainment', color='#000000', user_id=user.id),
+    ])
+    db.session.commit()
+    return user
+
+def category_of(description):
+    t = Transaction.query.filter_by(description=description).one()
+    return t.category.name if t.category else None
+
+def test_parse_helpers():
+    assert importer.parse_amount('-1,020.40') == Decimal('-1020.40')
+    assert importer.parse_amount('12,5') == Decimal('12.5')
+    assert importer.parse_ofx_date('20250203120000.000[-5:EST]') == datetime(2025, 2, 3, 12)
+
+def test_csv_import_with_rules_and_dedupe(app, make_user, bank_csv):
+    user = add_categories(make_user('importer'))
+    rules = {'uber': 'Transport', 'groceries': 'Food'}
+    progress = []
+    result = importer.import_transactions(
+        user.id, importer.iter_csv(io.StringIO(bank_csv)), rules, batch_size=2, progress=progress.append
+    )
+    assert result == {'imported': 4, 'duplicates': 0}
+    assert len(progress) == 2
+
+    assert category_of('Uber trip') == 'Transport'
+    assert category_of('Weekly groceries') == 'Food'
+    assert category_of('Mystery') == 'Food'
+    salary = Transaction.query.filter_by(description='Salary').one()
+    assert salary.type == 'income'
+    assert salary.amount == 2500
+
+    # Importing the same export again only finds duplicates
+    result = importer.import_transactions(user.id, importer.iter_csv(io.StringIO(bank_csv)), rules)
+    assert result == {'imported': 0, 'duplicates': 4}
+    assert Transaction.query.filter_by(user_id=user.id).count() == 4
+
+    # Imports keep the rollup exact
+    assert rollup.verify(user.id) == []
+    assert MonthlyCategoryTotal.query.filter_by(user_id=user.id).count() == 2
+
+def test_import_dedupes_against_manual_entries(app, make_user, bank_csv):
+    user = add_categories(make_user('importer'))
+    db.session.add(Transaction(amount=12.5, description='Uber trip', type='expense',
+                               user_id=user.id, date=datetime(2025, 1, 5)))
+    db.session.commit()
+    result = importer.import_transactions(user.id, importer.iter_csv(io.StringIO(bank_csv)))
+    assert result == {'imported': 3, 'duplicates': 1}
+
+def test_ofx_upload(client, app, make_user):
+    add_categories(make_user('importer'))
+    app.config['IMPORT_CATEGORY_RULES'] = {'cinema': 'Entertainment'}
+    client.post('/login', data={'username': 'importer', 'password': 'pw'})
+    response = client.post('/import', data={
+        'file': (io.BytesIO(OFX_DATA.encode()), 'statement.ofx')
+    }, content_type='multipart/form-data', follow_redirects=True)
+    assert b'Imported 2 transactions' in response.data
+    assert category_of('Cinema tickets') == 'Entertainment'
+    bus = Transaction.query.filter_by(description='Bus pass').one()
+    assert bus.date == datetime(2025, 2, 4)
+    assert bus.type == 'expense'
+
+    response = client.post('/import', data={
+        'file': (io.BytesIO(b'foo,bar\n1,2\n'), 'broken.csv')
+    }, content_type='multipart/form-data', follow_redirects=True)
+    assert b'Import failed' in response.data
+
+def test_import_cli(app, runner, tmp_path, make_user, bank_csv):
+    add_categories(make_user('importer'))
+    path = tmp_path / 'export.csv'
+    path.write_text(bank_csv)
+    result = runner.invoke(args=['import-transactions', str(path), '--user', 'importer',
+                                 '--rule', 'salary=Food'])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 4 transactions' in result.output
+    assert category_of('Salary') == 'Food'
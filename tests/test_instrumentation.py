@@ -0,0 +1,43 @@
+import json
+import logging
+import re
+
+def parse_server_timing(header):
+    metrics = {}
+    for part in header.split(', '):
+        name, *params = part.split(';')
+        metrics[name] = dict(p.split('=', 1) for p in params)
+    return metrics
+
+def test_server_timing_header(client, app, make_user):
+    make_user('timed')
+    response = client.post('/login', data={'username': 'timed', 'password': 'pw'})
+    metrics = parse_server_timing(response.headers['Server-Timing'])
+    assert set(metrics) == {'db', 'render', 'hash', 'total'}
+    assert float(metrics['hash']['dur']) > 0
+    assert re.fullmatch(r'"\d+ queries"', metrics['db']['desc'])
+
+    with app.app_context():
+        response = client.get('/history')
+    metrics = parse_server_timing(response.headers['Server-Timing'])
+    assert float(metrics['render']['dur']) > 0
+    assert float(metrics['hash']['dur']) == 0
+    assert float(metrics['total']['dur']) >= float(metrics['db']['dur'])
+
+def test_request_log_line(client, app, caplog, make_user):
+    make_user('timed')
+    with caplog.at_level(logging.INFO, logger='app.requests'):
+        client.post('/login', data={'username': 'timed', 'password': 'pw'})
+        with app.app_context():
+            client.get('/')
+    records = [json.loads(r.getMessage()) for r in caplog.records if r.name == 'app.requests']
+    assert [r['endpoint'] for r in records] == ['main.login', 'main.index']
+    line = records[-1]
+    assert line['endpoint'] == 'main.index'
+    assert line['status'] == 200
+    assert line['statements'] == 5
+    assert line['render_ms'] > 0
+
+def test_header_can_be_disabled(client, app):
+    app.config['SERVER_TIMING'] = False
+    assert 'Server-Timing' not in client.get('/login').headers
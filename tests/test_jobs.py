@@ -0,0 +1,128 @@
+import io
+import sqlite3
+import threading
+import pytest
+from datetime import datetime, timedelta
+from app import db, jobs
+from app.models import User, Category, Transaction, Job
+
+def test_enqueue_and_run(app):
+    job = jobs.enqueue('rebuild_rollup')
+    assert job.status == 'queued'
+    assert jobs.run_pending() == 1
+    job = db.session.get(Job, job.id)
+    assert job.status == 'done'
+    assert job.to_dict()['result'] == {'mismatches': 0}
+    assert job.started_at and job.finished_at
+    assert jobs.claim_next() is None
+
+    with pytest.raises(ValueError):
+        jobs.enqueue('nope')
+
+def test_failed_job_records_error(app):
+    job = jobs.enqueue('import_file', user_id=1, path='/nonexistent.csv', remove=False)
+    jobs.run_pending()
+    job = db.session.get(Job, job.id)
+    assert job.status == 'failed'
+    assert 'FileNotFoundError' in job.error
+
+def test_claim_skips_jobs_taken_by_another_worker(app):
+    first = jobs.enqueue('rebuild_rollup')
+    second = jobs.enqueue('rebuild_rollup')
+    first.status = 'running'
+    db.session.commit()
+    assert jobs.claim_next().id == second.id
+    assert jobs.claim_next() is None
+
+def test_stale_running_jobs_are_requeued(app, make_user):
+    victim = make_user('victim')
+    job = jobs.enqueue('delete_user', user_id=victim.id)
+    # The worker that claimed it was killed before finishing
+    assert jobs.claim_next().id == job.id
+    assert jobs.claim_next() is None
+
+    job.started_at = datetime.utcnow() - timedelta(seconds=app.config['JOB_STALE_AFTER'] + 1)
+    db.session.commit()
+    assert jobs.run_pending() == 1
+    job = db.session.get(Job, job.id)
+    assert job.status == 'done'
+    assert db.session.get(User, victim.id) is None
+
+def test_delete_user_is_queued(client, app, make_user):
+    make_user('root', is_admin=True)
+    victim = make_user('victim')
+    db.session.add(Category(name='Food', color='#000000', user_id=victim.id))
+    db.session.commit()
+    client.post('/login', data={'username': 'root', 'password': 'pw'})
+
+    response = client.get(f'/admin/delete/{victim.id}', follow_redirects=True)
+    assert b'queued' in response.data
+    db.session.expire_all()
+    # Locked out right away, purged by the worker
+    assert db.session.get(User, victim.id).is_approved is False
+    job = Job.query.one()
+    assert client.get(f'/admin/jobs/{job.id}').get_json()['status'] == 'queued'
+
+    jobs.run_pending()
+    status = client.get(f'/admin/jobs/{job.id}').get_json()
+    assert status['status'] == 'done'
+    assert status['params'] == {'user_id': victim.id}
+    db.session.expire_all()
+    assert db.session.get(User, victim.id) is None
+    assert Category.query.count() == 0
+
+def test_job_status_is_admin_only(client, app, make_user):
+    make_user('plain')
+    job = jobs.enqueue('rebuild_rollup')
+    client.post('/login', data={'username': 'plain', 'password': 'pw'})
+    assert client.get(f'/admin/jobs/{job.id}').status_code == 403
+
+def test_large_import_runs_as_job(client, app, tmp_path, make_user, bank_csv):
+    app.config['IMPORT_INLINE_MAX_BYTES'] = 10
+    app.config['IMPORT_UPLOAD_DIR'] = str(tmp_path)
+    user = make_user('importer')
+    client.post('/login', data={'username': 'importer', 'password': 'pw'})
+    response = client.post('/import', data={
+        'file': (io.BytesIO(bank_csv.encode()), 'export.csv')
+    }, content_type='multipart/form-data', follow_redirects=True)
+    assert b'import was queued' in response.data
+    assert Transaction.query.count() == 0
+
+    jobs.run_pending()
+    job = Job.query.one()
+    assert job.to_dict()['result'] == {'imported': 4, 'duplicates': 0}
+    assert Transaction.query.filter_by(user_id=user.id).count() == 4
+    assert list(tmp_path.iterdir()) == []
+
+def test_backup_job(app, tmp_path, make_user):
+    make_user('someone')
+    job = jobs.enqueue('backup', directory=str(tmp_path))
+    jobs.run_pending()
+    result = db.session.get(Job, job.id).to_dict()['result']
+    with sqlite3.connect(result['path']) as copy:
+        assert copy.execute('SELECT username FROM user').fetchall() == [('someone',)]
+
+def test_worker_cli(app, runner):
+    jobs.enqueue('rebuild_rollup')
+    result = runner.invoke(args=['jobs', 'worker', '--once'])
+    assert result.exit_code == 0, result.output
+    assert 'Ran 1 jobs.' in result.output
+
+    result = runner.invoke(args=['jobs', 'enqueue', 'rebuild_rollup', '--param', 'user_id=1'])
+    assert result.exit_code == 0, result.output
+    assert Job.query.filter_by(status='queued').one().to_dict()['params'] == {'user_id': 1}
+
+def test_worker_survives_loop_errors(app, monkeypatch):
+    stop = threading.Event()
+    calls = []
+
+    def run_pending():
+        calls.append(1)
+        if len(calls) < 3:
+            raise sqlite3.OperationalError('no such table: job')
+        stop.set()
+        return 0
+
+    monkeypatch.setattr(jobs, 'run_pending', run_pending)
+    jobs.work(threads=1, poll_interval=0.01, stop=stop)
+    assert len(calls) == 3
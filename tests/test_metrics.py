@@ -0,0 +1,46 @@
+from app.metrics import MetricsRegistry, render_prometheus
+
+def test_metrics_endpoint(client, app, make_user):
+    make_user('root', is_admin=True)
+    client.post('/login', data={'username': 'root', 'password': 'pw'})
+    with app.app_context():
+        client.get('/')
+    with app.app_context():
+        response = client.get('/admin/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'budget_requests_total{endpoint="main.login",method="POST",status="302"} 1' in text
+    assert 'budget_request_duration_seconds_count{endpoint="main.index"} 1' in text
+    assert 'budget_request_duration_seconds_bucket{endpoint="main.index",le="+Inf"} 1' in text
+    assert 'budget_password_hash_seconds_count{endpoint="main.login"} 1' in text
+    assert 'budget_password_hash_seconds_count{endpoint="main.index"}' not in text
+    assert 'budget_sql_statements_total{endpoint="main.index"} 5' in text
+    assert 'budget_cache_hit_ratio' in text
+
+def test_metrics_are_admin_only(client, app, make_user):
+    make_user('plain')
+    client.post('/login', data={'username': 'plain', 'password': 'pw'})
+    with app.app_context():
+        assert client.get('/admin/metrics').status_code == 403
+
+def test_multiprocess_aggregation(tmp_path):
+    # Two registries sharing a directory stand in for two workers
+    first = MetricsRegistry(str(tmp_path), flush_interval=0)
+    second = MetricsRegistry(str(tmp_path), flush_interval=0)
+    first.observe_request('main.index', 'GET', 200, 0.02, 3, 0.004, 0)
+    second.observe_request('main.index', 'GET', 200, 0.3, 2, 0.01, 0)
+    second.observe_request('main.login', 'POST', 302, 0.2, 3, 0.001, 0.15)
+
+    state = first.collect()
+    assert state['requests'] == {'main.index|GET|200': 2, 'main.login|POST|302': 1}
+    assert state['statements']['main.index'] == 5
+    assert state['duration']['main.index']['count'] == 2
+
+    text = render_prometheus(state)
+    assert 'budget_request_duration_seconds_bucket{endpoint="main.index",le="0.025"} 1' in text
+    assert 'budget_request_duration_seconds_bucket{endpoint="main.index",le="0.5"} 2' in text
+    assert 'budget_password_hash_seconds_bucket{endpoint="main.login",le="0.25"} 1' in text
+
+    first.clear()
+    assert list(tmp_path.iterdir()) == []
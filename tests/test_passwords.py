@@ -0,0 +1,101 @@
+import threading
+import time
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User
+from app.passwords import PasswordHasher, HashingBusy, get_hasher
+
+def test_hash_uses_configured_method(app):
+    user = User(username='alice', is_approved=True)
+    user.set_password('pw')
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+    assert not get_hasher().needs_rehash(user.password_hash)
+    assert get_hasher().needs_rehash(generate_password_hash('pw', method='scrypt'))
+
+def test_login_upgrades_outdated_hash(client, app):
+    user = User(username='alice', is_approved=True,
+                password_hash=generate_password_hash('pw', method='pbkdf2:sha256:500'))
+    db.session.add(user)
+    db.session.commit()
+
+    # A failed login leaves the hash alone
+    client.post('/login', data={'username': 'alice', 'password': 'wrong'})
+    db.session.expire_all()
+    assert user.password_hash.startswith('pbkdf2:sha256:500$')
+
+    response = client.post('/login', data={'username': 'alice', 'password': 'pw'})
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+    assert user.check_password('pw')
+    # Same password: the session just started stays valid
+    assert user.auth_version == 0
+    assert client.get('/').status_code == 200
+
+def test_hash_pool_is_bounded():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', threads=2, max_pending=0)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return threading.current_thread().name
+
+    names = []
+    callers = [threading.Thread(target=lambda: names.append(hasher._run(work))) for _ in range(6)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+
+    assert peak[0] == 2
+    assert all(name.startswith('password-hash') for name in names)
+    assert hasher.verify(hasher.hash('pw'), 'pw')
+    assert not hasher.verify(None, 'pw')
+
+def test_pending_hashes_are_capped():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', threads=1, max_pending=2)
+    release = threading.Event()
+    results = []
+
+    def call():
+        try:
+            results.append(hasher._run(release.wait, 5))
+        except HashingBusy:
+            results.append('busy')
+
+    callers = [threading.Thread(target=call) for _ in range(5)]
+    for caller in callers:
+        caller.start()
+    # Two requests hold the pool (one hashing, one waiting); the rest are
+    # refused at once instead of queueing behind them
+    while results.count('busy') < 3:
+        time.sleep(0.01)
+    release.set()
+    for caller in callers:
+        caller.join()
+    assert sorted(results, key=str) == [True, True, 'busy', 'busy', 'busy']
+    assert hasher.verify(hasher.hash('pw'), 'pw')
+
+def test_login_spike_gets_503_and_pages_keep_serving(client, app):
+    user = User(username='alice', is_approved=True)
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+
+    _, pending = get_hasher()._process_state()
+    for _ in range(app.config['PASSWORD_HASH_MAX_PENDING']):
+        pending.acquire()
+    try:
+        response = client.post('/login', data={'username': 'alice', 'password': 'pw'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert client.get('/login').status_code == 200
+    finally:
+        for _ in range(app.config['PASSWORD_HASH_MAX_PENDING']):
+            pending.release()
+    assert client.post('/login', data={'username': 'alice', 'password': 'pw'}).status_code == 302
@@ -0,0 +1,136 @@
+from datetime import date, datetime, timedelta
+from app import db, rollup, recurring
+from app.models import Transaction, RecurringRule
+
+def make_rule(user, cat=None, **fields):
+    fields.setdefault('frequency', 'monthly')
+    fields.setdefault('interval', 1)
+    fields.setdefault('amount', 100.0)
+    fields.setdefault('description', 'Rent')
+    rule = RecurringRule(user_id=user.id, category_id=cat.id if cat else None, type='expense', **fields)
+    rule.next_due = recurring.next_occurrence(rule, rule.start_date)
+    db.session.add(rule)
+    db.session.commit()
+    return rule
+
+def test_monthly_occurrences_clamp_and_step():
+    rule = RecurringRule(frequency='monthly', interval=1, day=31, start_date=date(2025, 1, 15))
+    assert recurring.occurrences(rule, date(2025, 1, 1), date(2025, 5, 1)) == [
+        date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)]
+
+    # Every other month, first occurrence on or after start_date
+    rule = RecurringRule(frequency='monthly', interval=2, day=10, start_date=date(2025, 1, 20),
+                         end_date=date(2025, 9, 10))
+    assert recurring.occurrences(rule, date(2024, 1, 1), date(2026, 1, 1)) == [
+        date(2025, 3, 10), date(2025, 5, 10), date(2025, 7, 10), date(2025, 9, 10)]
+    assert recurring.occurrences(rule, date(2025, 5, 11), date(2025, 7, 11)) == [date(2025, 7, 10)]
+
+def test_weekly_occurrences():
+    rule = RecurringRule(frequency='weekly', interval=2, start_date=date(2025, 1, 6))
+    assert recurring.occurrences(rule, date(2025, 1, 10), date(2025, 2, 20)) == [
+        date(2025, 1, 20), date(2025, 2, 3), date(2025, 2, 17)]
+    assert recurring.next_occurrence(rule, date(2025, 1, 7)) == date(2025, 1, 20)
+
+def test_scheduled_is_one_query_and_skips_stored(app, user_with_category, count_statements):
+    user, cat = user_with_category('rent', 'Housing')
+    for i in range(5):
+        make_rule(user, cat, day=i + 1, start_date=date(2030, 1, 1))
+    make_rule(user, None, frequency='weekly', start_date=date(2030, 1, 7), description='Cleaner')
+    user_id = user.id
+    db.session.expire_all()
+
+    items = []
+    statements = count_statements(lambda: items.extend(
+        recurring.scheduled(user_id, date(2030, 1, 1), date(2030, 2, 1))))
+    assert len(statements) == 1
+    assert len(items) == 5 + 4
+    assert [item['date'] for item in items] == sorted(item['date'] for item in items)
+    assert items[0]['category_name'] == 'Housing'
+    assert [i for i in items if i['description'] == 'Cleaner'][0]['category_name'] == 'Uncategorized'
+
+def test_materialize_due_stores_in_bulk_once(app, user_with_category):
+    user, cat = user_with_category('rent', 'Housing')
+    rule = make_rule(user, cat, day=5, start_date=date(2025, 1, 1))
+    make_rule(user, cat, day=1, start_date=date(2025, 6, 1), description='Future')
+
+    assert recurring.materialize_due(user.id, today=date(2025, 3, 10)) == 3
+    stored = Transaction.query.filter_by(user_id=user.id).order_by(Transaction.date).all()
+    assert [t.date for t in stored] == [datetime(2025, 1, 5), datetime(2025, 2, 5), datetime(2025, 3, 5)]
+    assert all(t.dedupe_key for t in stored)
+    db.session.expire_all()
+    assert rule.next_due == date(2025, 4, 5)
+    assert rollup.verify(user.id) == []
+
+    # Nothing due twice, and the March window only shows what is left
+    assert recurring.materialize_due(user.id, today=date(2025, 3, 10)) == 0
+    assert recurring.scheduled(user.id, date(2025, 3, 1), date(2025, 4, 1)) == []
+    assert [i['date'] for i in recurring.scheduled(user.id, date(2025, 4, 1), date(2025, 5, 1))] == ['2025-04-05']
+
+def test_rule_end_stops_materialization(app, user_with_category):
+    user, cat = user_with_category('rent', 'Housing')
+    rule = make_rule(user, cat, frequency='weekly', start_date=date(2025, 1, 6), end_date=date(2025, 1, 20))
+    assert recurring.materialize_due(today=date(2025, 3, 1)) == 3
+    db.session.expire_all()
+    assert rule.next_due is None
+
+def test_dashboard_and_stats_show_scheduled(client, app, user_with_category):
+    user, cat = user_with_category('rent', 'Housing')
+    today = date.today()
+    next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    make_rule(user, cat, day=15, start_date=next_month, description='Gym')
+    client.post('/login', data={'username': 'rent', 'password': 'pw'})
+
+    response = client.get(f'/?month={next_month.month}&year={next_month.year}')
+    assert b'Scheduled This Month' in response.data and b'Gym' in response.data
+    assert Transaction.query.count() == 0
+
+    start = next_month.isoformat()
+    end = (next_month + timedelta(days=27)).isoformat()
+    data = client.get(f'/api/stats/day?from={start}&to={end}').get_json()
+    assert data['scheduled'][14] == 100.0
+    assert sum(data['scheduled']) == 100.0
+
+def test_past_start_backfills_and_delete_keeps_history(client, app, user_with_category):
+    user, cat = user_with_category('rent', 'Housing')
+    client.post('/login', data={'username': 'rent', 'password': 'pw'})
+    start = date.today() - timedelta(weeks=3)
+    response = client.post('/recurring', data={
+        'amount': '20', 'description': 'Paper', 'frequency': 'weekly',
+        'start_date': start.isoformat(), 'category': str(cat.id)
+    }, follow_redirects=True)
+    assert b'4 past occurrences recorded' in response.data
+    assert Transaction.query.filter_by(description='Paper').count() == 4
+
+    rule = RecurringRule.query.one()
+    client.post(f'/recurring/{rule.id}/delete')
+    assert RecurringRule.query.count() == 0
+    assert Transaction.query.filter_by(description='Paper').count() == 4
+
+    response = client.post('/recurring', data={'amount': '5', 'frequency': 'daily'}, follow_redirects=True)
+    assert b'Invalid recurring transaction' in response.data
+
+def test_out_of_range_rules_are_rejected(client, app, user_with_category):
+    user_with_category('rent', 'Housing')
+    client.post('/login', data={'username': 'rent', 'password': 'pw'})
+    for form in ({'frequency': 'monthly', 'interval': '100000'},
+                 {'frequency': 'weekly', 'start_date': '9999-12-30'},
+                 {'frequency': 'monthly', 'start_date': '2025-01-01', 'end_date': '9999-12-01'}):
+        response = client.post('/recurring', data=dict(form, amount='5'), follow_redirects=True)
+        assert response.status_code == 200
+        assert b'Invalid recurring transaction' in response.data
+    assert RecurringRule.query.count() == 0
+
+def test_dashboard_stores_due_occurrences(client, app, user_with_category):
+    user, cat = user_with_category('rent', 'Housing')
+    today = date.today()
+    make_rule(user, cat, day=1, start_date=today.replace(day=1), description='Phone')
+    client.post('/logout')
+    client.post('/login', data={'username': 'rent', 'password': 'pw'})
+    db.session.query(Transaction).delete()
+    db.session.execute(db.update(RecurringRule).values(next_due=today.replace(day=1)))
+    db.session.commit()
+
+    response = client.get('/')
+    assert b'Phone' in response.data
+    assert Transaction.query.filter_by(description='Phone').count() == 1
+    assert b'Scheduled This Month' not in response.data
@@ -0,0 +1,71 @@
+from datetime import datetime
+from app.models import Transaction, MonthlyCategoryTotal
+from app import db, rollup
+
+def totals(user_id):
+    return {
+        (r.category_id, r.year, r.month): (r.total, r.count)
+        for r in MonthlyCategoryTotal.query.filter_by(user_id=user_id)
+    }
+
+def test_rollup_follows_orm_writes(app, user_with_category):
+    user, cat = user_with_category('roll')
+    t1 = Transaction(amount=10, type='expense', category_id=cat.id, user_id=user.id, date=datetime(2025, 1, 5))
+    t2 = Transaction(amount=5, type='expense', category_id=cat.id, user_id=user.id, date=datetime(2025, 1, 9))
+    income = Transaction(amount=500, type='income', category_id=cat.id, user_id=user.id, date=datetime(2025, 1, 9))
+    db.session.add_all([t1, t2, income])
+    db.session.commit()
+    assert totals(user.id) == {(cat.id, 2025, 1): (15, 2)}
+
+    # Moving a transaction to another month moves its contribution
+    t2.date = datetime(2025, 2, 1)
+    t2.amount = 7
+    db.session.commit()
+    assert totals(user.id) == {(cat.id, 2025, 1): (10, 1), (cat.id, 2025, 2): (7, 1)}
+
+    db.session.delete(t1)
+    db.session.commit()
+    assert totals(user.id) == {(cat.id, 2025, 2): (7, 1)}
+    assert rollup.verify(user.id) == []
+
+def test_rollup_on_routes(client, app, user_with_category):
+    user, cat = user_with_category('roll')
+    cat_id = cat.id
+    client.post('/login', data={'username': 'roll', 'password': 'pw'})
+    client.post('/add', data={'amount': '12.5', 'description': 'x', 'category': str(cat_id)})
+    today = datetime.utcnow()
+    assert totals(user.id) == {(cat_id, today.year, today.month): (12.5, 1)}
+
+    response = client.get('/api/stats/month')
+    assert response.get_json()['data'] == [12.5]
+
+    # Deleting the category moves its totals to Uncategorized
+    client.get(f'/categories/{cat_id}/delete')
+    assert totals(user.id) == {(None, today.year, today.month): (12.5, 1)}
+
+    t = Transaction.query.filter_by(user_id=user.id).first()
+    client.get(f'/transactions/{t.id}/delete')
+    assert totals(user.id) == {}
+    assert rollup.verify(user.id) == []
+
+def test_rollup_rebuild_command(app, runner, user_with_category):
+    user, cat = user_with_category('roll')
+    db.session.add_all([
+        Transaction(amount=3, type='expense', category_id=cat.id, user_id=user.id, date=datetime(2024, 12, 31)),
+        Transaction(amount=4, type='expense', category_id=None, user_id=user.id, date=datetime(2025, 1, 1)),
+    ])
+    db.session.commit()
+
+    # Corrupt the rollup, the rebuild must restore it
+    MonthlyCategoryTotal.query.delete()
+    db.session.add(MonthlyCategoryTotal(user_id=user.id, category_id=cat.id, year=2020, month=1, total=1, count=1))
+    db.session.commit()
+    assert rollup.verify(user.id) != []
+
+    result = runner.invoke(args=['rollup', 'rebuild', '--user', 'roll'])
+    assert result.exit_code == 0, result.output
+    assert 'verified' in result.output
+    assert totals(user.id) == {(cat.id, 2024, 12): (3, 1), (None, 2025, 1): (4, 1)}
+
+    result = runner.invoke(args=['rollup', 'rebuild', '--user', 'nobody'])
+    assert result.exit_code != 0
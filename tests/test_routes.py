@@ -128,3 +128,12 @@ def test_dashboard_period_filtering(client, app):
     # Spent: $100.00
     assert b"Spent: $100.00" in response.data
 
+
+def test_dashboard_out_of_range_period_falls_back_to_today(client, app):
+    register(client, 'user_range', 'pass')
+    login(client, 'user_range', 'pass')
+    current = f'value="{datetime.now().year}" selected'.encode()
+    for query in ('month=13', 'month=0', 'year=0', 'month=12&year=9999', 'month=x'):
+        response = client.get(f'/?{query}')
+        assert response.status_code == 200, query
+        assert current in response.data
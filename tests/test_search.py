@@ -0,0 +1,123 @@
+from datetime import datetime, date
+from app import db
+from app.models import User, Category, Transaction
+from app.search import search_transactions, parse_search_args
+
+def add_rows(user):
+    food = Category(name='Food', color='#000000', user_id=user.id)
+    travel = Category(name='Travel', color='#000000', user_id=user.id)
+    db.session.add_all([food, travel])
+    db.session.commit()
+    rows = [
+        ('Coffee', 3.5, food, datetime(2025, 1, 5)),
+        ('Coffee beans and a large birthday cake', 30.0, food, datetime(2025, 2, 1)),
+        ('Groceries at the market', 54.2, food, datetime(2025, 2, 10)),
+        ('Train ticket to Zürich', 120.0, travel, datetime(2025, 3, 1)),
+        ('Café crème', 4.0, food, datetime(2025, 3, 2)),
+    ]
+    db.session.add_all([
+        Transaction(description=description, amount=amount, type='expense', category_id=category.id,
+                    user_id=user.id, date=when)
+        for description, amount, category, when in rows
+    ])
+    db.session.commit()
+    return user, food, travel
+
+def descriptions(rows):
+    return [row.description for row in rows]
+
+def integrity_check():
+    db.session.execute(db.text("INSERT INTO transaction_fts(transaction_fts, rank) VALUES ('integrity-check', 1)"))
+
+def test_search_matches_prefixes_and_ranks(app, make_user):
+    user, food, travel = add_rows(make_user('finder'))
+    add_rows(make_user('other'))
+
+    rows, has_next = search_transactions(user.id, 'coff')
+    # The shorter description is the better match
+    assert descriptions(rows) == ['Coffee', 'Coffee beans and a large birthday cake']
+    assert not has_next
+    assert rows[0].category_name == 'Food'
+
+    # Every word must match; case and diacritics do not matter
+    assert descriptions(search_transactions(user.id, 'coffee CAKE')[0]) == ['Coffee beans and a large birthday cake']
+    assert descriptions(search_transactions(user.id, 'zurich')[0]) == ['Train ticket to Zürich']
+    assert descriptions(search_transactions(user.id, 'cafe')[0]) == ['Café crème']
+    # FTS5 syntax in the input is just punctuation
+    assert descriptions(search_transactions(user.id, '"coffee" OR NEAR(')[0]) == []
+    assert len(search_transactions(user.id, '"*')[0]) == 5
+
+def test_search_filters_and_pages(app, make_user):
+    user, food, travel = add_rows(make_user('finder'))
+
+    rows, _ = search_transactions(user.id, category_id=travel.id)
+    assert descriptions(rows) == ['Train ticket to Zürich']
+    rows, _ = search_transactions(user.id, start=date(2025, 2, 1), end=date(2025, 3, 1))
+    assert descriptions(rows) == ['Train ticket to Zürich', 'Groceries at the market',
+                                  'Coffee beans and a large birthday cake']
+    rows, _ = search_transactions(user.id, 'coffee', min_amount=10)
+    assert descriptions(rows) == ['Coffee beans and a large birthday cake']
+    rows, _ = search_transactions(user.id, max_amount=4.0)
+    assert descriptions(rows) == ['Café crème', 'Coffee']
+
+    first, has_next = search_transactions(user.id, limit=2)
+    assert has_next
+    second, _ = search_transactions(user.id, page=2, limit=2)
+    third, has_next = search_transactions(user.id, page=3, limit=2)
+    assert not has_next
+    assert len({row.id for row in first + second + third}) == 5
+
+def test_index_follows_writes(app, make_user):
+    user, food, travel = add_rows(make_user('finder'))
+    t = Transaction.query.filter_by(description='Coffee').one()
+    t.description = 'Espresso'
+    db.session.commit()
+    assert descriptions(search_transactions(user.id, 'espresso')[0]) == ['Espresso']
+    assert descriptions(search_transactions(user.id, 'coffee')[0]) == ['Coffee beans and a large birthday cake']
+
+    db.session.delete(t)
+    db.session.commit()
+    assert search_transactions(user.id, 'espresso')[0] == []
+
+    # ON DELETE CASCADE fires the triggers too
+    db.session.execute(db.delete(User).where(User.id == user.id))
+    db.session.commit()
+    integrity_check()
+
+def test_search_uses_fts_index(app, make_user, query_plans):
+    user, food, travel = add_rows(make_user('finder'))
+    statement, plan_text = query_plans(lambda: search_transactions(user.id, 'coffee'))[-1]
+    assert 'SCAN transaction_fts VIRTUAL TABLE INDEX' in plan_text
+
+def test_parse_search_args():
+    assert parse_search_args({}) == {}
+    assert parse_search_args({'before': 'x'}) == {}
+    args = parse_search_args({'q': ' tea ', 'end': '2025-03-01', 'min': '2', 'page': '0'})
+    assert args['q'] == 'tea' and args['end'] == date(2025, 3, 1) and args['min_amount'] == 2.0
+    assert args['page'] == 1 and args['category_id'] is None
+
+def test_history_search_page(client, app, make_user):
+    add_rows(make_user('finder'))
+    client.post('/login', data={'username': 'finder', 'password': 'pw'})
+
+    response = client.get('/history?q=coffee')
+    assert response.status_code == 200
+    assert response.data.count(b'class="transaction-item"') == 2
+    assert b'Groceries' not in response.data
+
+    assert b'No matching transactions' in client.get('/history?q=nothing').data
+    assert client.get('/history?min=abc').status_code == 400
+    assert client.get('/history?start=2025-13-01').status_code == 400
+
+def test_search_range_edges(client, app, make_user):
+    user, food, travel = add_rows(make_user('finder'))
+    db.session.add(Transaction(description='Late coffee', amount=2.0, type='expense', category_id=food.id,
+                               user_id=user.id, date=datetime(2025, 3, 2, 23, 59, 59, 500000)))
+    db.session.commit()
+    assert 'Late coffee' in descriptions(search_transactions(user.id, 'coffee', end=date(2025, 3, 2))[0])
+    assert search_transactions(user.id, 'coffee', start=date(2025, 3, 3), end=date.max)[0] == []
+
+    client.post('/login', data={'username': 'finder', 'password': 'pw'})
+    response = client.get('/history?q=coffee&end=9999-12-31')
+    assert response.status_code == 200 and b'Late coffee' in response.data
+    assert client.get('/history?q=coffee&page=99999999999999999999').status_code == 400
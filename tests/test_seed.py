@@ -0,0 +1,56 @@
+from datetime import datetime
+from app import db, rollup
+from app.models import User, MonthlyCategoryTotal, Category, Transaction, Budget
+from app.cache import get_cache
+from app.seed import seed_data
+
+def test_seed_data(app):
+    usernames = seed_data(users=2, categories=3, transactions=200, months=4, today=datetime(2025, 3, 15))
+    assert usernames == ['seed-1', 'seed-2']
+    user = User.query.filter_by(username='seed-1').one()
+    assert user.is_approved and user.check_password('password')
+    assert Category.query.filter_by(user_id=user.id).count() == 3
+    assert Budget.query.join(Category).filter(Category.user_id == user.id).count() == 3 * 4
+
+    transactions = Transaction.query.filter_by(user_id=user.id)
+    assert transactions.count() == 200
+    assert min(t.date for t in transactions) >= datetime(2024, 12, 1)
+    assert max(t.date for t in transactions) <= datetime(2025, 3, 15)
+    assert all(t.dedupe_key for t in transactions)
+    assert rollup.verify() == []
+
+def test_seed_is_repeatable(app):
+    seed_data(transactions=50, prefix='a', seed=7)
+    seed_data(transactions=50, prefix='b', seed=7)
+    amounts = lambda username: [t.amount for t in Transaction.query.join(User).filter(
+        User.username == username).order_by(Transaction.id)]
+    assert amounts('a-1') == amounts('b-1')
+
+def test_seed_rebuilds_only_seeded_users(app, monkeypatch):
+    seed_data(transactions=50, prefix='a')
+    other = User.query.filter_by(username='a-1').one()
+    version = other.data_version
+    # Drift in another user's rollup is left for `flask rollup rebuild`
+    MonthlyCategoryTotal.query.filter_by(user_id=other.id).delete()
+    db.session.commit()
+
+    invalidated = []
+    cache = get_cache()
+    monkeypatch.setattr(cache, 'invalidate_user', invalidated.append)
+    seed_data(transactions=50, prefix='b')
+    seeded = User.query.filter_by(username='b-1').one()
+    assert rollup.verify(seeded.id) == []
+    assert rollup.verify(other.id) != []
+    # Once for the inserted rows, once more for the rollup rebuild
+    assert invalidated.count(seeded.id) >= 2
+    assert other.id not in invalidated
+    assert db.session.get(User, other.id).data_version == version
+
+def test_seed_cli(app, runner):
+    result = runner.invoke(args=['seed', '--users', '1', '--transactions', '20', '--months', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'Seeded 1 users with 20 transactions' in result.output
+
+    result = runner.invoke(args=['seed'])
+    assert result.exit_code != 0
+    assert 'already exist' in result.output
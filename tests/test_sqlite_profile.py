@@ -0,0 +1,23 @@
+from app import create_app, db
+from config import TestingConfig, ProductionConfig, SQLITE_PRODUCTION_PRAGMAS
+
+def test_production_profile_pragmas(tmp_path):
+    config = type('FileConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'SQLITE_PRAGMAS': SQLITE_PRODUCTION_PRAGMAS,
+    })
+    app = create_app(config)
+    with app.app_context():
+        conn = db.session.connection()
+        pragma = lambda name: conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1  # NORMAL
+        assert pragma('busy_timeout') == 5000
+        assert pragma('cache_size') == -64000
+        assert pragma('temp_store') == 2  # MEMORY
+        assert pragma('foreign_keys') == 1
+        db.session.remove()
+
+def test_profile_is_per_config_class():
+    assert ProductionConfig.SQLITE_PRAGMAS == SQLITE_PRODUCTION_PRAGMAS
+    assert TestingConfig.SQLITE_PRAGMAS == {'foreign_keys': 'ON'}
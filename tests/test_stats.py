@@ -0,0 +1,78 @@
+import time
+from datetime import datetime, date
+from app.models import Category, Transaction
+from app.services import get_spending_series, default_stats_range
+from app import db
+
+def add_spending(user):
+    food = Category(name='Food', color='#111111', user_id=user.id)
+    bills = Category(name='Bills', color='#222222', user_id=user.id)
+    db.session.add_all([food, bills])
+    db.session.commit()
+    db.session.add_all([
+        Transaction(amount=10, type='expense', category_id=food.id, user_id=user.id, date=datetime(2025, 1, 6, 12)),
+        Transaction(amount=5, type='expense', category_id=food.id, user_id=user.id, date=datetime(2025, 1, 7)),
+        Transaction(amount=20, type='expense', category_id=food.id, user_id=user.id, date=datetime(2025, 3, 1)),
+        Transaction(amount=100, type='expense', category_id=bills.id, user_id=user.id, date=datetime(2025, 2, 28, 23)),
+        Transaction(amount=7, type='expense', category_id=bills.id, user_id=user.id, date=datetime(2024, 12, 31)),
+    ])
+    db.session.commit()
+    return user, food, bills
+
+def test_month_series_from_rollup(app, make_user):
+    user, food, bills = add_spending(make_user('stats'))
+    data = get_spending_series(user.id, 'month', date(2025, 1, 1), date(2025, 3, 31))
+    assert data['buckets'] == ['2025-01', '2025-02', '2025-03']
+    assert data['labels'] == ['Food', 'Bills']
+    assert data['series'] == [[15, 0, 20], [0, 100, 0]]
+    assert data['data'] == [35, 100]
+
+def test_day_and_week_series_from_raw_rows(app, make_user):
+    user, food, bills = add_spending(make_user('stats'))
+    data = get_spending_series(user.id, 'day', date(2025, 1, 6), date(2025, 1, 8))
+    assert data['buckets'] == ['2025-01-06', '2025-01-07', '2025-01-08']
+    assert data['series'] == [[10, 5, 0]]
+
+    data = get_spending_series(user.id, 'week', date(2025, 1, 1), date(2025, 1, 12))
+    assert data['buckets'] == ['2025-W00', '2025-W01']
+    assert data['series'] == [[0, 15]]
+
+    # A range that is not month-aligned still buckets per month, from raw rows
+    data = get_spending_series(user.id, 'month', date(2025, 1, 7), date(2025, 2, 28))
+    assert data['series'] == [[5, 0], [0, 100]]
+
+def test_year_series_and_default_range(app, make_user):
+    user, food, bills = add_spending(make_user('stats'))
+    data = get_spending_series(user.id, 'year', date(2024, 1, 1), date(2025, 12, 31))
+    assert data['buckets'] == ['2024', '2025']
+    assert data['series'] == [[0, 35], [7, 100]]
+
+    assert default_stats_range('month', date(2025, 3, 15)) == (date(2024, 4, 1), date(2025, 3, 31))
+    assert default_stats_range('week', date(2025, 3, 12)) == (date(2024, 12, 23), date(2025, 3, 12))
+
+def test_stats_api_params(client, app, make_user):
+    add_spending(make_user('stats'))
+    client.post('/login', data={'username': 'stats', 'password': 'pw'})
+    response = client.get('/api/stats/month?from=2025-01-01&to=2025-03-31')
+    assert response.status_code == 200
+    assert response.get_json()['data'] == [35, 100]
+
+    assert client.get('/api/stats/decade').status_code == 400
+    assert client.get('/api/stats/day?from=yesterday').status_code == 400
+    assert client.get('/api/stats/day?from=2025-02-01&to=2025-01-01').status_code == 400
+    assert client.get('/api/stats/day?from=2000-01-01&to=2025-01-01').status_code == 400
+
+def test_stats_range_edges(client, app, make_user):
+    make_user('stats')
+    client.post('/login', data={'username': 'stats', 'password': 'pw'})
+    assert client.get('/api/stats/day?from=9999-12-31&to=9999-12-31').status_code == 400
+    data = client.get('/api/stats/week?from=9999-12-20&to=9999-12-30').get_json()
+    assert data['buckets'] == ['9999-W51', '9999-W52']
+
+    # Oversized ranges are refused from the calendar, without walking them
+    started = time.perf_counter()
+    assert client.get('/api/stats/year?from=0001-01-01&to=9999-01-01').status_code == 400
+    assert client.get('/api/stats/week?from=0001-01-01&to=9999-01-01').status_code == 400
+    assert time.perf_counter() - started < 0.1
+    data = get_spending_series(1, 'year', date(1000, 1, 1), date(1999, 12, 31))
+    assert len(data['buckets']) == 1000